@@ -1,10 +1,18 @@
+import asyncio
+import hmac
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
+from config import settings
 from models import User
 
 # Configuration
@@ -12,10 +20,25 @@ SECRET_KEY = "your-secret-key-change-in-production"  # Should be in .env
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing. Pinning min/max rounds to the configured cost makes
+# hashes with any other cost "need update", so they are rehashed on login.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.bcrypt_rounds,
+    bcrypt__min_rounds=settings.bcrypt_rounds,
+    bcrypt__max_rounds=settings.bcrypt_rounds,
+)
 security = HTTPBearer()
 
+# bcrypt releases the GIL, so hashing on a thread pool keeps the event loop
+# free. The semaphore queues excess requests before they reach the pool.
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.password_hash_workers,
+    thread_name_prefix="bcrypt",
+)
+_hash_slots: Optional[asyncio.Semaphore] = None
+
 
 def hash_password(password: str) -> str:
     """Hash a password."""
@@ -27,6 +50,38 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def _get_hash_slots() -> asyncio.Semaphore:
+    global _hash_slots
+    if _hash_slots is None:
+        _hash_slots = asyncio.Semaphore(settings.password_hash_concurrency)
+    return _hash_slots
+
+
+async def _run_hashing(func, *args):
+    async with _get_hash_slots():
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_hash_executor, func, *args)
+
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password on the hashing thread pool."""
+    return await _run_hashing(hash_password, password)
+
+
+async def verify_and_update_password(
+    plain_password: str,
+    hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password on the hashing thread pool.
+
+    Returns:
+        Whether the password matched, and a new hash to store if the old one
+        was made with a different cost factor (None otherwise)
+    """
+    return await _run_hashing(pwd_context.verify_and_update, plain_password, hashed_password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token."""
     to_encode = data.copy()
@@ -39,6 +94,80 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
+@dataclass(frozen=True)
+class TokenUser:
+    """The identity a verified access token belongs to."""
+    id: int
+    email: str
+
+
+class TokenCache:
+    """
+    Bounded cache of verified access tokens.
+
+    Entries expire together with the token's `exp` claim. `evict_user`
+    forgets a user's tokens so they are re-checked against the database on
+    next use; signup calls it for the new user's id, which may have
+    belonged to a deleted user.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[TokenUser]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, user = entry
+            if expires_at <= time.time():
+                del self._entries[token]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return user
+
+    def put(self, token: str, user: TokenUser, expires_at: float) -> None:
+        if self.max_entries <= 0 or expires_at <= time.time():
+            return
+        with self._lock:
+            self._entries[token] = (expires_at, user)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def evict_user(self, user_id: int) -> None:
+        """Forget every cached token of a user."""
+        with self._lock:
+            for token in [t for t, (_, u) in self._entries.items() if u.id == user_id]:
+                del self._entries[token]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+token_cache = TokenCache(max_entries=settings.token_cache_max_entries)
+
+
 def decode_token(token: str) -> Optional[dict]:
     """Decode and verify a JWT token."""
     try:
@@ -48,6 +177,13 @@ def decode_token(token: str) -> Optional[dict]:
         return None
 
 
+def verify_admin_token(token: Optional[str]) -> bool:
+    """Whether `token` is the configured ADMIN_TOKEN. Always False when none is set."""
+    if not settings.admin_token or not token:
+        return False
+    return hmac.compare_digest(token.encode(), settings.admin_token.encode())
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(lambda: None)  # Will be injected properly
@@ -0,0 +1,153 @@
+"""
+Benchmark the CachedNews feed queries at different table sizes.
+
+For each size a fresh SQLite database is seeded, then the query plan and
+latency (median and p95 over --repeat runs) are reported for:
+
+- get_feed_page_json (what /news/feed serves): first page, and a page deep
+  in history via a cursor
+- get_ranked_feed_json (/news/feed?sort=relevance): candidate read
+- get_latest_cached_at: the ingestion freshness check
+
+Plans are listed for every statement a call runs.
+
+Usage (from backend/):
+    python benchmarks/bench_cached_news.py --sizes 10000 100000 1000000
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, text  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+from models import Base  # noqa: E402
+from news import encode_feed_cursor, get_feed_page_json, get_latest_cached_at, get_ranked_feed_json  # noqa: E402
+from ranking import profile_vector  # noqa: E402
+from topics import TOPIC_ECONOMY, TOPIC_HOUSING, TOPIC_LOANS  # noqa: E402
+
+from seed import seed_articles  # noqa: E402
+
+PROFILE_MASK = TOPIC_LOANS | TOPIC_HOUSING | TOPIC_ECONOMY
+PROFILE = {"num_loans": 1, "housing_type": "Ejerbolig", "housing_value": 3_000_000.0}
+
+
+class StatementCapture:
+    """Remembers the SQL statements run on an engine since the last `reset`."""
+
+    def __init__(self, engine):
+        self.statements = []
+        event.listen(engine.sync_engine, "before_cursor_execute", self._capture)
+
+    def reset(self) -> None:
+        self.statements = []
+
+    def _capture(self, conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith("EXPLAIN"):
+            self.statements.append((statement, parameters))
+
+
+async def explain(engine, capture: StatementCapture) -> list:
+    statements = list(capture.statements)
+    plans = []
+    async with engine.connect() as conn:
+        for i, (statement, parameters) in enumerate(statements, 1):
+            result = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            plans.append(f"[{i}/{len(statements)}]")
+            plans.extend(row[-1] for row in result.all())
+    return plans
+
+
+async def measure(session_factory, engine, capture, fn, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        async with session_factory() as db:
+            capture.reset()
+            start = time.perf_counter()
+            await fn(db)
+            timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    return {
+        "median_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        "plan": await explain(engine, capture),
+    }
+
+
+async def bench_size(size: int, repeat: int, workdir: str) -> dict:
+    path = os.path.join(workdir, f"bench_{size}.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    start = time.perf_counter()
+    await seed_articles(engine, size)
+    async with engine.begin() as conn:
+        await conn.execute(text("ANALYZE"))
+    seed_seconds = time.perf_counter() - start
+
+    # A cursor roughly halfway through the profile's feed
+    async with session_factory() as db:
+        row = (await db.execute(text(
+            "SELECT published_at, article_id FROM article_topics WHERE topic = :topic "
+            "ORDER BY published_at DESC LIMIT 1 OFFSET :offset"
+        ), {"topic": TOPIC_LOANS, "offset": size // 4})).first()
+    from datetime import datetime
+    deep_cursor = encode_feed_cursor(datetime.fromisoformat(str(row[0])), row[1]) if row else None
+
+    capture = StatementCapture(engine)
+    queries = {
+        "feed_first_page": lambda db: get_feed_page_json(db, PROFILE_MASK, limit=20),
+        "feed_deep_page": lambda db: get_feed_page_json(db, PROFILE_MASK, limit=20, cursor=deep_cursor),
+        "feed_relevance": lambda db: get_ranked_feed_json(db, profile_vector(PROFILE), limit=20),
+        "get_latest_cached_at": lambda db: get_latest_cached_at(db),
+    }
+
+    results = {"size": size, "seed_seconds": round(seed_seconds, 1), "queries": {}}
+    for name, fn in queries.items():
+        results["queries"][name] = await measure(session_factory, engine, capture, fn, repeat)
+
+    await engine.dispose()
+    os.remove(path)
+    return results
+
+
+def print_report(results: list) -> None:
+    for result in results:
+        print(f"\n== {result['size']:,} articles (seeded in {result['seed_seconds']}s) ==")
+        for name, stats in result["queries"].items():
+            print(f"  {name:<22} median {stats['median_ms']:>9.3f} ms   p95 {stats['p95_ms']:>9.3f} ms")
+            for line in stats["plan"]:
+                print(f"      {line}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--json", help="Also write results to this file")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            results.append(await bench_size(size, args.repeat, workdir))
+
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,117 @@
+"""
+Benchmark relevance ranking (/news/feed?sort=relevance).
+
+Reports the time to score a batch of candidate articles for one profile
+with `ranking.score_articles` (NumPy when installed, and the pure-Python
+fallback), and the end-to-end latency of `get_ranked_feed_json` against a
+seeded SQLite database.
+
+Usage (from backend/):
+    python benchmarks/bench_ranking.py --articles 100000 --candidates 300
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+import ranking  # noqa: E402
+from models import Base  # noqa: E402
+from news import get_ranked_feed_json  # noqa: E402
+from topics import TOPIC_NAMES  # noqa: E402
+
+from seed import seed_articles  # noqa: E402
+
+PROFILE = {
+    "num_loans": 2,
+    "interest_rate_type": "Variabel",
+    "housing_type": "Ejerbolig",
+    "savings_types": ["Aktier"],
+    "vehicle_type": "Elbil",
+    "annual_gross_income": 650_000,
+}
+
+
+def summarize(timings: list) -> dict:
+    timings = sorted(timings)
+    return {
+        "median_ms": round(statistics.median(timings), 4),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 4),
+    }
+
+
+def time_scoring(candidates: int, repeat: int) -> dict:
+    rng = random.Random(42)
+    now = time.time()
+    vectors = [[rng.random() for _ in TOPIC_NAMES] for _ in range(candidates)]
+    published_at = [now - rng.uniform(0, 7 * 86400) for _ in range(candidates)]
+    profile = ranking.profile_vector(PROFILE)
+
+    results = {}
+    numpy = ranking.np
+    for name, module in (("numpy", numpy), ("pure_python", None)):
+        if name == "numpy" and numpy is None:
+            continue
+        ranking.np = module
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            ranking.score_articles(vectors, published_at, profile, now=now)
+            timings.append((time.perf_counter() - start) * 1000)
+        results[name] = summarize(timings)
+    ranking.np = numpy
+    return results
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=100_000)
+    parser.add_argument("--candidates", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--json", help="Also write results to this file")
+    args = parser.parse_args()
+
+    results = {
+        "articles": args.articles,
+        "candidates": args.candidates,
+        "scoring": time_scoring(args.candidates, args.repeat),
+    }
+
+    with tempfile.TemporaryDirectory() as workdir:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(workdir, 'ranking.db')}")
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        await seed_articles(engine, args.articles)
+
+        profile = ranking.profile_vector(PROFILE)
+        timings = []
+        for _ in range(max(1, args.repeat // 4)):
+            async with session_factory() as db:
+                start = time.perf_counter()
+                await get_ranked_feed_json(db, profile, limit=20, candidates=args.candidates)
+                timings.append((time.perf_counter() - start) * 1000)
+        results["ranked_feed"] = summarize(timings)
+        await engine.dispose()
+
+    print(f"== {args.candidates} candidates, {args.articles:,} articles ==")
+    for name, stats in results["scoring"].items():
+        print(f"  score ({name:<11}) median {stats['median_ms']:>8.4f} ms   p95 {stats['p95_ms']:>8.4f} ms")
+    stats = results["ranked_feed"]
+    print(f"  ranked feed page     median {stats['median_ms']:>8.3f} ms   p95 {stats['p95_ms']:>8.3f} ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
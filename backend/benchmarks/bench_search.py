@@ -0,0 +1,118 @@
+"""
+Benchmark /news/search against a seeded corpus.
+
+Seeds a fresh SQLite database, builds the FTS5 index and reports median and
+p95 latency of `search_articles` for a few query shapes (single term, two
+terms, prefix, page 5 via cursors), next to a `LIKE '%term%'` scan over
+title/description/content for comparison.
+
+Usage (from backend/):
+    python benchmarks/bench_search.py --articles 100000
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import or_, select  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+from models import Base, CachedNews  # noqa: E402
+from search import create_search_index, rebuild_search_index, search_articles  # noqa: E402
+
+from seed import seed_articles  # noqa: E402
+
+QUERIES = {
+    "single_term": "mortgage",
+    "two_terms": "electric subsidy",
+    "prefix": "invest",
+}
+
+
+def summarize(timings: list) -> dict:
+    timings = sorted(timings)
+    return {
+        "median_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+    }
+
+
+async def timed(session_factory, fn, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        async with session_factory() as db:
+            start = time.perf_counter()
+            await fn(db)
+            timings.append((time.perf_counter() - start) * 1000)
+    return summarize(timings)
+
+
+async def fifth_page(db, query: str) -> None:
+    cursor = None
+    for _ in range(5):
+        _, cursor = await search_articles(db, query, limit=20, cursor=cursor)
+        if cursor is None:
+            return
+
+
+async def like_scan(db, term: str) -> None:
+    pattern = f"%{term}%"
+    await db.execute(
+        select(CachedNews.id).filter(or_(
+            CachedNews.title.like(pattern),
+            CachedNews.description.like(pattern),
+            CachedNews.content.like(pattern),
+        )).order_by(CachedNews.published_at.desc()).limit(20)
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--json", help="Also write results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(workdir, 'search.db')}")
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(create_search_index)
+
+        start = time.perf_counter()
+        await seed_articles(engine, args.articles)
+        async with session_factory() as db:
+            await rebuild_search_index(db)
+        seed_seconds = round(time.perf_counter() - start, 1)
+
+        results = {"articles": args.articles, "seed_seconds": seed_seconds, "queries": {}}
+        for name, query in QUERIES.items():
+            results["queries"][name] = await timed(
+                session_factory, lambda db, q=query: search_articles(db, q, limit=20), args.repeat
+            )
+        results["queries"]["page_5"] = await timed(
+            session_factory, lambda db: fifth_page(db, QUERIES["single_term"]), args.repeat
+        )
+        results["queries"]["like_scan_baseline"] = await timed(
+            session_factory, lambda db: like_scan(db, QUERIES["single_term"]), max(1, args.repeat // 5)
+        )
+        await engine.dispose()
+
+    print(f"== {args.articles:,} articles (seeded and indexed in {seed_seconds}s) ==")
+    for name, stats in results["queries"].items():
+        print(f"  {name:<20} median {stats['median_ms']:>9.3f} ms   p95 {stats['p95_ms']:>9.3f} ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,436 @@
+"""
+Load test of the API against a seeded database and a local NewsAPI stand-in.
+
+Seeds a throwaway SQLite database with users, profiles and articles, swaps
+the NewsAPI client's transport for an in-process stub with configurable
+latency, runs one forced ingestion through it, then drives the app
+in-process (httpx ASGI transport, real middleware stack) with concurrent
+virtual users issuing a weighted mix of signup, login, profile, feed and
+insights requests. Reports requests per second and p50/p95/p99 latency per
+endpoint, and writes them to a JSON file that later runs can `--compare`
+against.
+
+Usage (from backend/):
+    python benchmarks/loadtest.py --users 1000 --articles 50000 --concurrency 50 --duration 30
+    python benchmarks/loadtest.py --json after.json --compare before.json
+    python benchmarks/loadtest.py --mix feed=80,insights=20
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+# Weight of each operation in the request mix
+DEFAULT_MIX = {
+    "feed": 45,
+    "feed_relevance": 10,
+    "feed_next_page": 10,
+    "profile": 10,
+    "profile_update": 5,
+    "insights": 12,
+    "login": 5,
+    "signup": 2,
+    "refresh": 1,
+}
+PASSWORD = "loadtest-password"
+ADMIN_TOKEN = "loadtest-admin"  # Operator endpoints such as /news/refresh
+
+HOUSING_TYPES = ["Lejebolig", "Andelsbolig", "Ejerbolig", "Sommerhus"]
+VEHICLE_TYPES = ["Benzin/diesel", "Elbil", "Cykel/offentlig", "Hybrid"]
+RATE_TYPES = ["Fast", "Variabel", "Blandet"]
+SAVINGS_TYPES = ["Opsparing", "Aktier", "Pension", "Obligationer"]
+
+
+def configure_environment(workdir: str, args) -> None:
+    """Point the app at the throwaway database; must run before importing it."""
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'loadtest.db')}",
+        "NEWSAPI_KEY": "loadtest",
+        # The refresh rate of a load test is artificial; don't ration the stand-in
+        "NEWSAPI_DAILY_QUOTA": "0",
+        "NEWS_INGESTION_ENABLED": "false",
+        "MAINTENANCE_ENABLED": "false",
+        "DIGEST_ENABLED": "false",
+        "BREAKING_NEWS_ENABLED": "false",
+        "NEWS_REFRESH_LOCK_PATH": os.path.join(workdir, "news-refresh.lock"),
+        "MIGRATION_LOCK_PATH": os.path.join(workdir, "migration.lock"),
+        "MAINTENANCE_LOCK_PATH": os.path.join(workdir, "maintenance.lock"),
+        "DIGEST_LOCK_PATH": os.path.join(workdir, "digest.lock"),
+        "SLOW_REQUEST_LOG_PATH": os.path.join(workdir, "slow-requests.log"),
+        "DEBUG": "false",
+        "ADMIN_TOKEN": ADMIN_TOKEN,
+    })
+    if args.no_compression:
+        os.environ["COMPRESSION_ENABLED"] = "false"
+
+
+def newsapi_stub(latency_ms: float, jitter_ms: float, error_rate: float, seed: int):
+    """
+    httpx transport answering /everything like NewsAPI.
+
+    Pages are derived from the query and page number, so every run gets
+    the same articles.
+    """
+    import httpx
+    from seed import fake_article
+
+    now = datetime.utcnow()
+    rng = random.Random(seed)
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        delay = latency_ms + rng.uniform(0, jitter_ms)
+        await asyncio.sleep(delay / 1000)
+        if rng.random() < error_rate:
+            return httpx.Response(429, json={"status": "error", "code": "rateLimited"})
+
+        query = request.url.params.get("q", "")
+        page = int(request.url.params.get("page", 1))
+        page_size = int(request.url.params.get("pageSize", 20))
+        page_rng = random.Random(zlib.crc32(f"{query}:{page}".encode()))
+        articles = []
+        for i in range(page_size):
+            article = fake_article(zlib.crc32(f"{query}:{page}:{i}".encode()), page_rng, now)
+            articles.append({
+                "source": {"id": None, "name": article["source"]},
+                "author": article["author"],
+                "title": f"{query.title()}: {article['title']}",
+                "description": article["description"],
+                "url": article["url"],
+                "urlToImage": article["image_url"],
+                "publishedAt": article["published_at"] + "Z",
+                "content": article["content"],
+            })
+        return httpx.Response(200, json={"status": "ok", "totalResults": len(articles), "articles": articles})
+
+    return httpx.MockTransport(handler)
+
+
+def fake_profile(rng: random.Random) -> dict:
+    num_loans = rng.choice([0, 0, 1, 2, 3])
+    return {
+        "age": rng.randint(18, 80),
+        "region": rng.choice(["Hovedstaden", "Midtjylland", "Syddanmark", "Sjælland", "Nordjylland"]),
+        "annual_gross_income": float(rng.randrange(150_000, 1_200_000, 10_000)),
+        "housing_type": rng.choice(HOUSING_TYPES),
+        "housing_value": float(rng.randrange(0, 6_000_000, 50_000)) or None,
+        "num_loans": num_loans,
+        "total_debt": float(rng.randrange(0, 4_000_000, 25_000)) if num_loans else 0.0,
+        "interest_rate_type": rng.choice(RATE_TYPES) if num_loans else None,
+        "vehicle_type": rng.choice(VEHICLE_TYPES),
+        "savings_types": rng.sample(SAVINGS_TYPES, rng.randint(0, 3)),
+        "breaking_news": False,
+        "daily_digest": rng.random() < 0.5,
+    }
+
+
+async def seed_users(engine, count: int, seed: int, chunk_size: int = 5000) -> None:
+    """Insert `count` users (all with PASSWORD) and their profiles directly."""
+    from sqlalchemy import insert
+
+    from auth import hash_password
+    from models import Profile, User
+
+    rng = random.Random(seed)
+    # One bcrypt hash for everyone; hashing per user would dominate seeding
+    hashed = hash_password(PASSWORD)
+    now = datetime.utcnow()
+    for start in range(0, count, chunk_size):
+        ids = range(start + 1, min(start + chunk_size, count) + 1)
+        users = [
+            {
+                "id": i,
+                "email": f"user{i}@loadtest.example",
+                "first_name": "Load",
+                "last_name": f"User{i}",
+                "hashed_password": hashed,
+                "created_at": now,
+            }
+            for i in ids
+        ]
+        profiles = [{"user_id": i, "updated_at": now, **fake_profile(rng)} for i in ids]
+        async with engine.begin() as conn:
+            await conn.execute(insert(User), users)
+            await conn.execute(insert(Profile), profiles)
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies: list, errors: int, seconds: float) -> dict:
+    values = sorted(latencies)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "rps": round(len(values) / seconds, 1) if seconds else 0.0,
+        "mean_ms": round(sum(values) / len(values), 3) if values else 0.0,
+        "p50_ms": round(percentile(values, 50), 3),
+        "p95_ms": round(percentile(values, 95), 3),
+        "p99_ms": round(percentile(values, 99), 3),
+        "max_ms": round(values[-1], 3) if values else 0.0,
+    }
+
+
+def parse_mix(value: str) -> dict:
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown operation {name!r}; choose from {', '.join(DEFAULT_MIX)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class VirtualUser:
+    """One simulated app user issuing the weighted request mix in a loop."""
+
+    def __init__(self, index: int, client, tokens: dict, args, results: dict, errors: dict):
+        self.index = index
+        self.client = client
+        self.tokens = tokens
+        self.args = args
+        self.rng = random.Random(args.seed + index)
+        self.results = results
+        self.errors = errors
+        self.signups = 0
+        self.recording = False
+        self.operations = list(args.mix)
+        self.weights = [args.mix[name] for name in self.operations]
+
+    def pick_user(self) -> tuple:
+        user_id = self.rng.randint(1, self.args.users)
+        return user_id, self.tokens[user_id]
+
+    async def timed(self, name: str, request, expected=(200,)):
+        start = time.perf_counter()
+        response = await request
+        elapsed = (time.perf_counter() - start) * 1000
+        if self.recording:
+            self.results[name].append(elapsed)
+            if response.status_code not in expected:
+                self.errors[name] += 1
+        return response
+
+    async def run(self, deadline: float, record_after: float) -> None:
+        while time.perf_counter() < deadline:
+            self.recording = time.perf_counter() >= record_after
+            operation = self.rng.choices(self.operations, self.weights)[0]
+            await getattr(self, operation)()
+
+    async def feed(self):
+        user_id, token = self.pick_user()
+        await self.timed("feed", self.client.get(
+            "/news/feed", params={"user_id": user_id, "token": token, "limit": 20}
+        ))
+
+    async def feed_relevance(self):
+        user_id, token = self.pick_user()
+        await self.timed("feed_relevance", self.client.get(
+            "/news/feed", params={"user_id": user_id, "token": token, "limit": 20, "sort": "relevance"}
+        ))
+
+    async def feed_next_page(self):
+        user_id, token = self.pick_user()
+        params = {"user_id": user_id, "token": token, "limit": 20}
+        first = await self.client.get("/news/feed", params=params)
+        cursor = first.headers.get("x-next-cursor")
+        if cursor:
+            await self.timed("feed_next_page", self.client.get("/news/feed", params={**params, "cursor": cursor}))
+
+    async def profile(self):
+        user_id, token = self.pick_user()
+        await self.timed("profile", self.client.get(f"/users/{user_id}/profile", params={"token": token}))
+
+    async def profile_update(self):
+        user_id, token = self.pick_user()
+        await self.timed("profile_update", self.client.put(
+            f"/users/{user_id}/profile", params={"token": token}, json=fake_profile(self.rng)
+        ))
+
+    async def insights(self):
+        user_id, token = self.pick_user()
+        await self.timed("insights", self.client.get(f"/insights/{user_id}", params={"token": token}))
+
+    async def login(self):
+        user_id = self.rng.randint(1, self.args.users)
+        await self.timed("login", self.client.post(
+            "/auth/login", json={"email": f"user{user_id}@loadtest.example", "password": PASSWORD}
+        ))
+
+    async def signup(self):
+        self.signups += 1
+        await self.timed("signup", self.client.post("/auth/signup", json={
+            "first_name": "New",
+            "last_name": "User",
+            "email": f"new{self.index}-{self.signups}@loadtest.example",
+            "password": PASSWORD,
+        }))
+
+    async def refresh(self):
+        await self.timed("refresh", self.client.post("/news/refresh", params={"token": ADMIN_TOKEN}))
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_report(report: dict, baseline: dict = None) -> None:
+    print(f"== {report['config']['concurrency']} virtual users, {report['config']['duration']}s, "
+          f"{report['config']['users']:,} users, {report['config']['articles']:,} articles ==")
+    header = f"  {'endpoint':<16} {'requests':>9} {'errors':>7} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    if baseline:
+        header += f" {'Δrps':>8} {'Δp95':>8}"
+    print(header)
+    rows = list(report["endpoints"].items()) + [("overall", report["overall"])]
+    for name, stats in rows:
+        line = (f"  {name:<16} {stats['requests']:>9} {stats['errors']:>7} {stats['rps']:>9.1f} "
+                f"{stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f}")
+        before = (baseline or {}).get("endpoints", {}).get(name) if name != "overall" else (baseline or {}).get("overall")
+        if before:
+            line += f" {_change(stats['rps'], before['rps']):>8} {_change(stats['p95_ms'], before['p95_ms']):>8}"
+        print(line)
+
+
+def _change(after: float, before: float) -> str:
+    if not before:
+        return "-"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+async def run(args, workdir: str) -> dict:
+    import httpx
+    from sqlalchemy import select
+
+    import main
+    from auth import create_access_token
+    from database import engine, init_db
+    from models import CachedNews
+    from news import newsapi_client
+    from seed import seed_articles
+
+    # Per-request INFO logs would cost more than some of the requests
+    logging.getLogger().setLevel(logging.WARNING)
+    newsapi_client.transport = newsapi_stub(args.newsapi_latency_ms, args.newsapi_jitter_ms, args.newsapi_error_rate, args.seed)
+
+    setup = {}
+    start = time.perf_counter()
+    await init_db()
+    await seed_articles(engine, args.articles, seed=args.seed)
+    await seed_users(engine, args.users, seed=args.seed)
+    setup["seed_seconds"] = round(time.perf_counter() - start, 2)
+
+    expires = timedelta(seconds=args.warmup + args.duration + 3600)
+    tokens = {
+        user_id: create_access_token({"sub": f"user{user_id}@loadtest.example", "uid": user_id}, expires)
+        for user_id in range(1, args.users + 1)
+    }
+
+    results = defaultdict(list)
+    errors = defaultdict(int)
+    async with main.app.router.lifespan_context(main.app):
+        # One ingest through the stand-in so the NewsAPI path is exercised too
+        start = time.perf_counter()
+        setup["ingested_articles"] = await main.ingestion.run_once(force_refresh=True)
+        setup["ingest_seconds"] = round(time.perf_counter() - start, 2)
+
+        transport = httpx.ASGITransport(app=main.app)
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", limits=limits, timeout=60) as client:
+            now = time.perf_counter()
+            record_after = now + args.warmup
+            deadline = record_after + args.duration
+            users = [VirtualUser(i, client, tokens, args, results, errors) for i in range(args.concurrency)]
+            await asyncio.gather(*(user.run(deadline, record_after) for user in users))
+            measured = time.perf_counter() - record_after
+
+        async with main.SessionLocal() as db:
+            setup["articles_after"] = len((await db.execute(select(CachedNews.id))).all())
+
+    all_latencies = [value for values in results.values() for value in values]
+    return {
+        "config": {
+            "users": args.users,
+            "articles": args.articles,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "seed": args.seed,
+            "mix": args.mix,
+            "newsapi_latency_ms": args.newsapi_latency_ms,
+            "newsapi_jitter_ms": args.newsapi_jitter_ms,
+            "newsapi_error_rate": args.newsapi_error_rate,
+            "compression": not args.no_compression,
+        },
+        "environment": {
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "started_at": datetime.utcnow().isoformat(),
+        },
+        "setup": setup,
+        "overall": summarize(all_latencies, sum(errors.values()), measured),
+        "endpoints": {
+            name: summarize(results[name], errors[name], measured)
+            for name in sorted(results)
+        },
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000, help="Seeded users, each with a profile")
+    parser.add_argument("--articles", type=int, default=20_000, help="Seeded cached articles")
+    parser.add_argument("--concurrency", type=int, default=50, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="Seconds of load before measuring")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="Operation weights, e.g. feed=80,insights=20")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--newsapi-latency-ms", type=float, default=150, help="Stand-in NewsAPI response time")
+    parser.add_argument("--newsapi-jitter-ms", type=float, default=50)
+    parser.add_argument("--newsapi-error-rate", type=float, default=0.0, help="Share of stand-in calls answered with 429")
+    parser.add_argument("--no-compression", action="store_true", help="Disable response compression")
+    parser.add_argument("--json", default="loadtest-results.json", help="Write the report to this file")
+    parser.add_argument("--compare", help="Earlier report to show changes against")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        configure_environment(workdir, args)
+        report = asyncio.run(run(args, workdir))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    with open(args.json, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.json}")
+
+
+if __name__ == "__main__":
+    main_cli()
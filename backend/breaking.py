@@ -0,0 +1,245 @@
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from news import get_articles_since, get_ingest_generation, get_max_article_id
+
+logger = logging.getLogger(__name__)
+
+# Sent between events so proxies don't close idle connections
+HEARTBEAT = b": ping\n\n"
+
+
+def sse_event(article_id: int, data: bytes) -> bytes:
+    """Encode an article as a server-sent event. `data` must be one line of JSON."""
+    return b"id: " + str(article_id).encode() + b"\nevent: article\ndata: " + data + b"\n\n"
+
+
+class Subscriber:
+    """One open stream. Events are queued here until the response sends them."""
+
+    def __init__(self, user_id: int, topic_mask: int, queue_size: int):
+        self.user_id = user_id
+        self.topic_mask = topic_mask
+        self.queue: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue(maxsize=queue_size)
+        self.closed = False
+        self.first_queued_id: Optional[int] = None  # Replay stops short of this article
+
+    def close(self) -> None:
+        """End the stream once the queued events are sent."""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.queue.put_nowait(None)
+        except asyncio.QueueFull:
+            # Drop the backlog so the close marker gets through
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class BreakingNewsHub:
+    """
+    Push newly ingested articles to open breaking-news streams.
+
+    Subscribers are grouped by their profile's topic mask, so each batch of
+    new articles is matched once per distinct mask and the encoded events
+    are shared by every connection in the group. New articles are found by
+    watching the ingest generation in the database, so streams on every
+    worker see ingests run by any of them.
+
+    A subscriber whose queue fills up (a slow or stalled client) is
+    disconnected; it reconnects with `Last-Event-ID` and is replayed what
+    it missed.
+    """
+
+    # Most articles published per poll
+    POLL_BATCH = 500
+
+    def __init__(
+        self,
+        session_factory,
+        poll_seconds: float = 5.0,
+        queue_size: int = 100,
+        max_connections: int = 1000,
+        replay_limit: int = 50
+    ):
+        self.session_factory = session_factory
+        self.poll_seconds = poll_seconds
+        self.queue_size = queue_size
+        self.max_connections = max_connections
+        self.replay_limit = replay_limit
+        self._groups: Dict[int, Set[Subscriber]] = defaultdict(set)
+        self._generation: Optional[int] = None
+        self._last_article_id = 0
+        self._task: Optional[asyncio.Task] = None
+
+        self.connections_total = 0
+        self.connections_peak = 0
+        self.rejected = 0
+        self.slow_disconnects = 0
+        self.events_published = 0
+        self.events_delivered = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def connections(self) -> int:
+        return sum(len(group) for group in self._groups.values())
+
+    def subscribe(self, user_id: int, topic_mask: int) -> Optional[Subscriber]:
+        """Register a stream. Returns None when at `max_connections`."""
+        if self.connections >= self.max_connections:
+            self.rejected += 1
+            return None
+        subscriber = Subscriber(user_id, topic_mask, self.queue_size)
+        self._groups[topic_mask].add(subscriber)
+        self.connections_total += 1
+        self.connections_peak = max(self.connections_peak, self.connections)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        group = self._groups.get(subscriber.topic_mask)
+        if group is None:
+            return
+        group.discard(subscriber)
+        if not group:
+            del self._groups[subscriber.topic_mask]
+
+    def update_user(self, user_id: int, topic_mask: Optional[int]) -> None:
+        """
+        Apply a profile change to a user's open streams.
+
+        Streams move to the group for `topic_mask`, or are closed when it is
+        None (breaking news turned off).
+        """
+        moved = [
+            subscriber
+            for group in self._groups.values()
+            for subscriber in group
+            if subscriber.user_id == user_id
+        ]
+        for subscriber in moved:
+            self.unsubscribe(subscriber)
+            if topic_mask is None:
+                subscriber.close()
+            else:
+                subscriber.topic_mask = topic_mask
+                self._groups[topic_mask].add(subscriber)
+
+    async def replay(self, subscriber: Subscriber, after_id: int) -> List[bytes]:
+        """
+        Events a reconnecting client missed since `after_id`.
+
+        Call it after `subscribe`, so articles published while the replay is
+        read are queued rather than lost; those already queued are left out
+        of the replay.
+        """
+        async with self.session_factory() as db:
+            articles = await get_articles_since(
+                db, after_id, topic_mask=subscriber.topic_mask, limit=self.replay_limit
+            )
+        first_queued = subscriber.first_queued_id
+        return [
+            sse_event(article_id, data) for article_id, _, data in articles
+            if first_queued is None or article_id < first_queued
+        ]
+
+    def publish(self, articles: List[Tuple[int, int, bytes]]) -> None:
+        """
+        Fan out new articles, given as (id, topic_mask, json).
+
+        Each article is encoded once, and each group's payload is built once
+        and put on every queue in the group.
+        """
+        if not articles:
+            return
+        events = [(article_id, mask, sse_event(article_id, data)) for article_id, mask, data in articles]
+        self.events_published += len(events)
+
+        for group_mask, group in list(self._groups.items()):
+            matching = [(article_id, event) for article_id, mask, event in events if mask & group_mask]
+            if not matching:
+                continue
+            payload = b"".join(event for _, event in matching)
+            for subscriber in list(group):
+                try:
+                    subscriber.queue.put_nowait(payload)
+                    if subscriber.first_queued_id is None:
+                        subscriber.first_queued_id = matching[0][0]
+                    self.events_delivered += len(matching)
+                except asyncio.QueueFull:
+                    self.slow_disconnects += 1
+                    self.unsubscribe(subscriber)
+                    subscriber.close()
+
+    async def poll_once(self) -> int:
+        """Publish articles ingested since the last poll. Returns how many."""
+        async with self.session_factory() as db:
+            generation = await get_ingest_generation(db)
+            if generation == self._generation:
+                return 0
+            if self._generation is None or not self._groups:
+                # Nobody to tell: only articles ingested from now on are news
+                self._generation = generation
+                self._last_article_id = await get_max_article_id(db)
+                return 0
+
+            articles = await get_articles_since(
+                db, self._last_article_id, limit=self.POLL_BATCH
+            )
+
+        if articles:
+            self._last_article_id = articles[-1][0]
+        # A full batch may have more behind it; keep polling until drained
+        if len(articles) < self.POLL_BATCH:
+            self._generation = generation
+        self.publish(articles)
+        return len(articles)
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.poll_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Breaking news poll failed: {e}")
+            await asyncio.sleep(self.poll_seconds)
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._loop(), name="breaking-news-hub")
+
+    async def stop(self) -> None:
+        for group in list(self._groups.values()):
+            for subscriber in list(group):
+                subscriber.close()
+        self._groups.clear()
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "connections": self.connections,
+            "connections_peak": self.connections_peak,
+            "connections_total": self.connections_total,
+            "max_connections": self.max_connections,
+            "topic_groups": len(self._groups),
+            "rejected": self.rejected,
+            "slow_disconnects": self.slow_disconnects,
+            "events_published": self.events_published,
+            "events_delivered": self.events_delivered,
+        }
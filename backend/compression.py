@@ -0,0 +1,305 @@
+import gzip
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # Optional: without it only gzip is offered
+    brotli = None
+
+# Only text-like payloads are worth compressing
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "text/",
+)
+# Event streams go out as is so each event reaches the client immediately
+UNCOMPRESSED_TYPES = ("text/event-stream",)
+
+
+def parse_accept_encoding(header: str) -> dict:
+    """Map each coding in an Accept-Encoding header to its q-value."""
+    codings = {}
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        codings[coding] = q
+    return codings
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick "br" or "gzip" for a request, or None to send the body as is."""
+    if not accept_encoding:
+        return None
+    codings = parse_accept_encoding(accept_encoding)
+    wildcard = codings.get("*", 0.0)
+    supported = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best, best_q = None, 0.0
+    for coding in supported:
+        q = codings.get(coding, wildcard)
+        # Ties go to the first (smaller output) coding
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(body: bytes, encoding: str, gzip_level: int = 6, brotli_quality: int = 4) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+class StreamCompressor:
+    """Incremental compressor for streamed responses."""
+
+    def __init__(self, encoding: str, gzip_level: int = 6, brotli_quality: int = 4):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+        else:
+            # wbits=31 writes a gzip header and trailer
+            self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        # Flush so every chunk (e.g. each NDJSON batch) reaches the client now
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+class CompressedCache:
+    """
+    LRU cache of compressed bodies keyed by (ETag, encoding).
+
+    A strong ETag identifies the exact body, so any response carrying one
+    can reuse bytes compressed for an earlier client. Bounded by total size.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, etag: str, encoding: str) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get((etag, encoding))
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((etag, encoding))
+            self.hits += 1
+            return body
+
+    def set(self, etag: str, encoding: str, body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop((etag, encoding), None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._entries[(etag, encoding)] = body
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def _header(headers, name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _without(headers, *names: bytes) -> list:
+    return [(k, v) for k, v in headers if k.lower() not in names]
+
+
+def _add_vary(headers: list) -> list:
+    vary = _header(headers, b"vary")
+    if vary is None:
+        return headers + [(b"vary", b"Accept-Encoding")]
+    if b"accept-encoding" in vary.lower():
+        return headers
+    return _without(headers, b"vary") + [(b"vary", vary + b", Accept-Encoding")]
+
+
+def _weaken(etag: bytes) -> bytes:
+    # The compressed body differs byte-for-byte from the identity one, so
+    # its validator can't stay strong. If-None-Match compares weakly anyway.
+    return etag if etag.startswith(b"W/") else b"W/" + etag
+
+
+def _weaken_etag(headers: list) -> list:
+    etag = _header(headers, b"etag")
+    if etag is None:
+        return headers
+    return _without(headers, b"etag") + [(b"etag", _weaken(etag))]
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware that gzip/brotli-encodes responses for clients that
+    accept it.
+
+    Bodies under `minimum_size` and non-text content types are sent as is.
+    Complete bodies that carry an ETag are compressed once per encoding and
+    served from `cache` afterwards; streamed bodies are compressed on the fly.
+    The ETag of an encoded response (and of its 304s) is sent weak, since the
+    bytes depend on the negotiated encoding.
+    """
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        cache: Optional[CompressedCache] = None
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.cache = cache
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = _header(scope["headers"], b"accept-encoding")
+        encoding = choose_encoding(accept.decode("latin-1") if accept else None)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor: Optional[StreamCompressor] = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, compressor, passthrough
+
+            if message["type"] == "http.response.start":
+                if message["status"] == 304:
+                    # No body to compress, but the validator must match the
+                    # one the 200 would have carried for this Accept-Encoding
+                    passthrough = True
+                    await send({**message, "headers": _weaken_etag(_add_vary(list(message["headers"])))})
+                    return
+                # Hold the headers until we know whether the body is compressed
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            if passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is not None:
+                data = compressor.chunk(body) if body else b""
+                if not more_body:
+                    data += compressor.finish()
+                await send({"type": "http.response.body", "body": data, "more_body": more_body})
+                return
+
+            headers = list(start_message["headers"])
+            content_type = (_header(headers, b"content-type") or b"").decode("latin-1")
+            if (
+                _header(headers, b"content-encoding") is not None
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+                or content_type.startswith(UNCOMPRESSED_TYPES)
+            ):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            headers = _weaken_etag(_add_vary(headers))
+            if not more_body and len(body) < self.minimum_size:
+                # Too small to compress, but its 304s can't tell the size
+                # either, so it carries the same weak ETag
+                passthrough = True
+                start_message["headers"] = headers
+                await send(start_message)
+                await send(message)
+                return
+
+            etag = _header(start_message["headers"], b"etag")
+            headers.append((b"content-encoding", encoding.encode()))
+
+            if more_body:
+                # Streamed: length unknown up front
+                compressor = StreamCompressor(encoding, self.gzip_level, self.brotli_quality)
+                start_message["headers"] = _without(headers, b"content-length")
+                await send(start_message)
+                await send({
+                    "type": "http.response.body",
+                    "body": compressor.chunk(body),
+                    "more_body": True,
+                })
+                return
+
+            compressed = None
+            # Only a strong ETag promises byte-identical bodies
+            cache_key = None
+            if etag is not None and not etag.startswith(b"W/"):
+                cache_key = etag.decode("latin-1")
+            if self.cache is not None and cache_key is not None:
+                compressed = self.cache.get(cache_key, encoding)
+            if compressed is None:
+                compressed = compress(body, encoding, self.gzip_level, self.brotli_quality)
+                if self.cache is not None and cache_key is not None:
+                    self.cache.set(cache_key, encoding, compressed)
+
+            headers = _without(headers, b"content-length")
+            headers.append((b"content-length", str(len(compressed)).encode()))
+            start_message["headers"] = headers
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
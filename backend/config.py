@@ -1,4 +1,5 @@
 import os
+from typing import Optional
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 
@@ -11,6 +12,12 @@ class Settings(BaseSettings):
         "DATABASE_URL",
         "sqlite:///./okto.db"  # Default SQLite for MVP
     )
+    # Connection pool (ignored for SQLite)
+    db_pool_size: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    db_max_overflow: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    db_pool_timeout: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    # Held while a worker creates tables and migrates; the others wait for it
+    migration_lock_path: str = os.getenv("MIGRATION_LOCK_PATH", "./okto-migration.lock")
 
     # JWT
     secret_key: str = os.getenv(
@@ -19,9 +26,113 @@ class Settings(BaseSettings):
     )
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    token_cache_max_entries: int = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+    # Shared secret for operator endpoints (refresh, batch jobs, status and /metrics); empty disables them
+    admin_token: str = os.getenv("ADMIN_TOKEN", "")
+
+    # Password hashing
+    bcrypt_rounds: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    password_hash_workers: int = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+    password_hash_concurrency: int = int(os.getenv("PASSWORD_HASH_CONCURRENCY", "8"))
 
     # NewsAPI
     newsapi_key: str = os.getenv("NEWSAPI_KEY", "")
+    newsapi_max_connections: int = int(os.getenv("NEWSAPI_MAX_CONNECTIONS", "10"))
+    newsapi_http2: bool = os.getenv("NEWSAPI_HTTP2", "false").lower() == "true"
+    newsapi_concurrency: int = int(os.getenv("NEWSAPI_CONCURRENCY", "4"))
+    newsapi_pages_per_query: int = int(os.getenv("NEWSAPI_PAGES_PER_QUERY", "1"))
+    newsapi_page_size: int = int(os.getenv("NEWSAPI_PAGE_SIZE", "30"))
+    # Request budget per day, retries with backoff and the circuit breaker
+    # that stops calls after repeated failures. Unset, the budget is derived
+    # from the schedule: topic queries x pages per query x refreshes a day
+    # (24h / NEWS_REFRESH_INTERVAL_MINUTES), doubled for retries and
+    # revalidations, i.e. 5 x 1 x 24 x 2 = 240 with the defaults; see
+    # news.default_daily_quota. 0 disables it. The free plan allows 100 a
+    # day: set it to 100 and the refresh interval to 180 minutes or more.
+    newsapi_daily_quota: Optional[int] = (
+        int(os.environ["NEWSAPI_DAILY_QUOTA"]) if os.getenv("NEWSAPI_DAILY_QUOTA") else None
+    )
+    newsapi_burst: int = int(os.getenv("NEWSAPI_BURST", "10"))
+    newsapi_max_retries: int = int(os.getenv("NEWSAPI_MAX_RETRIES", "2"))
+    newsapi_backoff_base_seconds: float = float(os.getenv("NEWSAPI_BACKOFF_BASE_SECONDS", "1"))
+    newsapi_backoff_max_seconds: float = float(os.getenv("NEWSAPI_BACKOFF_MAX_SECONDS", "30"))
+    newsapi_breaker_failures: int = int(os.getenv("NEWSAPI_BREAKER_FAILURES", "5"))
+    newsapi_breaker_reset_seconds: float = float(os.getenv("NEWSAPI_BREAKER_RESET_SECONDS", "300"))
+
+    # Background news ingestion
+    news_ingestion_enabled: bool = os.getenv("NEWS_INGESTION_ENABLED", "true").lower() == "true"
+    news_refresh_interval_minutes: float = float(os.getenv("NEWS_REFRESH_INTERVAL_MINUTES", "60"))
+    news_refresh_jitter_seconds: float = float(os.getenv("NEWS_REFRESH_JITTER_SECONDS", "120"))
+    # Feeds older than this are flagged stale (X-News-Stale) and trigger a
+    # background refresh, at most every NEWS_REVALIDATE_MIN_SECONDS per worker
+    news_stale_after_minutes: float = float(os.getenv("NEWS_STALE_AFTER_MINUTES", "120"))
+    news_revalidate_min_seconds: float = float(os.getenv("NEWS_REVALIDATE_MIN_SECONDS", "300"))
+    # Lock file shared by all workers on a host so only one refreshes at a time
+    news_refresh_lock_path: str = os.getenv("NEWS_REFRESH_LOCK_PATH", "./okto-news-refresh.lock")
+
+    # cached_news retention and compaction (0 disables a limit)
+    maintenance_enabled: bool = os.getenv("MAINTENANCE_ENABLED", "true").lower() == "true"
+    maintenance_interval_hours: float = float(os.getenv("MAINTENANCE_INTERVAL_HOURS", "24"))
+    maintenance_lock_path: str = os.getenv("MAINTENANCE_LOCK_PATH", "./okto-maintenance.lock")
+    retention_max_age_days: int = int(os.getenv("RETENTION_MAX_AGE_DAYS", "30"))
+    retention_max_rows_per_category: int = int(os.getenv("RETENTION_MAX_ROWS_PER_CATEGORY", "0"))
+    retention_chunk_size: int = int(os.getenv("RETENTION_CHUNK_SIZE", "1000"))
+    retention_archive_dir: str = os.getenv("RETENTION_ARCHIVE_DIR", "")
+    vacuum_interval_hours: float = float(os.getenv("VACUUM_INTERVAL_HOURS", "168"))
+
+    # Per-user feed cache
+    feed_cache_max_entries: int = int(os.getenv("FEED_CACHE_MAX_ENTRIES", "10000"))
+    feed_cache_ttl_seconds: float = float(os.getenv("FEED_CACHE_TTL_SECONDS", "300"))
+
+    # Per-user profile snapshots for /insights/{user_id}. Profile updates drop
+    # the updating worker's entry; other workers see the change within the TTL
+    profile_snapshot_max_entries: int = int(os.getenv("PROFILE_SNAPSHOT_MAX_ENTRIES", "10000"))
+    profile_snapshot_ttl_seconds: float = float(os.getenv("PROFILE_SNAPSHOT_TTL_SECONDS", "60"))
+
+    # Near-duplicate detection at ingest (estimated Jaccard similarity of the words)
+    dedup_enabled: bool = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+    dedup_threshold: float = float(os.getenv("DEDUP_THRESHOLD", "0.7"))
+
+    # Relevance-ranked feed (/news/feed?sort=relevance)
+    ranking_candidates: int = int(os.getenv("RANKING_CANDIDATES", "300"))
+    ranking_half_life_hours: float = float(os.getenv("RANKING_HALF_LIFE_HOURS", "24"))
+
+    # Breaking news push channel (server-sent events)
+    breaking_news_enabled: bool = os.getenv("BREAKING_NEWS_ENABLED", "true").lower() == "true"
+    breaking_news_poll_seconds: float = float(os.getenv("BREAKING_NEWS_POLL_SECONDS", "5"))
+    breaking_news_heartbeat_seconds: float = float(os.getenv("BREAKING_NEWS_HEARTBEAT_SECONDS", "25"))
+    breaking_news_queue_size: int = int(os.getenv("BREAKING_NEWS_QUEUE_SIZE", "100"))
+    breaking_news_max_connections: int = int(os.getenv("BREAKING_NEWS_MAX_CONNECTIONS", "1000"))
+    breaking_news_replay_limit: int = int(os.getenv("BREAKING_NEWS_REPLAY_LIMIT", "50"))
+
+    # Daily digest batch job
+    digest_enabled: bool = os.getenv("DIGEST_ENABLED", "true").lower() == "true"
+    digest_hour_utc: int = int(os.getenv("DIGEST_HOUR_UTC", "6"))
+    digest_size: int = int(os.getenv("DIGEST_SIZE", "10"))
+    digest_window_hours: float = float(os.getenv("DIGEST_WINDOW_HOURS", "24"))
+    digest_max_per_topic: int = int(os.getenv("DIGEST_MAX_PER_TOPIC", "4"))
+    digest_workers: int = int(os.getenv("DIGEST_WORKERS", "0"))  # Process pool size for scoring; 0 scores inline
+    digest_lock_path: str = os.getenv("DIGEST_LOCK_PATH", "./okto-digest.lock")
+
+    # Response compression (brotli is used when the package is installed)
+    compression_enabled: bool = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+    compression_minimum_size: int = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+    compression_gzip_level: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    compression_brotli_quality: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+    compression_cache_max_bytes: int = int(os.getenv("COMPRESSION_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+    # Request metrics on /metrics (Prometheus text format)
+    metrics_enabled: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+    # Slow-request log and on-demand profiling (X-Okto-Profile: <PROFILING_TOKEN>)
+    slow_request_log_enabled: bool = os.getenv("SLOW_REQUEST_LOG_ENABLED", "true").lower() == "true"
+    slow_request_seconds: float = float(os.getenv("SLOW_REQUEST_SECONDS", "1.0"))
+    slow_request_log_path: str = os.getenv("SLOW_REQUEST_LOG_PATH", "./okto-slow-requests.log")
+    slow_request_log_max_bytes: int = int(os.getenv("SLOW_REQUEST_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+    slow_request_log_backups: int = int(os.getenv("SLOW_REQUEST_LOG_BACKUPS", "5"))
+    profiling_sample_rate: float = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))  # Share of requests to profile
+    profiling_token: str = os.getenv("PROFILING_TOKEN", "")  # Empty disables the header
+    profiling_interval_ms: float = float(os.getenv("PROFILING_INTERVAL_MS", "5"))
 
     # App
     app_name: str = "Okto API"
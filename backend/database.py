@@ -0,0 +1,74 @@
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from config import settings
+from migrations import MigrationReport, migrate
+from models import Base
+from search import create_search_index
+from singleflight import FileLease
+
+# Map sync driver URLs (as found in .env files) onto their async drivers
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+
+def to_async_url(url: str) -> str:
+    """Rewrite a database URL so it uses an async driver."""
+    scheme, sep, rest = url.partition("://")
+    if not sep:
+        return url
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}://{rest}"
+
+
+def create_engine_from_settings():
+    """Create the async engine configured by `settings`."""
+    url = to_async_url(settings.database_url)
+    if url.startswith("sqlite"):
+        # SQLite has no real connection pool; aiosqlite runs each
+        # connection on its own thread so check_same_thread must be off.
+        return create_async_engine(
+            url,
+            connect_args={"check_same_thread": False},
+        )
+
+    return create_async_engine(
+        url,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_pre_ping=True,
+    )
+
+
+engine = create_engine_from_settings()
+SessionLocal = async_sessionmaker(
+    bind=engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+
+async def init_db() -> MigrationReport:
+    """
+    Create all tables and the full-text search index, and bring tables
+    created by an older version up to date (see migrations.py).
+    """
+    lease = FileLease(settings.migration_lock_path)
+    await lease.acquire()
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(create_search_index)
+        return await migrate(engine, SessionLocal)
+    finally:
+        lease.release()
+
+
+# Dependency to get DB session
+async def get_db():
+    async with SessionLocal() as db:
+        yield db
@@ -0,0 +1,161 @@
+import hashlib
+import re
+import struct
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import ArticleBand, CachedNews
+
+# MinHash signature of NUM_HASHES values, split into BANDS bands of ROWS
+# values for LSH. Articles whose word sets have Jaccard similarity s share
+# at least one band with probability 1 - (1 - s**ROWS)**BANDS: about 99%
+# at s = 0.7 and 12% at s = 0.3, so lookups only touch likely duplicates.
+NUM_HASHES = 64
+BANDS = 16
+ROWS = NUM_HASHES // BANDS
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+# Fixed coefficients so signatures are comparable across processes and restarts
+_COEFFICIENTS = [
+    (
+        int.from_bytes(hashlib.blake2b(f"a{i}".encode(), digest_size=8).digest(), "big") % (_PRIME - 1) + 1,
+        int.from_bytes(hashlib.blake2b(f"b{i}".encode(), digest_size=8).digest(), "big") % _PRIME,
+    )
+    for i in range(NUM_HASHES)
+]
+_SIGNATURE = struct.Struct(f"<{NUM_HASHES}I")
+
+# Shorter texts share too many words by chance to be compared safely
+MIN_SHINGLES = 8
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+# NewsAPI titles end with " - Outlet", which differs between syndicated copies
+_TITLE_SUFFIX = re.compile(r"\s+[-|–]\s+[^-|–]{1,60}$")
+
+
+def shingles(title: Optional[str], description: Optional[str]) -> Set[str]:
+    """Set of lowercased words in the title (without outlet suffix) and description."""
+    title = _TITLE_SUFFIX.sub("", title or "")
+    return set(_TOKEN_PATTERN.findall(f"{title} {description or ''}".lower()))
+
+
+def _token_hash(token: str) -> int:
+    # Stable across processes, unlike hash()
+    return int.from_bytes(hashlib.blake2b(token.encode(), digest_size=4).digest(), "big")
+
+
+def minhash(title: Optional[str], description: Optional[str]) -> Optional[bytes]:
+    """
+    MinHash signature of an article's title and description, packed as bytes.
+
+    Returns None when there is too little text to compare.
+    """
+    words = shingles(title, description)
+    if len(words) < MIN_SHINGLES:
+        return None
+    tokens = [_token_hash(token) for token in words]
+    return _SIGNATURE.pack(*(
+        min((a * x + b) % _PRIME for x in tokens) & _MAX_HASH
+        for a, b in _COEFFICIENTS
+    ))
+
+
+def similarity(a: bytes, b: bytes) -> float:
+    """Estimated Jaccard similarity of the word sets behind two signatures."""
+    return sum(x == y for x, y in zip(_SIGNATURE.unpack(a), _SIGNATURE.unpack(b))) / NUM_HASHES
+
+
+def band_keys(signature: bytes) -> List[int]:
+    """LSH bucket of each band, as signed 64-bit keys."""
+    width = ROWS * 4
+    return [
+        int.from_bytes(
+            hashlib.blake2b(bytes([band]) + signature[band * width:(band + 1) * width], digest_size=8).digest(),
+            "big",
+            signed=True
+        )
+        for band in range(BANDS)
+    ]
+
+
+def band_rows(article_id: int, signature: bytes) -> List[dict]:
+    """article_bands rows for one article."""
+    return [{"band_key": key, "article_id": article_id} for key in band_keys(signature)]
+
+
+class BatchIndex:
+    """In-memory LSH index for near-duplicates within one ingest batch."""
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self._buckets: Dict[int, List[Tuple[bytes, str]]] = {}
+
+    def find(self, signature: bytes) -> Optional[Tuple[str, float]]:
+        """Most similar (key, similarity) at or above `threshold`, if any."""
+        best = None
+        for band_key in band_keys(signature):
+            for other, key in self._buckets.get(band_key, ()):
+                score = similarity(signature, other)
+                if score >= self.threshold and (best is None or score > best[1]):
+                    best = (key, score)
+        return best
+
+    def add(self, signature: bytes, key: str) -> None:
+        for band_key in band_keys(signature):
+            self._buckets.setdefault(band_key, []).append((signature, key))
+
+
+async def find_canonicals(
+    db: AsyncSession,
+    signatures: Dict[str, bytes],
+    threshold: float
+) -> Dict[str, Tuple[int, float]]:
+    """
+    Find cached articles that are near-duplicates of new ones.
+
+    One indexed lookup on article_bands per chunk of band keys for the
+    whole batch, then a similarity check against the candidates only.
+
+    Args:
+        db: Database session
+        signatures: MinHash signature per URL of the new articles
+        threshold: Smallest estimated Jaccard similarity that counts as a duplicate
+
+    Returns:
+        (canonical article id, similarity) per URL that has a duplicate; the
+        most similar article wins, then the oldest
+    """
+    keys_by_url = {url: band_keys(signature) for url, signature in signatures.items()}
+    all_keys = sorted({key for keys in keys_by_url.values() for key in keys})
+    if not all_keys:
+        return {}
+
+    # Imported here: news imports this module
+    from news import chunked
+
+    candidates: Dict[int, List[Tuple[int, bytes]]] = {}
+    for chunk in chunked(all_keys, 500):
+        rows = await db.execute(
+            select(ArticleBand.band_key, CachedNews.id, CachedNews.minhash).join(
+                CachedNews, CachedNews.id == ArticleBand.article_id
+            ).filter(ArticleBand.band_key.in_(chunk))
+        )
+        for band_key, article_id, signature in rows:
+            candidates.setdefault(band_key, []).append((article_id, signature))
+
+    matches = {}
+    for url, keys in keys_by_url.items():
+        best = None
+        for key in keys:
+            for article_id, signature in candidates.get(key, ()):
+                score = similarity(signatures[url], signature)
+                if score < threshold:
+                    continue
+                if best is None or (-score, article_id) < (-best[1], best[0]):
+                    best = (article_id, score)
+        if best is not None:
+            matches[url] = best
+    return matches
@@ -0,0 +1,326 @@
+import argparse
+import asyncio
+import logging
+import random
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, time as dt_time, timedelta
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, insert, select
+
+from models import CachedNews, DailyDigest, Profile
+from resilience import utc_timestamp
+from singleflight import FileLease
+from topics import profile_topic_mask, topic_bits
+
+logger = logging.getLogger(__name__)
+
+# (id, topic_mask, published_at as a POSIX timestamp)
+ArticleSignal = Tuple[int, int, float]
+
+
+@dataclass
+class DigestOptions:
+    """How digests are built."""
+    size: int = 10  # Articles per digest
+    window_hours: float = 24.0  # How far back "the day's articles" reach
+    max_per_topic: int = 4  # Cap per topic before filling with the rest
+    freshness_half_life_hours: float = 12.0
+    workers: int = 0  # Score groups on a process pool when > 1
+    chunk_size: int = 1000  # Digest rows per INSERT
+
+
+@dataclass
+class DigestReport:
+    """Outcome of one digest run."""
+    digest_date: str = ""
+    users: int = 0
+    groups: int = 0
+    articles: int = 0
+    rows_written: int = 0
+    empty_digests: int = 0
+    seconds: float = 0.0
+    users_per_second: float = 0.0
+
+
+def score_group(
+    group_mask: int,
+    articles: List[ArticleSignal],
+    now: float,
+    options: DigestOptions
+) -> List[int]:
+    """
+    Pick the digest articles for one interest signature, best first.
+
+    Articles score one point per matching interest plus a freshness bonus
+    that halves every `freshness_half_life_hours`. No topic gets more than
+    `max_per_topic` articles unless there is nothing else to show.
+
+    Pure and picklable so it can run on a process pool.
+    """
+    half_life = options.freshness_half_life_hours * 3600
+    scored = []
+    for article_id, mask, published_at in articles:
+        matched = mask & group_mask
+        if not matched:
+            continue
+        freshness = 0.5 ** (max(now - published_at, 0.0) / half_life)
+        scored.append((bin(matched).count("1") + freshness, article_id, matched))
+    scored.sort(reverse=True)
+
+    picked: List[int] = []
+    skipped: List[int] = []
+    per_topic: Dict[int, int] = defaultdict(int)
+    for _, article_id, matched in scored:
+        if len(picked) >= options.size:
+            break
+        bits = topic_bits(matched)
+        if all(per_topic[bit] >= options.max_per_topic for bit in bits):
+            skipped.append(article_id)
+            continue
+        picked.append(article_id)
+        for bit in bits:
+            per_topic[bit] += 1
+
+    picked.extend(skipped[:options.size - len(picked)])
+    return picked
+
+
+async def load_subscribers(db) -> Dict[int, List[int]]:
+    """User ids with daily_digest on, grouped by interest signature (topic mask)."""
+    rows = await db.execute(
+        select(
+            Profile.user_id, Profile.age, Profile.housing_type,
+            Profile.num_loans, Profile.vehicle_type, Profile.savings_types,
+        ).filter(Profile.daily_digest.is_(True))
+    )
+    groups: Dict[int, List[int]] = defaultdict(list)
+    for row in rows:
+        groups[profile_topic_mask(row._mapping)].append(row.user_id)
+    return groups
+
+
+async def load_articles(db, since: datetime, until: datetime) -> List[ArticleSignal]:
+    """Tagged articles published in [since, until)."""
+    rows = await db.execute(
+        select(CachedNews.id, CachedNews.topic_mask, CachedNews.published_at).filter(
+            CachedNews.published_at >= since,
+            CachedNews.published_at < until,
+            CachedNews.topic_mask != 0
+        )
+    )
+    # Naive datetimes are UTC; .timestamp() would read them as local time
+    return [(row.id, row.topic_mask, utc_timestamp(row.published_at)) for row in rows]
+
+
+async def score_groups(
+    masks: List[int],
+    articles: List[ArticleSignal],
+    now: float,
+    options: DigestOptions
+) -> Dict[int, List[int]]:
+    """Run `score_group` for every signature, on a process pool if configured."""
+    score = partial(score_group, articles=articles, now=now, options=options)
+    if options.workers <= 1 or len(masks) <= 1:
+        return {mask: score(mask) for mask in masks}
+
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(max_workers=options.workers) as pool:
+        results = await asyncio.gather(
+            *(loop.run_in_executor(pool, score, mask) for mask in masks)
+        )
+    return dict(zip(masks, results))
+
+
+async def build_digests(
+    session_factory,
+    options: DigestOptions,
+    digest_date: Optional[date] = None
+) -> DigestReport:
+    """
+    Build the digests of every daily_digest subscriber for a day.
+
+    Profiles and articles are loaded once, users are grouped by interest
+    signature and each group is scored once. Existing digests for the day
+    are replaced in the same transaction.
+
+    Args:
+        session_factory: Factory for database sessions
+        options: How digests are built
+        digest_date: Day to build (UTC); today by default
+
+    Returns:
+        Counts and throughput of the run
+    """
+    start = time.perf_counter()
+    now = datetime.utcnow()
+    digest_date = digest_date or now.date()
+    until = min(now, datetime.combine(digest_date + timedelta(days=1), dt_time.min))
+    since = until - timedelta(hours=options.window_hours)
+    report = DigestReport(digest_date=digest_date.isoformat())
+
+    async with session_factory() as db:
+        groups = await load_subscribers(db)
+        articles = await load_articles(db, since, until)
+        report.groups = len(groups)
+        report.articles = len(articles)
+
+        picks = await score_groups(list(groups), articles, utc_timestamp(until), options)
+
+        await db.execute(delete(DailyDigest).filter(DailyDigest.digest_date == digest_date))
+        rows = [
+            {
+                "user_id": user_id,
+                "digest_date": digest_date,
+                "topic_mask": mask,
+                "article_ids": picks[mask],
+                "created_at": now,
+            }
+            for mask, user_ids in groups.items()
+            for user_id in user_ids
+        ]
+        for i in range(0, len(rows), options.chunk_size):
+            await db.execute(insert(DailyDigest), rows[i:i + options.chunk_size])
+        await db.commit()
+
+    report.users = len(rows)
+    report.rows_written = len(rows)
+    report.empty_digests = sum(len(user_ids) for mask, user_ids in groups.items() if not picks[mask])
+    report.seconds = round(time.perf_counter() - start, 3)
+    report.users_per_second = round(report.users / report.seconds, 1) if report.seconds else 0.0
+    return report
+
+
+class DigestTask:
+    """Run `build_digests` once a day at `hour_utc` in the background."""
+
+    def __init__(
+        self,
+        session_factory,
+        options: DigestOptions,
+        hour_utc: int = 6,
+        lock_path: Optional[str] = None
+    ):
+        self.session_factory = session_factory
+        self.options = options
+        self.hour_utc = hour_utc
+        self._lease = FileLease(lock_path) if lock_path else None
+        self._task: Optional[asyncio.Task] = None
+
+        self.runs = 0
+        self.failures = 0
+        self.last_report: Optional[DigestReport] = None
+        self.last_error: Optional[str] = None
+        self.last_finished_at: Optional[datetime] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def seconds_until_next_run(self) -> float:
+        now = datetime.utcnow()
+        next_run = now.replace(hour=self.hour_utc, minute=0, second=0, microsecond=0)
+        if next_run <= now:
+            next_run += timedelta(days=1)
+        return (next_run - now).total_seconds()
+
+    async def run_once(self, digest_date: Optional[date] = None) -> Optional[DigestReport]:
+        """Build digests now. Returns None if another worker is building them."""
+        if self._lease is not None and not self._lease.try_acquire():
+            logger.info("Another worker is building digests, skipping")
+            return None
+
+        self.runs += 1
+        try:
+            report = await build_digests(self.session_factory, self.options, digest_date)
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            logger.error(f"Digest build failed: {e}")
+            raise
+        finally:
+            self.last_finished_at = datetime.utcnow()
+            if self._lease is not None:
+                self._lease.release()
+
+        self.last_error = None
+        self.last_report = report
+        logger.info(
+            f"Built {report.users} digests for {report.digest_date} "
+            f"({report.groups} interest groups, {report.articles} articles) "
+            f"in {report.seconds}s, {report.users_per_second} users/s"
+        )
+        return report
+
+    async def _loop(self) -> None:
+        while True:
+            # Jitter so workers don't all contend for the lease at once
+            await asyncio.sleep(self.seconds_until_next_run() + random.uniform(0, 30))
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                pass  # Already logged and recorded in status
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._loop(), name="daily-digest")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def status(self) -> dict:
+        return {
+            "running": self.running,
+            "hour_utc": self.hour_utc,
+            "seconds_until_next_run": round(self.seconds_until_next_run()),
+            "options": asdict(self.options),
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "last_finished_at": self.last_finished_at.isoformat() if self.last_finished_at else None,
+            "last_report": asdict(self.last_report) if self.last_report else None,
+        }
+
+
+def main() -> None:
+    """Build digests from the command line, e.g. from cron."""
+    from config import settings
+    from database import SessionLocal, engine, init_db
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--date", type=date.fromisoformat, help="UTC day to build (default: today)")
+    parser.add_argument("--workers", type=int, default=settings.digest_workers)
+    args = parser.parse_args()
+
+    options = DigestOptions(
+        size=settings.digest_size,
+        window_hours=settings.digest_window_hours,
+        max_per_topic=settings.digest_max_per_topic,
+        workers=args.workers,
+    )
+
+    async def run():
+        await init_db()
+        report = await build_digests(SessionLocal, options, args.date)
+        await engine.dispose()
+        return report
+
+    print(asdict(asyncio.run(run())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import hashlib
+from typing import Optional
+
+from fastapi import Response
+
+# Feeds are per user and must be revalidated on every refresh; the ETag
+# makes that revalidation a 304 when nothing changed.
+FEED_CACHE_CONTROL = "private, no-cache"
+SOURCES_CACHE_CONTROL = "private, max-age=300, must-revalidate"
+
+
+def make_etag(*parts) -> str:
+    """
+    ETag from the inputs that fully determine a response body.
+
+    Quoted without W/, but CompressionMiddleware weakens it on responses
+    (200s and 304s alike) to clients that accept a compressed encoding, so
+    clients should only rely on weak comparison.
+    """
+    digest = hashlib.sha1(":".join(str(p) for p in parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches the ETag."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so W/ prefixes are ignored
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def set_cache_headers(response: Response, etag: str, cache_control: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    """A 304 response carrying the validators the client needs."""
+    response = Response(status_code=304)
+    set_cache_headers(response, etag, cache_control)
+    return response
@@ -0,0 +1,320 @@
+import hashlib
+import operator
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from sqlalchemy import delete, insert, select
+
+from config import settings
+from feed_cache import FeedCache
+from models import Profile, ProfileInsight
+
+try:
+    import numpy as np
+except ImportError:  # Optional: batch evaluation falls back to plain lists
+    np = None
+
+# Profile columns rules may refer to
+PROFILE_FIELDS = (
+    "num_loans",
+    "total_debt",
+    "interest_rate_type",
+    "vehicle_type",
+    "housing_type",
+    "housing_value",
+    "annual_gross_income",
+    "age",
+)
+
+Condition = Tuple[str, str, Any]  # (profile field, operator, value)
+
+
+@dataclass(frozen=True)
+class Rule:
+    """An insight shown to every profile matching all `conditions`."""
+    id: str  # Key in profile_insights and /insights/rules; not sent with the insight
+    title: str
+    description: str
+    type: str  # "opportunity", "benefit", "market"
+    conditions: Tuple[Condition, ...] = field(default_factory=tuple)
+
+
+RULES = (
+    Rule(
+        id="loan_refinance",
+        title="Loan Opportunity",
+        description="Interest rates are dropping. Consider refinancing your loans for better terms.",
+        type="opportunity",
+        conditions=(("num_loans", ">", 0),),
+    ),
+    Rule(
+        id="ev_tax_benefits",
+        title="EV Tax Benefits",
+        description="New EV tax benefits are available. You may be eligible for additional deductions.",
+        type="benefit",
+        conditions=(("vehicle_type", "==", "Elbil"),),
+    ),
+    Rule(
+        id="cooperative_housing_market",
+        title="Housing Market Update",
+        description="Co-housing properties in your region have increased in value by 4.2% this quarter.",
+        type="market",
+        conditions=(("housing_type", "==", "Andelsbolig"),),
+    ),
+)
+
+
+_OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "in": lambda a, b: a in b,
+    "not in": lambda a, b: a not in b,
+}
+
+
+def compile_condition(condition: Condition) -> Callable[[dict], bool]:
+    """Turn one condition into a predicate. Missing (None) fields never match."""
+    name, op, value = condition
+    if op not in _OPERATORS:
+        raise ValueError(f"Unknown operator {op!r} in condition on {name}")
+    if name not in PROFILE_FIELDS:
+        raise ValueError(f"Unknown profile field {name!r}")
+    compare = _OPERATORS[op]
+    if op in ("in", "not in"):
+        value = frozenset(value)
+
+    def predicate(profile: dict) -> bool:
+        actual = profile.get(name)
+        return actual is not None and compare(actual, value)
+    return predicate
+
+
+class RuleEngine:
+    """
+    Rules compiled once into predicates.
+
+    `evaluate` checks one profile snapshot; `evaluate_columns` checks many
+    profiles at once over column arrays, computing each distinct condition
+    once for all rows.
+    """
+
+    def __init__(self, rules: Sequence[Rule]):
+        self.rules = list(rules)
+        ids = [rule.id for rule in self.rules]
+        if len(set(ids)) != len(ids):
+            raise ValueError("Rule ids must be unique")
+        self._predicates = [
+            (rule, [compile_condition(c) for c in rule.conditions])
+            for rule in self.rules
+        ]
+        self.by_id = {rule.id: rule for rule in self.rules}
+        # Changes with any rule, so stored batch results of older rules are ignored
+        self.version = hashlib.sha1(repr(self.rules).encode()).hexdigest()[:16]
+
+    def evaluate(self, profile: dict) -> List[Rule]:
+        """Rules matching one profile snapshot, in rule order."""
+        return [
+            rule for rule, predicates in self._predicates
+            if all(predicate(profile) for predicate in predicates)
+        ]
+
+    def evaluate_columns(self, columns: Dict[str, list]) -> Dict[str, List[bool]]:
+        """
+        Match every rule against many profiles given as columns.
+
+        Args:
+            columns: One list per profile field, all the same length
+
+        Returns:
+            A list of booleans per rule id, one per row
+        """
+        rows = len(next(iter(columns.values()), []))
+        arrays = {name: _as_array(column) for name, column in columns.items()}
+
+        masks: Dict[tuple, Any] = {}
+        results = {}
+        for rule in self.rules:
+            combined = _ones(rows)
+            for condition in rule.conditions:
+                key = _condition_key(condition)
+                if key not in masks:
+                    masks[key] = _column_mask(arrays[condition[0]], condition)
+                combined = _and(combined, masks[key])
+            results[rule.id] = combined.tolist() if np is not None else combined
+        return results
+
+
+def _condition_key(condition: Condition) -> tuple:
+    name, op, value = condition
+    return (name, op, tuple(value) if isinstance(value, (list, tuple, set, frozenset)) else value)
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+if np is not None:
+    _NUMPY_OPERATORS = {
+        "==": np.equal,
+        "!=": np.not_equal,
+        ">": np.greater,
+        ">=": np.greater_equal,
+        "<": np.less,
+        "<=": np.less_equal,
+    }
+
+
+def _as_array(column: list):
+    """A float array (NaN for missing) for numeric columns, else the list itself."""
+    if np is not None and all(v is None or _is_number(v) for v in column):
+        return np.array([np.nan if v is None else v for v in column], dtype=np.float64)
+    return column
+
+
+def _column_mask(column, condition: Condition):
+    _, op, value = condition
+    if np is not None and isinstance(column, np.ndarray) and op in _NUMPY_OPERATORS and _is_number(value):
+        with np.errstate(invalid="ignore"):
+            return ~np.isnan(column) & _NUMPY_OPERATORS[op](column, value)
+
+    compare = _OPERATORS[op]
+    if op in ("in", "not in"):
+        value = frozenset(value)
+    if np is not None and isinstance(column, np.ndarray):
+        column = [None if v != v else v for v in column.tolist()]
+    matches = [v is not None and compare(v, value) for v in column]
+    return np.array(matches, dtype=bool) if np is not None else matches
+
+
+def _and(a, b):
+    if np is not None:
+        return a & b
+    return [x and y for x, y in zip(a, b)]
+
+
+def _ones(rows: int):
+    if np is not None:
+        return np.ones(rows, dtype=bool)
+    return [True] * rows
+
+
+def insight_payload(rule: Rule) -> dict:
+    """The wire format of an insight."""
+    return {
+        "title": rule.title,
+        "description": rule.description,
+        "type": rule.type,
+    }
+
+
+# Compiled at import, i.e. once at startup
+rule_engine = RuleEngine(RULES)
+
+# Profile snapshots by user id, so a hit answers without touching the
+# database. update_profile drops the updating worker's entry; other workers
+# serve the old snapshot for at most the TTL
+profile_snapshots = FeedCache(
+    max_entries=settings.profile_snapshot_max_entries,
+    ttl_seconds=settings.profile_snapshot_ttl_seconds,
+)
+
+
+async def get_user_insights(db, user_id: int) -> List[Rule]:
+    """
+    Rules matching a user's profile.
+
+    Evaluates the rules against the cached profile snapshot. On a miss one
+    query loads the snapshot together with the matches stored by the last
+    `run_insights_batch`, which are used as is when they were computed
+    after the profile's last update and with the current rules.
+    """
+    key = profile_snapshots.key(user_id, None)
+    snapshot = profile_snapshots.get(key)
+    if snapshot is not None:
+        return rule_engine.evaluate(snapshot)
+
+    row = (await db.execute(
+        select(
+            *(getattr(Profile, name) for name in PROFILE_FIELDS),
+            Profile.updated_at,
+            ProfileInsight.rule_ids,
+            ProfileInsight.rules_version,
+            ProfileInsight.computed_at,
+        ).select_from(Profile).outerjoin(
+            ProfileInsight, ProfileInsight.user_id == Profile.user_id
+        ).filter(Profile.user_id == user_id)
+    )).first()
+    if row is None:
+        return []
+
+    snapshot = {name: getattr(row, name) for name in PROFILE_FIELDS}
+    profile_snapshots.set(key, snapshot)
+    if (
+        row.rule_ids is not None
+        and row.rules_version == rule_engine.version
+        and (row.updated_at is None or row.computed_at >= row.updated_at)
+    ):
+        return [rule_engine.by_id[rule_id] for rule_id in row.rule_ids]
+    return rule_engine.evaluate(snapshot)
+
+
+@dataclass
+class InsightsReport:
+    """Outcome of a batch insights run."""
+    profiles: int = 0
+    rows_written: int = 0
+    rule_hits: Dict[str, int] = field(default_factory=dict)
+    seconds: float = 0.0
+    profiles_per_second: float = 0.0
+
+
+async def run_insights_batch(session_factory, chunk_size: int = 1000) -> InsightsReport:
+    """
+    Evaluate every rule against every profile and store the matches.
+
+    Profiles are loaded once as columns and matched with
+    `RuleEngine.evaluate_columns`; profile_insights is replaced in one
+    transaction and serves `get_user_insights` until a profile changes.
+
+    Returns:
+        Per-rule hit counts and throughput
+    """
+    start = time.perf_counter()
+    now = datetime.utcnow()
+    report = InsightsReport()
+
+    async with session_factory() as db:
+        rows = (await db.execute(
+            select(Profile.user_id, *(getattr(Profile, name) for name in PROFILE_FIELDS))
+        )).all()
+        user_ids = [row.user_id for row in rows]
+        columns = {name: [getattr(row, name) for row in rows] for name in PROFILE_FIELDS}
+        matches = rule_engine.evaluate_columns(columns) if rows else {rule.id: [] for rule in rule_engine.rules}
+
+        report.profiles = len(user_ids)
+        report.rule_hits = {rule_id: sum(hits) for rule_id, hits in matches.items()}
+
+        insight_rows = [
+            {
+                "user_id": user_id,
+                "rule_ids": [rule.id for rule in rule_engine.rules if matches[rule.id][i]],
+                "rules_version": rule_engine.version,
+                "computed_at": now,
+            }
+            for i, user_id in enumerate(user_ids)
+        ]
+        await db.execute(delete(ProfileInsight))
+        for i in range(0, len(insight_rows), chunk_size):
+            await db.execute(insert(ProfileInsight), insight_rows[i:i + chunk_size])
+        await db.commit()
+
+    report.rows_written = len(insight_rows)
+    report.seconds = round(time.perf_counter() - start, 3)
+    report.profiles_per_second = round(report.profiles / report.seconds, 1) if report.seconds else 0.0
+    return report
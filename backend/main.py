@@ -1,41 +1,148 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, Header, HTTPException, Query, Response, status
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
-from datetime import timedelta
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from dataclasses import asdict
+from datetime import date, datetime, timedelta
 from typing import List, Optional
 import logging
 
 from config import settings
-from models import Base, User, Profile, CachedNews
+from models import User, Profile, CachedNews, DailyDigest
+from database import SessionLocal, engine, get_db, init_db
+from breaking import HEARTBEAT, BreakingNewsHub
+from digest import DigestOptions, DigestTask
+from compression import CompressedCache, CompressionMiddleware
+from feed_cache import feed_cache
+import metrics
+import profiling
+from profiling import span
 from auth import (
-    hash_password,
-    verify_password,
+    hash_password_async,
+    verify_and_update_password,
     create_access_token,
     decode_token,
+    token_cache,
+    verify_admin_token,
+    TokenUser,
     ACCESS_TOKEN_EXPIRE_MINUTES,
 )
-from news import fetch_and_cache_news, get_cached_news, filter_news_for_profile
+from insights import (
+    get_user_insights,
+    insight_payload,
+    profile_snapshots,
+    rule_engine,
+    run_insights_batch,
+)
+from http_cache import (
+    FEED_CACHE_CONTROL,
+    SOURCES_CACHE_CONTROL,
+    etag_matches,
+    make_etag,
+    not_modified,
+    set_cache_headers,
+)
+from news import (
+    get_articles_json,
+    get_feed_page_json,
+    get_ingest_generation,
+    get_ingest_state,
+    get_ranked_feed_json,
+    newsapi_client,
+    NewsAPIError,
+    NewsAPIUnavailable,
+)
+from maintenance import MaintenanceTask, RetentionPolicy
+from scheduler import NewsIngestionScheduler
+from search import search_articles
+from serialization import dumps, json_array
+from ranking import profile_vector
+from topics import profile_topic_mask
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Database setup
-engine = create_engine(
-    settings.database_url,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.database_url else {}
+# Background news ingestion
+ingestion = NewsIngestionScheduler(
+    SessionLocal,
+    interval_seconds=settings.news_refresh_interval_minutes * 60,
+    jitter_seconds=settings.news_refresh_jitter_seconds,
+    lock_path=settings.news_refresh_lock_path,
+)
+
+# cached_news retention and compaction
+maintenance = MaintenanceTask(
+    SessionLocal,
+    engine,
+    RetentionPolicy(
+        max_age_days=settings.retention_max_age_days,
+        max_rows_per_category=settings.retention_max_rows_per_category,
+        chunk_size=settings.retention_chunk_size,
+        archive_dir=settings.retention_archive_dir,
+        vacuum_interval_hours=settings.vacuum_interval_hours,
+    ),
+    interval_seconds=settings.maintenance_interval_hours * 3600,
+    lock_path=settings.maintenance_lock_path,
 )
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# Push channel for breaking news
+breaking_news = BreakingNewsHub(
+    SessionLocal,
+    poll_seconds=settings.breaking_news_poll_seconds,
+    queue_size=settings.breaking_news_queue_size,
+    max_connections=settings.breaking_news_max_connections,
+    replay_limit=settings.breaking_news_replay_limit,
+)
+
+# Daily digests for daily_digest subscribers
+digests = DigestTask(
+    SessionLocal,
+    DigestOptions(
+        size=settings.digest_size,
+        window_hours=settings.digest_window_hours,
+        max_per_topic=settings.digest_max_per_topic,
+        workers=settings.digest_workers,
+    ),
+    hour_utc=settings.digest_hour_utc,
+    lock_path=settings.digest_lock_path,
+)
+
+# Report of the last /insights/batch run in this worker
+last_insights_report = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create tables
+    await init_db()
+    await newsapi_client.start()
+    if settings.news_ingestion_enabled:
+        ingestion.start()
+    if settings.maintenance_enabled:
+        maintenance.start()
+    if settings.breaking_news_enabled:
+        breaking_news.start()
+    if settings.digest_enabled:
+        digests.start()
+    yield
+    await digests.stop()
+    await breaking_news.stop()
+    await maintenance.stop()
+    await ingestion.stop()
+    await newsapi_client.aclose()
+    await engine.dispose()
+
 
 # FastAPI app
 app = FastAPI(
     title=settings.app_name,
     version=settings.app_version,
-    debug=settings.debug
+    debug=settings.debug,
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -45,20 +152,69 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "X-News-Stale", "X-News-Refreshed-At"],
 )
 
+# Compress JSON responses for clients that accept it; feed and sources
+# bodies carry ETags, so their compressed bytes are reused across clients
+compressed_cache = CompressedCache(max_bytes=settings.compression_cache_max_bytes)
+if settings.compression_enabled:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_minimum_size,
+        gzip_level=settings.compression_gzip_level,
+        brotli_quality=settings.compression_brotli_quality,
+        cache=compressed_cache,
+    )
 
-# Dependency to get DB session
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Slow-request log with phase timings and SQL, plus sampled stack profiles
+# of requests picked by PROFILING_SAMPLE_RATE or the admin header
+if settings.slow_request_log_enabled:
+    profiling.instrument_engine(engine)
+    app.add_middleware(
+        profiling.ProfilingMiddleware,
+        log=profiling.slow_request_logger(
+            settings.slow_request_log_path,
+            max_bytes=settings.slow_request_log_max_bytes,
+            backups=settings.slow_request_log_backups,
+        ),
+        slow_seconds=settings.slow_request_seconds,
+        sample_rate=settings.profiling_sample_rate,
+        token=settings.profiling_token,
+        interval_seconds=settings.profiling_interval_ms / 1000,
+    )
+
+# Per-route request metrics; added last so it times the whole stack
+if settings.metrics_enabled:
+    metrics.instrument_engine(engine)
+    metrics.register_cache("feed", feed_cache)
+    metrics.register_cache("profile_snapshots", profile_snapshots)
+    metrics.register_cache("token", token_cache)
+    if settings.compression_enabled:
+        metrics.register_cache("compressed", compressed_cache)
+    metrics.registry.callback(
+        "okto_newsapi_circuit_open",
+        "1 while the NewsAPI circuit breaker refuses calls",
+        (),
+        lambda: [((), 1 if newsapi_client.breaker.retry_in() > 0 else 0)],
+    )
+    metrics.registry.callback(
+        "okto_newsapi_quota_tokens",
+        "NewsAPI requests left in this worker's view of the budget",
+        (),
+        lambda: [((), newsapi_client.quota.state()[0])] if newsapi_client.quota else [],
+    )
+    metrics.registry.callback(
+        "okto_breaking_news_connections",
+        "Open breaking news streams",
+        (),
+        lambda: [((), breaking_news.stats()["connections"])],
+    )
+    app.add_middleware(metrics.MetricsMiddleware)
 
 
 # ============= SCHEMAS =============
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 from typing import Optional, List
 
 
@@ -110,6 +266,16 @@ class NewsArticle(BaseModel):
     category: str
     author: Optional[str] = None
 
+    @field_validator("published_at", mode="before")
+    @classmethod
+    def format_published_at(cls, value):
+        return value.isoformat() if isinstance(value, datetime) else value
+
+    @field_validator("source", "title", "description", mode="before")
+    @classmethod
+    def default_empty(cls, value):
+        return value or ""
+
     class Config:
         from_attributes = True
 
@@ -123,10 +289,12 @@ async def health_check():
 
 
 @app.post("/auth/signup", response_model=TokenResponse)
-async def signup(user_data: UserSignup, db: Session = Depends(get_db)):
+async def signup(user_data: UserSignup, db: AsyncSession = Depends(get_db)):
     """Sign up a new user."""
     # Check if user already exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    existing_user = (await db.execute(
+        select(User).filter(User.email == user_data.email)
+    )).scalar_one_or_none()
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -134,7 +302,7 @@ async def signup(user_data: UserSignup, db: Session = Depends(get_db)):
         )
 
     # Create new user
-    hashed_password = hash_password(user_data.password)
+    hashed_password = await hash_password_async(user_data.password)
     new_user = User(
         email=user_data.email,
         first_name=user_data.first_name,
@@ -142,17 +310,20 @@ async def signup(user_data: UserSignup, db: Session = Depends(get_db)):
         hashed_password=hashed_password,
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
+    # SQLite reuses the id of a deleted last row; drop tokens cached for
+    # the previous owner so they can't authenticate as the new user
+    token_cache.evict_user(new_user.id)
 
     # Create empty profile
     profile = Profile(user_id=new_user.id)
     db.add(profile)
-    db.commit()
+    await db.commit()
 
     # Create access token
     access_token = create_access_token(
-        data={"sub": new_user.email},
+        data={"sub": new_user.email, "uid": new_user.id},
         expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     )
 
@@ -164,18 +335,34 @@ async def signup(user_data: UserSignup, db: Session = Depends(get_db)):
 
 
 @app.post("/auth/login", response_model=TokenResponse)
-async def login(user_data: UserLogin, db: Session = Depends(get_db)):
+async def login(user_data: UserLogin, db: AsyncSession = Depends(get_db)):
     """Log in a user."""
-    user = db.query(User).filter(User.email == user_data.email).first()
+    user = (await db.execute(
+        select(User).filter(User.email == user_data.email)
+    )).scalar_one_or_none()
 
-    if not user or not verify_password(user_data.password, user.hashed_password):
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid email or password"
+        )
+
+    valid, new_hash = await verify_and_update_password(
+        user_data.password, user.hashed_password
+    )
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password"
         )
 
+    # Transparently upgrade hashes made with a different cost factor
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+
     access_token = create_access_token(
-        data={"sub": user.email},
+        data={"sub": user.email, "uid": user.id},
         expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     )
 
@@ -186,9 +373,19 @@ async def login(user_data: UserLogin, db: Session = Depends(get_db)):
     }
 
 
-def get_user_from_token(token: str, db: Session) -> User:
-    """Get user from JWT token."""
-    payload = decode_token(token)
+async def get_user_from_token(token: str, db: AsyncSession) -> TokenUser:
+    """
+    Get user from JWT token.
+
+    Verified tokens are cached until they expire, so the common path does
+    no JWT decoding or database work.
+    """
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached
+
+    with span("jwt_decode"):
+        payload = decode_token(token)
     if payload is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -196,21 +393,51 @@ def get_user_from_token(token: str, db: Session) -> User:
         )
 
     email = payload.get("sub")
-    user = db.query(User).filter(User.email == email).first()
-
-    if not user:
+    user_id = payload.get("uid")
+    if user_id is not None:
+        row = (await db.execute(
+            select(User.id, User.email).filter(User.id == user_id)
+        )).first()
+        # The email check rejects tokens issued before an email change
+        if row and row.email != email:
+            row = None
+    else:
+        # Tokens issued before the uid claim was added
+        row = (await db.execute(
+            select(User.id, User.email).filter(User.email == email)
+        )).first()
+
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
         )
 
+    user = TokenUser(id=row.id, email=row.email)
+    token_cache.put(token, user, payload.get("exp", 0))
     return user
 
 
+def require_admin(token: str) -> None:
+    """Reject the request unless `token` is the configured ADMIN_TOKEN."""
+    if not verify_admin_token(token):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized"
+        )
+
+
 @app.get("/users/me")
-async def get_current_user(token: str, db: Session = Depends(get_db)):
+async def get_current_user(token: str, db: AsyncSession = Depends(get_db)):
     """Get current authenticated user."""
-    user = get_user_from_token(token, db)
+    token_user = await get_user_from_token(token, db)
+    user = await db.get(User, token_user.id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found"
+        )
+
     return {
         "id": user.id,
         "email": user.email,
@@ -220,16 +447,18 @@ async def get_current_user(token: str, db: Session = Depends(get_db)):
 
 
 @app.get("/users/{user_id}/profile")
-async def get_profile(user_id: int, token: str, db: Session = Depends(get_db)):
+async def get_profile(user_id: int, token: str, db: AsyncSession = Depends(get_db)):
     """Get user profile."""
-    user = get_user_from_token(token, db)
+    user = await get_user_from_token(token, db)
     if user.id != user_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized"
         )
 
-    profile = db.query(Profile).filter(Profile.user_id == user_id).first()
+    profile = (await db.execute(
+        select(Profile).filter(Profile.user_id == user_id)
+    )).scalar_one_or_none()
     if not profile:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -263,17 +492,19 @@ async def update_profile(
     user_id: int,
     profile_data: ProfileUpdate,
     token: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update user profile."""
-    user = get_user_from_token(token, db)
+    user = await get_user_from_token(token, db)
     if user.id != user_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized"
         )
 
-    profile = db.query(Profile).filter(Profile.user_id == user_id).first()
+    profile = (await db.execute(
+        select(Profile).filter(Profile.user_id == user_id)
+    )).scalar_one_or_none()
     if not profile:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -284,61 +515,255 @@ async def update_profile(
     for key, value in profile_data.model_dump(exclude_unset=True).items():
         setattr(profile, key, value)
 
-    db.commit()
-    db.refresh(profile)
+    await db.commit()
+    await db.refresh(profile)
+    feed_cache.invalidate_user(user_id)
+    profile_snapshots.invalidate_user(user_id)
+    breaking_news.update_user(
+        user_id,
+        profile_mask(profile) if profile.breaking_news else None
+    )
 
     return {"message": "Profile updated successfully"}
 
 
+def profile_data(profile: Optional[Profile]) -> dict:
+    """The profile fields news relevance is derived from."""
+    if not profile:
+        return {}
+    return {
+        "age": profile.age,
+        "housing_type": profile.housing_type,
+        "num_loans": profile.num_loans,
+        "interest_rate_type": profile.interest_rate_type,
+        "vehicle_type": profile.vehicle_type,
+        "savings_types": profile.savings_types,
+        "annual_gross_income": profile.annual_gross_income,
+    }
+
+
+def profile_mask(profile: Optional[Profile]) -> int:
+    """Topic bitmask of the news relevant to a profile."""
+    return profile_topic_mask(profile_data(profile))
+
+
 @app.get("/news/feed", response_model=List[NewsArticle])
 async def get_news_feed(
     user_id: int,
     token: str,
-    limit: int = 20,
-    db: Session = Depends(get_db)
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    format: str = "json",
+    sort: str = "recent",
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get personalized news feed for user."""
-    user = get_user_from_token(token, db)
+    """
+    Get personalized news feed for user, newest first.
+
+    Pass the `X-Next-Cursor` response header back as `cursor` to get the
+    next page; the header is absent on the last page.
+
+    `limit` is 1 to 100 articles per page.
+
+    With `format=ndjson` the articles are streamed one JSON object per
+    line as they are read; no cursor is returned.
+
+    With `sort=relevance` the most relevant recent articles are returned
+    as a single page, ranked by how well they match the whole profile.
+
+    The feed is always served from cache. `X-News-Stale: true` means the
+    last successful NewsAPI refresh (`X-News-Refreshed-At`) is older than
+    NEWS_STALE_AFTER_MINUTES; a refresh is then started in the background.
+    """
+    if format not in ("json", "ndjson"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="format must be 'json' or 'ndjson'"
+        )
+    if sort not in ("recent", "relevance"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="sort must be 'recent' or 'relevance'"
+        )
+    if sort == "relevance" and (format != "json" or cursor):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="sort=relevance returns a single JSON page"
+        )
+
+    with span("auth"):
+        user = await get_user_from_token(token, db)
     if user.id != user_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized"
         )
 
-    # Fetch and cache news if needed
-    try:
-        await fetch_and_cache_news(db, force_refresh=False)
-    except Exception as e:
-        logger.error(f"Error fetching news: {e}")
+    # Get user profile for filtering
+    with span("profile"):
+        profile = (await db.execute(
+            select(Profile).filter(Profile.user_id == user_id)
+        )).scalar_one_or_none()
+    topic_mask = profile_mask(profile)
+
+    # The page is fully determined by the profile, the cached articles and
+    # the paging parameters, so clients can revalidate without a rebuild
+    profile_version = profile.updated_at if profile else None
+    generation, refreshed_at = await get_ingest_state(db)
+    stale = news_is_stale(refreshed_at)
+    if stale and settings.news_ingestion_enabled:
+        ingestion.revalidate(settings.news_revalidate_min_seconds)
+    # Recency decay scales every score by the same factor over time, so a
+    # relevance ranking only changes with the articles or the profile too
+    etag = make_etag("feed", user_id, profile_version, generation, limit, cursor, format, sort)
+    if etag_matches(if_none_match, etag):
+        response = not_modified(etag, FEED_CACHE_CONTROL)
+        set_freshness_headers(response, refreshed_at, stale)
+        return response
+
+    if format == "ndjson":
+        response = StreamingResponse(
+            stream_feed(topic_mask, limit, cursor),
+            media_type="application/x-ndjson"
+        )
+        set_cache_headers(response, etag, FEED_CACHE_CONTROL)
+        set_freshness_headers(response, refreshed_at, stale)
+        return response
+
+    cache_key = feed_cache.key(user_id, profile_version, generation, limit, cursor, sort)
+    cached = feed_cache.get(cache_key)
+    if cached is not None:
+        body, next_cursor = cached
+    elif sort == "relevance":
+        with span("rank"):
+            articles = await get_ranked_feed_json(
+                db,
+                profile_vector(profile_data(profile)),
+                limit=limit,
+                candidates=max(settings.ranking_candidates, limit),
+                half_life_hours=settings.ranking_half_life_hours
+            )
+        with span("serialize"):
+            body, next_cursor = json_array(articles), None
+        feed_cache.set(cache_key, (body, next_cursor))
+    else:
+        # Get cached news matching the profile's topics (tagged at ingest and
+        # kept fresh by the background ingestion task), already rendered
+        try:
+            with span("feed_query"):
+                articles, next_cursor = await get_feed_page_json(
+                    db,
+                    topic_mask=topic_mask,
+                    limit=limit,
+                    cursor=cursor
+                )
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        with span("serialize"):
+            body = json_array(articles)
+        feed_cache.set(cache_key, (body, next_cursor))
+
+    response = Response(content=body, media_type="application/json")
+    set_cache_headers(response, etag, FEED_CACHE_CONTROL)
+    set_freshness_headers(response, refreshed_at, stale)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
+
+
+def news_is_stale(refreshed_at: Optional[datetime]) -> bool:
+    """Whether the last successful NewsAPI refresh is older than NEWS_STALE_AFTER_MINUTES."""
+    if refreshed_at is None:
+        return True
+    return datetime.utcnow() - refreshed_at > timedelta(minutes=settings.news_stale_after_minutes)
+
+
+def set_freshness_headers(response: Response, refreshed_at: Optional[datetime], stale: bool) -> None:
+    response.headers["X-News-Stale"] = "true" if stale else "false"
+    if refreshed_at is not None:
+        response.headers["X-News-Refreshed-At"] = refreshed_at.isoformat() + "Z"
+
+
+# Articles read per query when streaming an NDJSON feed
+FEED_STREAM_BATCH = 200
+
+
+async def stream_feed(topic_mask: int, limit: int, cursor: Optional[str]):
+    """Yield feed articles as NDJSON lines, reading them in batches."""
+    # The request's session may be closed before streaming finishes
+    async with SessionLocal() as db:
+        remaining = limit
+        while remaining > 0:
+            articles, cursor = await get_feed_page_json(
+                db,
+                topic_mask=topic_mask,
+                limit=min(remaining, FEED_STREAM_BATCH),
+                cursor=cursor
+            )
+            if articles:
+                yield b"\n".join(articles) + b"\n"
+            remaining -= len(articles)
+            if cursor is None:
+                break
+
+
+@app.get("/news/search", response_model=List[NewsArticle])
+async def search_news(
+    q: str,
+    token: str,
+    response: Response,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Full-text search over cached articles, best match first.
 
-    # Get cached news
-    articles = await get_cached_news(db, limit=limit * 2)
+    The last word is matched as a prefix; end any other word with `*` to
+    do the same. Pass the `X-Next-Cursor` response header back as `cursor`
+    to get the next page.
+    """
+    await get_user_from_token(token, db)
 
-    # Get user profile for filtering
-    profile = db.query(Profile).filter(Profile.user_id == user_id).first()
-    profile_dict = {}
-    if profile:
-        profile_dict = {
-            "age": profile.age,
-            "housing_type": profile.housing_type,
-            "num_loans": profile.num_loans,
-            "vehicle_type": profile.vehicle_type,
-            "savings_types": profile.savings_types,
-        }
+    try:
+        articles, next_cursor = await search_articles(db, q, limit=limit, cursor=cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
 
-    # Filter news based on profile
-    filtered_articles = filter_news_for_profile(articles, profile_dict)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
 
-    return filtered_articles[:limit]
+    return articles
 
 
 @app.post("/news/refresh")
-async def refresh_news(token: str, db: Session = Depends(get_db)):
-    """Force refresh news from API."""
-    # In production, verify this is an admin or system user
+async def refresh_news(token: str):
+    """Force refresh news from API. Requires the admin token, since every call spends NewsAPI quota."""
+    require_admin(token)
     try:
-        await fetch_and_cache_news(db, force_refresh=True)
-        return {"message": "News refreshed successfully"}
+        count = await ingestion.run_once(force_refresh=True)
+        if count is None:
+            return {"message": "News refresh already in progress", "articles": 0}
+        return {"message": "News refreshed successfully", "articles": count}
+    except NewsAPIUnavailable as e:
+        # Quota used up or circuit open: say when trying again makes sense
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(int(newsapi_client.retry_in()) + 1)}
+        )
+    except NewsAPIError as e:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Error refreshing news: {str(e)}"
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -346,57 +771,241 @@ async def refresh_news(token: str, db: Session = Depends(get_db)):
         )
 
 
+@app.get("/news/ingestion")
+async def get_ingestion_status(token: str):
+    """Get status of the background news ingestion task. Requires the admin token."""
+    require_admin(token)
+    return ingestion.status()
+
+
+@app.get("/news/maintenance")
+async def get_maintenance_status(token: str):
+    """Get status of the cached_news retention task. Requires the admin token."""
+    require_admin(token)
+    return maintenance.status()
+
+
+@app.get("/news/stream")
+async def stream_breaking_news(
+    user_id: int,
+    token: str,
+    last_event_id: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Server-sent events stream of newly ingested articles for the profile.
+
+    Requires breaking news to be enabled on the profile. Each event carries
+    one article as JSON; reconnecting with `Last-Event-ID` replays what was
+    missed.
+    """
+    user = await get_user_from_token(token, db)
+    if user.id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized"
+        )
+
+    profile = (await db.execute(
+        select(Profile).filter(Profile.user_id == user_id)
+    )).scalar_one_or_none()
+    if not profile or not profile.breaking_news:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Breaking news is disabled for this profile"
+        )
+    topic_mask = profile_mask(profile)
+
+    if not settings.breaking_news_enabled:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Breaking news is not available"
+        )
+
+    # Don't hold a pooled connection for the lifetime of the stream
+    await db.close()
+
+    subscriber = breaking_news.subscribe(user_id, topic_mask)
+    if subscriber is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many open streams, retry later",
+            headers={"Retry-After": "30"}
+        )
+
+    # Subscribed first, so nothing published during the replay is missed
+    missed = []
+    if last_event_id and last_event_id.isdigit():
+        try:
+            missed = await breaking_news.replay(subscriber, int(last_event_id))
+        except BaseException:
+            breaking_news.unsubscribe(subscriber)
+            raise
+
+    async def events():
+        try:
+            yield b"retry: 5000\n\n"
+            for event in missed:
+                yield event
+            while True:
+                try:
+                    payload = await asyncio.wait_for(
+                        subscriber.queue.get(),
+                        timeout=settings.breaking_news_heartbeat_seconds
+                    )
+                except asyncio.TimeoutError:
+                    yield HEARTBEAT
+                    continue
+                if payload is None:
+                    return
+                yield payload
+        finally:
+            breaking_news.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/news/stream/stats")
+async def get_breaking_news_stats(token: str):
+    """Get open stream counts and fan-out counters of the breaking news channel. Requires the admin token."""
+    require_admin(token)
+    return breaking_news.stats()
+
+
+@app.get("/news/feed/cache")
+async def get_feed_cache_stats(token: str):
+    """Get size and hit/miss counters of the per-user feed cache. Requires the admin token."""
+    require_admin(token)
+    return feed_cache.stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics(token: str):
+    """Get request, database, NewsAPI and cache metrics in Prometheus text format. Requires the admin token."""
+    require_admin(token)
+    if not settings.metrics_enabled:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Metrics are disabled"
+        )
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+
 @app.get("/news/sources")
-async def get_news_sources(token: str, db: Session = Depends(get_db)):
+async def get_news_sources(
+    token: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
     """Get list of available news sources."""
-    sources = db.query(CachedNews.source).distinct().all()
-    return {"sources": [s[0] for s in sources if s[0]]}
+    # Sources only change when articles are ingested or deleted
+    etag = make_etag("sources", await get_ingest_generation(db))
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, SOURCES_CACHE_CONTROL)
+    set_cache_headers(response, etag, SOURCES_CACHE_CONTROL)
 
+    result = await db.execute(select(CachedNews.source).distinct())
+    return {"sources": [s for s in result.scalars() if s]}
 
-@app.get("/insights/{user_id}")
-async def get_insights(
+
+# ============= DIGEST ENDPOINTS =============
+
+@app.get("/digest/job")
+async def get_digest_job_status(token: str):
+    """Get status and throughput of the daily digest job. Requires the admin token."""
+    require_admin(token)
+    return digests.status()
+
+
+@app.post("/digest/run")
+async def run_digest_job(token: str, digest_date: Optional[date] = None):
+    """Build today's (or `digest_date`'s) digests now. Requires the admin token."""
+    require_admin(token)
+    report = await digests.run_once(digest_date)
+    if report is None:
+        return {"message": "Digests are already being built"}
+    return {"message": "Digests built", "report": asdict(report)}
+
+
+@app.get("/digest/{user_id}")
+async def get_digest(
     user_id: int,
     token: str,
-    db: Session = Depends(get_db)
+    digest_date: Optional[date] = None,
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get AI insights for user (stub for MVP)."""
-    user = get_user_from_token(token, db)
+    """Get the user's latest daily digest, or the one for `digest_date`."""
+    user = await get_user_from_token(token, db)
     if user.id != user_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized"
         )
 
-    # TODO: Implement AI insight generation
-    # For MVP, return placeholder insights based on profile
+    query = select(DailyDigest).filter(DailyDigest.user_id == user_id)
+    if digest_date:
+        query = query.filter(DailyDigest.digest_date == digest_date)
+    digest = (await db.execute(
+        query.order_by(DailyDigest.digest_date.desc()).limit(1)
+    )).scalar_one_or_none()
+    if not digest:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No digest yet"
+        )
+
+    # Articles removed by retention since the digest was built are skipped
+    articles = await get_articles_json(db, digest.article_ids)
+    header = dumps({
+        "date": digest.digest_date.isoformat(),
+        "created_at": digest.created_at.isoformat() if digest.created_at else None,
+    })
+    body = header[:-1] + b',"articles":' + json_array(articles) + b"}"
+    return Response(content=body, media_type="application/json")
 
-    profile = db.query(Profile).filter(Profile.user_id == user_id).first()
 
-    insights = []
+@app.get("/insights/rules")
+async def get_insight_rules(token: str):
+    """List the insight rules and how many users each hit in the last batch run. Requires the admin token."""
+    require_admin(token)
+    return {
+        "rules": [
+            {"id": rule.id, **insight_payload(rule), "conditions": rule.conditions}
+            for rule in rule_engine.rules
+        ],
+        "last_batch": asdict(last_insights_report) if last_insights_report else None,
+    }
 
-    if profile:
-        if profile.num_loans and profile.num_loans > 0:
-            insights.append({
-                "title": "Loan Opportunity",
-                "description": "Interest rates are dropping. Consider refinancing your loans for better terms.",
-                "type": "opportunity"
-            })
 
-        if profile.vehicle_type == "Elbil":
-            insights.append({
-                "title": "EV Tax Benefits",
-                "description": "New EV tax benefits are available. You may be eligible for additional deductions.",
-                "type": "benefit"
-            })
+@app.post("/insights/batch")
+async def run_insights(token: str):
+    """Evaluate every rule against every profile and store the matches. Requires the admin token."""
+    require_admin(token)
+    global last_insights_report
+    last_insights_report = await run_insights_batch(SessionLocal)
+    return asdict(last_insights_report)
 
-        if profile.housing_type == "Andelsbolig":
-            insights.append({
-                "title": "Housing Market Update",
-                "description": "Co-housing properties in your region have increased in value by 4.2% this quarter.",
-                "type": "market"
-            })
 
-    return {"insights": insights}
+@app.get("/insights/{user_id}")
+async def get_insights(
+    user_id: int,
+    token: str,
+    db: AsyncSession = Depends(get_db)
+):
+    """Get insights for user from the rules in insights.py."""
+    user = await get_user_from_token(token, db)
+    if user.id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized"
+        )
+
+    return {"insights": [insight_payload(rule) for rule in await get_user_insights(db, user_id)]}
 
 
 @app.get("/")
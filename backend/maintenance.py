@@ -0,0 +1,307 @@
+import asyncio
+import gzip
+import json
+import logging
+import os
+import random
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import delete, select
+
+from feed_cache import feed_cache
+from models import ArticleBand, ArticleDuplicate, ArticleTopic, CachedNews
+from news import bump_ingest_generation
+from search import remove_articles
+from singleflight import FileLease
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RetentionPolicy:
+    """What to keep in cached_news. Zero disables a limit."""
+    max_age_days: int = 30
+    max_rows_per_category: int = 0
+    chunk_size: int = 1000
+    archive_dir: str = ""  # Write deleted rows here as gzipped NDJSON when set
+    vacuum_interval_hours: float = 24 * 7
+
+
+@dataclass
+class MaintenanceReport:
+    """Outcome of one maintenance run."""
+    rows_deleted: int = 0
+    rows_archived: int = 0
+    expired_rows: int = 0
+    overflow_rows: int = 0
+    vacuumed: bool = False
+    analyzed: bool = False
+    seconds: float = 0.0
+
+
+def _archive_row(article: CachedNews) -> dict:
+    row = {}
+    for column in CachedNews.__table__.columns:
+        # Recomputable from the rest, and minhash is binary besides
+        if column.name in CachedNews.DERIVED_COLUMNS:
+            continue
+        value = getattr(article, column.name)
+        row[column.name] = value.isoformat() if isinstance(value, datetime) else value
+    return row
+
+
+def archive_articles(archive_dir: str, articles: List[CachedNews]) -> int:
+    """
+    Append articles to today's gzipped NDJSON archive.
+
+    Each call adds a gzip member, which `gzip.open(..., "rt")` reads back
+    as one continuous file.
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(
+        archive_dir, f"cached_news-{datetime.utcnow():%Y%m%d}.ndjson.gz"
+    )
+    with gzip.open(path, "at", encoding="utf-8") as f:
+        for article in articles:
+            f.write(json.dumps(_archive_row(article), ensure_ascii=False))
+            f.write("\n")
+    return len(articles)
+
+
+async def _delete_chunk(db, ids: List[int], policy: RetentionPolicy, report: MaintenanceReport) -> None:
+    if policy.archive_dir:
+        articles = (await db.execute(
+            select(CachedNews).filter(CachedNews.id.in_(ids))
+        )).scalars().all()
+        report.rows_archived += await asyncio.to_thread(
+            archive_articles, policy.archive_dir, articles
+        )
+
+    # SQLite doesn't enforce ON DELETE CASCADE unless foreign keys are on
+    await db.execute(delete(ArticleTopic).filter(ArticleTopic.article_id.in_(ids)))
+    await db.execute(delete(ArticleBand).filter(ArticleBand.article_id.in_(ids)))
+    await db.execute(delete(ArticleDuplicate).filter(ArticleDuplicate.canonical_id.in_(ids)))
+    await remove_articles(db, ids)
+    await db.execute(delete(CachedNews).filter(CachedNews.id.in_(ids)))
+    await bump_ingest_generation(db)
+    await db.commit()
+    report.rows_deleted += len(ids)
+
+
+async def delete_expired(db, policy: RetentionPolicy, report: MaintenanceReport) -> None:
+    """Delete articles published before the retention window, chunk by chunk."""
+    if policy.max_age_days <= 0:
+        return
+
+    cutoff = datetime.utcnow() - timedelta(days=policy.max_age_days)
+    while True:
+        ids = (await db.execute(
+            select(CachedNews.id).filter(
+                CachedNews.published_at < cutoff
+            ).limit(policy.chunk_size)
+        )).scalars().all()
+        if not ids:
+            return
+        await _delete_chunk(db, ids, policy, report)
+        report.expired_rows += len(ids)
+        # Let other tasks use the connection between chunks
+        await asyncio.sleep(0)
+
+
+async def delete_overflow(db, policy: RetentionPolicy, report: MaintenanceReport) -> None:
+    """Keep only the newest `max_rows_per_category` articles per category."""
+    if policy.max_rows_per_category <= 0:
+        return
+
+    categories = (await db.execute(
+        select(CachedNews.category).distinct()
+    )).scalars().all()
+    for category in categories:
+        while True:
+            ids = (await db.execute(
+                select(CachedNews.id).filter(
+                    CachedNews.category == category
+                ).order_by(
+                    CachedNews.published_at.desc(),
+                    CachedNews.id.desc()
+                ).offset(policy.max_rows_per_category).limit(policy.chunk_size)
+            )).scalars().all()
+            if not ids:
+                break
+            await _delete_chunk(db, ids, policy, report)
+            report.overflow_rows += len(ids)
+            await asyncio.sleep(0)
+
+
+async def compact(engine, vacuum: bool) -> None:
+    """Refresh planner statistics and optionally reclaim free pages."""
+    async with engine.connect() as conn:
+        # VACUUM can't run inside a transaction
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        if engine.dialect.name == "sqlite":
+            if vacuum:
+                await conn.exec_driver_sql("VACUUM")
+            await conn.exec_driver_sql("ANALYZE")
+        elif engine.dialect.name == "postgresql":
+            command = "VACUUM ANALYZE" if vacuum else "ANALYZE"
+            await conn.exec_driver_sql(f"{command} {CachedNews.__tablename__}")
+            await conn.exec_driver_sql(f"{command} {ArticleTopic.__tablename__}")
+
+
+async def run_retention(
+    session_factory,
+    engine,
+    policy: RetentionPolicy,
+    vacuum: bool = False
+) -> MaintenanceReport:
+    """
+    Apply the retention policy and compact the database.
+
+    Args:
+        session_factory: Factory for database sessions
+        engine: Engine used for VACUUM/ANALYZE
+        policy: What to keep
+        vacuum: Whether to VACUUM (rewrite the file) after deleting
+
+    Returns:
+        Rows reclaimed and time spent
+    """
+    report = MaintenanceReport()
+    start = time.perf_counter()
+
+    async with session_factory() as db:
+        await delete_expired(db, policy, report)
+        await delete_overflow(db, policy, report)
+
+    if report.rows_deleted:
+        feed_cache.bump_generation()
+
+    await compact(engine, vacuum=vacuum and report.rows_deleted > 0)
+    report.vacuumed = vacuum and report.rows_deleted > 0
+    report.analyzed = True
+    report.seconds = round(time.perf_counter() - start, 3)
+    return report
+
+
+class MaintenanceTask:
+    """Run `run_retention` periodically in the background."""
+
+    def __init__(
+        self,
+        session_factory,
+        engine,
+        policy: RetentionPolicy,
+        interval_seconds: float,
+        lock_path: Optional[str] = None
+    ):
+        self.session_factory = session_factory
+        self.engine = engine
+        self.policy = policy
+        self.interval_seconds = interval_seconds
+        self._lease = FileLease(lock_path) if lock_path else None
+        self._task: Optional[asyncio.Task] = None
+
+        self.runs = 0
+        self.failures = 0
+        self.rows_deleted_total = 0
+        self.last_vacuum_at: Optional[float] = None
+        self.last_report: Optional[MaintenanceReport] = None
+        self.last_error: Optional[str] = None
+        self.last_finished_at: Optional[datetime] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def vacuum_due(self) -> bool:
+        if self.policy.vacuum_interval_hours <= 0:
+            return False
+        if self.last_vacuum_at is None:
+            return True
+        return time.time() - self.last_vacuum_at >= self.policy.vacuum_interval_hours * 3600
+
+    async def run_once(self) -> Optional[MaintenanceReport]:
+        """Run maintenance now. Returns None if another worker is running it."""
+        if self._lease is not None and not self._lease.try_acquire():
+            logger.info("Another worker is running maintenance, skipping")
+            return None
+
+        self.runs += 1
+        try:
+            if self._lease is not None:
+                # The lock file records the last VACUUM, so restarts and
+                # other workers don't run it again before it is due
+                self.last_vacuum_at = self._lease.last_completed() or self.last_vacuum_at
+            report = await run_retention(
+                self.session_factory, self.engine, self.policy, vacuum=self.vacuum_due()
+            )
+            if report.vacuumed:
+                self.last_vacuum_at = time.time()
+                if self._lease is not None:
+                    self._lease.mark_completed()
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            logger.error(f"Maintenance failed: {e}")
+            raise
+        finally:
+            self.last_finished_at = datetime.utcnow()
+            if self._lease is not None:
+                self._lease.release()
+
+        self.last_error = None
+        self.last_report = report
+        self.rows_deleted_total += report.rows_deleted
+        logger.info(
+            f"Maintenance reclaimed {report.rows_deleted} rows "
+            f"({report.expired_rows} expired, {report.overflow_rows} over limit, "
+            f"{report.rows_archived} archived) in {report.seconds}s"
+            + (", vacuumed" if report.vacuumed else "")
+        )
+        return report
+
+    async def _loop(self) -> None:
+        # Stagger workers so they don't all contend for the lease at startup
+        await asyncio.sleep(random.uniform(0, min(60.0, self.interval_seconds)))
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                pass  # Already logged and recorded in status
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._loop(), name="cached-news-maintenance")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def status(self) -> dict:
+        return {
+            "running": self.running,
+            "interval_seconds": self.interval_seconds,
+            "policy": asdict(self.policy),
+            "runs": self.runs,
+            "failures": self.failures,
+            "rows_deleted_total": self.rows_deleted_total,
+            "last_error": self.last_error,
+            "last_finished_at": self.last_finished_at.isoformat() if self.last_finished_at else None,
+            "last_vacuum_at": (
+                datetime.utcfromtimestamp(self.last_vacuum_at).isoformat() if self.last_vacuum_at else None
+            ),
+            "last_report": asdict(self.last_report) if self.last_report else None,
+        }
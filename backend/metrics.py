@@ -0,0 +1,339 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; covers cache hits (sub-millisecond) up to slow NewsAPI calls
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Responses whose duration is the connection lifetime, not a latency
+STREAMING_TYPES = (b"text/event-stream",)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Histogram:
+    """Fixed-bucket histogram with optional labels."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts (last one is +Inf), sum, count]
+        self._series: Dict[Labels, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            series = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        for labels, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(float(bound))}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}"
+
+
+class CallbackMetric:
+    """Gauge or counter read from `callback` at scrape time, e.g. cache stats."""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str],
+        callback: Callable[[], Iterable[Tuple[Labels, float]]],
+        type: str = "gauge"
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        self.type = type
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in self.callback():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Registry:
+    """Metrics rendered together on /metrics."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def callback(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str],
+        callback: Callable[[], Iterable[Tuple[Labels, float]]],
+        type: str = "gauge"
+    ) -> CallbackMetric:
+        return self.register(CallbackMetric(name, help, labelnames, callback, type))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text format."""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.counter(
+    "okto_http_requests_total",
+    "HTTP requests by route template, method and status code",
+    ("method", "route", "status"),
+)
+http_request_duration = registry.histogram(
+    "okto_http_request_duration_seconds",
+    "Time from receiving a request to sending the last body byte (event streams excluded)",
+    ("method", "route"),
+)
+http_request_queries = registry.histogram(
+    "okto_http_request_db_queries",
+    "Database queries issued while handling one request",
+    ("route",),
+    buckets=QUERY_COUNT_BUCKETS,
+)
+http_request_db_duration = registry.histogram(
+    "okto_http_request_db_seconds",
+    "Time spent in database queries while handling one request",
+    ("route",),
+)
+db_queries = registry.counter(
+    "okto_db_queries_total",
+    "Database queries, including background tasks",
+)
+db_query_duration = registry.histogram(
+    "okto_db_query_duration_seconds",
+    "Duration of single database queries, including background tasks",
+)
+newsapi_requests = registry.counter(
+    "okto_newsapi_requests_total",
+    "NewsAPI calls by outcome (ok, api_error, http_error, rate_limited, circuit_open, quota_exhausted)",
+    ("outcome",),
+)
+newsapi_duration = registry.histogram(
+    "okto_newsapi_request_duration_seconds",
+    "NewsAPI call latency",
+)
+
+
+class RequestStats:
+    """Database work attributed to the request being handled."""
+
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+# Set by MetricsMiddleware for the duration of a request; the engine hooks
+# run in the request's context (also inside SQLAlchemy's greenlet)
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("okto_request_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._okto_query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_okto_query_start", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    db_queries.inc()
+    db_query_duration.observe(elapsed)
+    stats = current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+
+
+def instrument_engine(engine) -> None:
+    """Count and time every query run through `engine` (sync or async)."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+_caches: Dict[str, object] = {}
+
+
+def register_cache(name: str, cache) -> None:
+    """
+    Expose a cache's `stats()` (entries, hits, misses, hit_ratio) under the
+    `cache` label. Read at scrape time, so lookups pay nothing extra.
+    """
+    _caches[name] = cache
+
+
+def _cache_stat(field: str) -> Callable[[], Iterable[Tuple[Labels, float]]]:
+    def collect():
+        for name, cache in list(_caches.items()):
+            value = cache.stats().get(field)
+            if value is not None:
+                yield (name,), value
+    return collect
+
+
+registry.callback("okto_cache_entries", "Entries held by each in-process cache", ("cache",), _cache_stat("entries"))
+registry.callback("okto_cache_hits_total", "Cache hits", ("cache",), _cache_stat("hits"), type="counter")
+registry.callback("okto_cache_misses_total", "Cache misses", ("cache",), _cache_stat("misses"), type="counter")
+registry.callback("okto_cache_hit_ratio", "Hits / lookups since startup", ("cache",), _cache_stat("hit_ratio"))
+
+
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    # Unmatched paths share one label so scanners can't blow up cardinality
+    return path if path is not None else "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route request counts, latency and the
+    database queries each request made.
+
+    Labels use the route template (`/digest/{user_id}`), not the raw path.
+    Add it last so it wraps every other middleware.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status_code = 500
+        streaming = False
+
+        async def send_with_metrics(message):
+            nonlocal status_code, streaming
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                for key, value in message.get("headers", ()):
+                    if key.lower() == b"content-type" and value.startswith(STREAMING_TYPES):
+                        streaming = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            current_request.reset(token)
+            method = scope["method"]
+            route = _route_label(scope)
+            http_requests.inc(method, route, str(status_code))
+            if not streaming:
+                http_request_duration.observe(time.perf_counter() - start, method, route)
+            http_request_queries.observe(stats.queries, route)
+            http_request_db_duration.observe(stats.db_seconds, route)
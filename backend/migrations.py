@@ -0,0 +1,209 @@
+"""
+Bring a database created by an older version up to the current models.
+
+`Base.metadata.create_all` creates missing tables but never alters existing
+ones, so columns added to a table since it was created (cached_news's
+topic_mask, feed_json, topic_weights and minhash; ingest_state's NewsAPI
+state) are added here, along with missing indexes (such as
+ix_cached_news_published for retention), and indexes no query uses any
+more are dropped. Articles cached before
+those columns existed are then backfilled: topic mask and weights,
+pre-rendered JSON and MinHash signature are recomputed, and the article is
+added to article_topics, the LSH bands and the full-text index.
+
+Runs from `database.init_db` at startup; run it ahead of a deploy with
+`python migrations.py` to keep the backfill off the startup path.
+"""
+import asyncio
+import logging
+from dataclasses import asdict, dataclass, field
+from typing import List
+
+from sqlalchemy import delete, insert, inspect, literal, or_, select, update
+
+from config import settings
+from dedup import band_rows, minhash
+from feed_cache import feed_cache
+from models import ArticleBand, ArticleTopic, Base, CachedNews
+from news import _topic_rows, bump_ingest_generation
+from search import index_articles
+from serialization import article_fragment
+from topics import classify_article, topic_weights
+
+logger = logging.getLogger(__name__)
+
+# Indexes earlier versions created that no query uses any more
+DROPPED_INDEXES = {
+    "cached_news": ("ix_cached_news_category_published",),
+}
+
+BACKFILL_CHUNK_SIZE = 500
+
+
+@dataclass
+class MigrationReport:
+    """What `migrate` changed."""
+    columns_added: List[str] = field(default_factory=list)
+    indexes_created: List[str] = field(default_factory=list)
+    indexes_dropped: List[str] = field(default_factory=list)
+    articles_backfilled: int = 0
+
+
+def _column_ddl(column, dialect) -> str:
+    ddl = f"{dialect.identifier_preparer.quote(column.name)} {column.type.compile(dialect=dialect)}"
+    default = column.default.arg if column.default is not None and column.default.is_scalar else None
+    if default is not None:
+        value = literal(default, column.type).compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+        ddl += f" DEFAULT {value}"
+    if not column.nullable:
+        if default is None:
+            raise RuntimeError(f"Can't add NOT NULL column {column} without a default")
+        ddl += " NOT NULL"
+    return ddl
+
+
+def add_missing_columns(sync_conn, report: MigrationReport) -> None:
+    """
+    Add columns and indexes the models have but existing tables lack, and
+    drop indexes no longer used. Run with `conn.run_sync` after `create_all`.
+    """
+    inspector = inspect(sync_conn)
+    dialect = sync_conn.dialect
+    existing_tables = set(inspector.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        added = [column for column in table.columns if column.name not in columns]
+        for column in added:
+            sync_conn.exec_driver_sql(
+                f"ALTER TABLE {dialect.identifier_preparer.quote(table.name)} "
+                f"ADD COLUMN {_column_ddl(column, dialect)}"
+            )
+            report.columns_added.append(f"{table.name}.{column.name}")
+
+        if table is CachedNews.__table__ and CachedNews.DERIVED_COLUMNS & {column.name for column in added}:
+            # Mark every article for backfill; feed_json is NULL until it's done
+            sync_conn.execute(update(table).values(feed_json=None))
+
+        indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in indexes:
+                index.create(sync_conn)
+                report.indexes_created.append(index.name)
+        for name in DROPPED_INDEXES.get(table.name, ()):
+            if name in indexes:
+                sync_conn.exec_driver_sql(f"DROP INDEX {dialect.identifier_preparer.quote(name)}")
+                report.indexes_dropped.append(name)
+
+
+def _derived_values(article) -> dict:
+    row = {name: getattr(article, name) for name in (
+        "source", "title", "description", "url", "image_url",
+        "published_at", "category", "author", "content",
+    )}
+    return {
+        "topic_mask": classify_article(row),
+        "topic_weights": topic_weights(row),
+        "feed_json": article_fragment(row),
+        "minhash": minhash(row["title"], row["description"]) if settings.dedup_enabled else None,
+    }
+
+
+async def backfill_articles(db, report: MigrationReport, chunk_size: int = BACKFILL_CHUNK_SIZE) -> None:
+    """
+    Compute derived columns and index rows for articles cached before they
+    existed, chunk by chunk. Each chunk is committed, so an interrupted
+    backfill resumes where it stopped.
+    """
+    last_id = 0
+    while True:
+        articles = (await db.execute(
+            select(CachedNews).filter(
+                CachedNews.id > last_id,
+                or_(CachedNews.feed_json.is_(None), CachedNews.topic_weights.is_(None))
+            ).order_by(CachedNews.id).limit(chunk_size)
+        )).scalars().all()
+        if not articles:
+            break
+        last_id = articles[-1].id
+        ids = [article.id for article in articles]
+
+        changed, topic_rows, band_index_rows, search_rows = [], [], [], []
+        for article in articles:
+            values = _derived_values(article)
+            changed.append({"id": article.id, **values})
+            topic_rows.extend(_topic_rows(article.id, {
+                "published_at": article.published_at, "topic_mask": values["topic_mask"],
+            }))
+            if values["minhash"] is not None:
+                band_index_rows.extend(band_rows(article.id, values["minhash"]))
+            search_rows.append({
+                "id": article.id,
+                "title": article.title,
+                "description": article.description,
+                "content": article.content,
+            })
+
+        await db.execute(update(CachedNews), changed)
+        await db.execute(delete(ArticleTopic).filter(ArticleTopic.article_id.in_(ids)))
+        await db.execute(delete(ArticleBand).filter(ArticleBand.article_id.in_(ids)))
+        if topic_rows:
+            await db.execute(insert(ArticleTopic), topic_rows)
+        if band_index_rows:
+            await db.execute(insert(ArticleBand), band_index_rows)
+        await index_articles(db, search_rows)
+        await bump_ingest_generation(db)
+        await db.commit()
+        # Detach the chunk so the session doesn't hold every article
+        db.expunge_all()
+        report.articles_backfilled += len(articles)
+        logger.info(f"Backfilled {report.articles_backfilled} cached articles")
+
+    if report.articles_backfilled:
+        feed_cache.bump_generation()
+
+
+async def migrate(engine, session_factory) -> MigrationReport:
+    """
+    Add missing columns and indexes, drop unused ones, then backfill old articles.
+
+    Args:
+        engine: Engine the tables live in (after `create_all`)
+        session_factory: Factory for database sessions
+
+    Returns:
+        Columns and indexes changed and articles backfilled
+    """
+    report = MigrationReport()
+    async with engine.begin() as conn:
+        await conn.run_sync(add_missing_columns, report)
+    if report.columns_added or report.indexes_created or report.indexes_dropped:
+        logger.info(
+            f"Added columns {report.columns_added} and indexes {report.indexes_created}, "
+            f"dropped indexes {report.indexes_dropped}"
+        )
+
+    async with session_factory() as db:
+        await backfill_articles(db, report)
+    return report
+
+
+def main() -> None:
+    """Migrate the configured database, e.g. before deploying a new version."""
+    from database import engine, init_db
+
+    logging.basicConfig(level=logging.INFO)
+
+    async def run():
+        # init_db creates missing tables and runs `migrate`
+        report = await init_db()
+        await engine.dispose()
+        return report
+
+    print(asdict(asyncio.run(run())))
+
+
+if __name__ == "__main__":
+    main()
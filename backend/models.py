@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, JSON, ForeignKey, Text
+from sqlalchemy import BigInteger, Column, Integer, String, Float, Boolean, Date, DateTime, JSON, ForeignKey, LargeBinary, Text, Index
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -80,6 +80,112 @@ class CachedNews(Base):
     author = Column(String, nullable=True)
     content = Column(Text, nullable=True)
     cached_at = Column(DateTime, default=datetime.utcnow)
+    topic_mask = Column(Integer, default=0, nullable=False)  # Bitmask of topics.TOPIC_* set at ingest
+    feed_json = Column(Text, nullable=True)  # Pre-rendered NewsArticle JSON without the id, see serialization.py
+    topic_weights = Column(JSON, nullable=True)  # Topic vector in topics.TOPIC_NAMES order, see ranking.py
+    minhash = Column(LargeBinary, nullable=True)  # MinHash signature of title and description, see dedup.py
+
+    # Computed at ingest from the columns above (see news.cache_articles):
+    # backfilled by migrations.py, left out of retention archives
+    DERIVED_COLUMNS = frozenset({"topic_mask", "feed_json", "topic_weights", "minhash"})
+
+    __table_args__ = (
+        # Freshness check: latest cached_at per category, read from the index
+        # alone. Feed pages go through article_topics and load rows by id.
+        Index("ix_cached_news_category_cached", "category", "cached_at"),
+        # Retention: range scan for articles published before the cutoff
+        Index("ix_cached_news_published", "published_at"),
+    )
 
     def __repr__(self):
         return f"<CachedNews {self.title[:50]}>"
+
+
+class ArticleTopic(Base):
+    """Inverted index from topic to articles, ordered by publish time."""
+    __tablename__ = "article_topics"
+
+    article_id = Column(Integer, ForeignKey("cached_news.id", ondelete="CASCADE"), primary_key=True)
+    topic = Column(Integer, primary_key=True)  # A single topics.TOPIC_* bit
+    published_at = Column(DateTime, nullable=False)  # Copied from CachedNews for index-only paging
+
+    __table_args__ = (
+        Index("ix_article_topics_topic_published", "topic", "published_at", "article_id"),
+    )
+
+    def __repr__(self):
+        return f"<ArticleTopic article_id={self.article_id} topic={self.topic}>"
+
+
+class ArticleBand(Base):
+    """LSH index over CachedNews.minhash: one row per band of each signature."""
+    __tablename__ = "article_bands"
+
+    band_key = Column(BigInteger, primary_key=True)  # Hash of the band number and its values
+    article_id = Column(Integer, ForeignKey("cached_news.id", ondelete="CASCADE"), primary_key=True, index=True)
+
+    def __repr__(self):
+        return f"<ArticleBand {self.band_key} article_id={self.article_id}>"
+
+
+class ArticleDuplicate(Base):
+    """A near-duplicate of a cached article (e.g. the same wire story from another outlet)."""
+    __tablename__ = "article_duplicates"
+
+    url = Column(String, primary_key=True)
+    canonical_id = Column(Integer, ForeignKey("cached_news.id", ondelete="CASCADE"), nullable=False, index=True)
+    source = Column(String)
+    title = Column(String)
+    similarity = Column(Float)  # Estimated Jaccard similarity to the canonical article
+    detected_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<ArticleDuplicate {self.url} -> {self.canonical_id}>"
+
+
+class IngestState(Base):
+    """
+    Single row of ingest state shared by all workers: a counter bumped
+    whenever the set of cached articles changes, and NewsAPI quota state.
+    """
+    __tablename__ = "ingest_state"
+
+    id = Column(Integer, primary_key=True)
+    generation = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Last NewsAPI refresh that got through, whether or not articles changed
+    refreshed_at = Column(DateTime, nullable=True)
+    # NewsAPI request budget and back-off, shared by all workers
+    newsapi_tokens = Column(Float, nullable=True)
+    newsapi_tokens_at = Column(DateTime, nullable=True)
+    newsapi_blocked_until = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<IngestState generation={self.generation}>"
+
+
+class DailyDigest(Base):
+    """A user's digest for one day, written in bulk by digest.py."""
+    __tablename__ = "daily_digests"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    digest_date = Column(Date, primary_key=True)
+    topic_mask = Column(Integer, nullable=False)  # Interest signature the digest was built for
+    article_ids = Column(JSON, nullable=False)  # Best first
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<DailyDigest user_id={self.user_id} date={self.digest_date}>"
+
+
+class ProfileInsight(Base):
+    """Insight rules matching a profile, precomputed in batch by insights.py."""
+    __tablename__ = "profile_insights"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    rule_ids = Column(JSON, nullable=False)  # insights.Rule ids, in rule order
+    rules_version = Column(String, nullable=True)  # insights.RuleEngine.version the ids were computed with
+    computed_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<ProfileInsight user_id={self.user_id}>"
@@ -1,9 +1,36 @@
+import asyncio
+import base64
+import binascii
 import httpx
+import json
 import logging
-from datetime import datetime, timedelta
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from models import CachedNews
+import math
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+from sqlalchemy import delete, func, insert, or_, select, union_all, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer
+from config import settings
+from feed_cache import feed_cache
+from models import ArticleBand, ArticleDuplicate, ArticleTopic, CachedNews, IngestState
+from metrics import newsapi_duration, newsapi_requests
+from resilience import (
+    CircuitBreaker,
+    TokenBucket,
+    backoff_delay,
+    parse_retry_after,
+    utc_datetime,
+    utc_timestamp,
+)
+from dedup import BatchIndex, band_rows, find_canonicals, minhash
+from search import index_articles
+from serialization import article_fragment, article_json
+from ranking import profile_vector, rank_articles, vector_mask
+from topics import classify_article, topic_bits, topic_weights
 import os
 from dotenv import load_dotenv
 
@@ -26,9 +53,345 @@ RELEVANT_CATEGORIES = [
 ]
 
 
+# One query per topic so a single ingestion cycle covers every profile interest
+TOPIC_QUERIES = [
+    "loan OR mortgage OR \"interest rate\"",
+    "housing OR \"real estate\" OR property",
+    "tax OR economy OR government",
+    "\"electric vehicle\" OR EV subsidy",
+    "investment OR stock OR fund OR savings",
+]
+
+# Budget per scheduled request: room for retries and stale-feed revalidations
+QUOTA_HEADROOM = 2
+
+
+def default_daily_quota(
+    queries: int = len(TOPIC_QUERIES),
+    pages_per_query: int = settings.newsapi_pages_per_query,
+    interval_minutes: float = settings.news_refresh_interval_minutes
+) -> int:
+    """
+    NewsAPI requests a day the refresh schedule needs, with headroom.
+
+    Each refresh fetches `pages_per_query` pages for every query, and there
+    are 24h / `interval_minutes` refreshes a day. The free plan allows 100
+    requests a day, which the default schedule (5 queries hourly) exceeds;
+    there, set NEWSAPI_DAILY_QUOTA=100 and refresh every 180 minutes or more.
+
+    Returns:
+        The daily budget used when NEWSAPI_DAILY_QUOTA is not set
+    """
+    refreshes = math.ceil(24 * 60 / max(interval_minutes, 1))
+    return queries * max(pages_per_query, 1) * refreshes * QUOTA_HEADROOM
+
+
+class NewsAPIError(Exception):
+    """A NewsAPI call failed (after any retries)."""
+
+
+class NewsAPIUnavailable(NewsAPIError):
+    """A NewsAPI call was not attempted: quota used up or circuit open."""
+
+
+def parse_article(article: dict) -> dict:
+    """Map a NewsAPI article onto our cache format."""
+    return {
+        "source": (article.get("source") or {}).get("name", "Unknown"),
+        "title": article.get("title", ""),
+        "description": article.get("description", ""),
+        "url": article.get("url", ""),
+        "image_url": article.get("urlToImage"),
+        "published_at": article.get("publishedAt"),
+        "author": article.get("author"),
+        "content": article.get("content"),
+        "category": "finance"  # We'll tag these as finance
+    }
+
+
+class NewsAPIClient:
+    """
+    Long-lived NewsAPI client with a pooled, keep-alive connection.
+
+    Owned by the app lifespan: call `start()` on startup and `aclose()` on
+    shutdown. Pass `transport` (e.g. `httpx.MockTransport`) to stub the API.
+
+    Every call spends a token from `quota`; 429s, 5xx responses and
+    transport errors are retried with exponential backoff (or after the
+    server's Retry-After), and `breaker` stops calls altogether after
+    repeated failures. Calls that can't succeed raise `NewsAPIError`.
+    """
+
+    def __init__(
+        self,
+        api_key: str = NEWSAPI_KEY,
+        base_url: str = NEWSAPI_BASE_URL,
+        max_connections: int = 10,
+        http2: bool = False,
+        timeout: float = 10.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        quota: Optional[TokenBucket] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        max_retries: int = 2,
+        backoff_base_seconds: float = 1.0,
+        backoff_max_seconds: float = 30.0
+    ):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_connections = max_connections
+        self.http2 = http2
+        self.timeout = timeout
+        self.transport = transport
+        self.quota = quota  # None: no budget
+        self.breaker = breaker or CircuitBreaker()
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def start(self) -> None:
+        """Open the underlying connection pool."""
+        if self._client is not None:
+            return
+
+        http2 = self.http2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("HTTP/2 requested but the 'h2' package is not installed")
+                http2 = False
+
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            http2=http2,
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            ),
+            transport=self.transport,
+        )
+
+    async def aclose(self) -> None:
+        """Close the connection pool."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def fetch(self, query: str = "finance", page: int = 1, page_size: int = 20) -> List[dict]:
+        """
+        Fetch one page of results for a query.
+
+        Args:
+            query: Search query
+            page: Page number
+            page_size: Number of results per page
+
+        Returns:
+            List of news articles
+
+        Raises:
+            NewsAPIUnavailable: The quota is used up or the circuit is open
+            NewsAPIError: The call failed after retries
+        """
+        if not self.api_key:
+            logger.warning("NEWSAPI_KEY not set")
+            return []
+
+        await self.start()
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                newsapi_requests.inc("circuit_open")
+                raise NewsAPIUnavailable(
+                    f"NewsAPI circuit open, retrying in {self.breaker.retry_in():.0f}s"
+                )
+            if self.quota is not None and not self.quota.try_acquire():
+                self.breaker.release()
+                newsapi_requests.inc("quota_exhausted")
+                raise NewsAPIUnavailable(
+                    f"NewsAPI quota used up, next call in {self.quota.seconds_until_available():.0f}s"
+                )
+
+            # Every call allow() granted ends in record_success, record_failure
+            # or release, whatever is raised on the way; otherwise a half-open
+            # breaker would wait for its trial call forever
+            recorded = False
+            retry_after = None
+            start = time.perf_counter()
+            try:
+                try:
+                    response = await self._client.get(
+                        "/everything",
+                        params={
+                            "q": query,
+                            "sortBy": "publishedAt",
+                            "language": "en",
+                            "apiKey": self.api_key,
+                            "page": page,
+                            "pageSize": page_size
+                        }
+                    )
+                except httpx.HTTPError as e:
+                    newsapi_requests.inc("http_error")
+                    error = f"Error fetching from NewsAPI: {e!r}"
+                else:
+                    if response.status_code == 429:
+                        newsapi_requests.inc("rate_limited")
+                        retry_after = parse_retry_after(response.headers.get("retry-after"))
+                        error = "NewsAPI rate limit hit"
+                    elif response.status_code >= 500:
+                        newsapi_requests.inc("http_error")
+                        retry_after = parse_retry_after(response.headers.get("retry-after"))
+                        error = f"NewsAPI returned {response.status_code}"
+                    else:
+                        try:
+                            data = response.json()
+                        except ValueError:
+                            data = {}
+                        if not isinstance(data, dict):
+                            data = {}
+                        if response.status_code >= 400 or data.get("status") != "ok":
+                            # Bad key, bad request: retrying won't help
+                            newsapi_requests.inc("api_error")
+                            self.breaker.record_failure()
+                            recorded = True
+                            raise NewsAPIError(f"NewsAPI error: {data.get('message') or response.status_code}")
+
+                        articles = [parse_article(article) for article in data.get("articles") or []]
+                        newsapi_requests.inc("ok")
+                        self.breaker.record_success()
+                        recorded = True
+                        return articles
+                finally:
+                    newsapi_duration.observe(time.perf_counter() - start)
+
+                self.breaker.record_failure(retry_after)
+                recorded = True
+            except Exception:
+                # A response we couldn't handle counts against the breaker
+                if not recorded:
+                    self.breaker.record_failure()
+                    recorded = True
+                raise
+            finally:
+                # Cancelled mid-call: give the call back instead
+                if not recorded:
+                    self.breaker.release()
+
+            logger.warning(f"{error} (attempt {attempt + 1} of {self.max_retries + 1})")
+            if attempt == self.max_retries or (retry_after or 0) > self.backoff_max_seconds:
+                # A long Retry-After keeps the breaker open instead
+                break
+            await asyncio.sleep(backoff_delay(
+                attempt, self.backoff_base_seconds, self.backoff_max_seconds, retry_after
+            ))
+
+        raise NewsAPIError(error)
+
+    def retry_in(self) -> float:
+        """Seconds until a call could go through again (0 if it can now)."""
+        quota_wait = self.quota.seconds_until_available() if self.quota is not None else 0.0
+        return max(self.breaker.retry_in(), quota_wait)
+
+    def status(self) -> dict:
+        """Quota and circuit breaker state for the status endpoint."""
+        return {
+            "quota_tokens": round(self.quota.state()[0], 2) if self.quota else None,
+            "quota_capacity": self.quota.capacity if self.quota else None,
+            "circuit": self.breaker.status(),
+        }
+
+    async def fetch_many(
+        self,
+        queries: List[str],
+        pages: int = 1,
+        page_size: int = 20,
+        concurrency: int = 4
+    ) -> List[dict]:
+        """
+        Fetch several queries and pages concurrently and merge the results.
+
+        Args:
+            queries: Search queries
+            pages: Number of pages to fetch per query
+            page_size: Number of results per page
+            concurrency: Maximum number of requests in flight
+
+        Returns:
+            Articles from all requests that succeeded, deduplicated by URL,
+            newest first
+
+        Raises:
+            NewsAPIError: Every request failed
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def fetch_one(query: str, page: int) -> List[dict]:
+            async with semaphore:
+                return await self.fetch(query=query, page=page, page_size=page_size)
+
+        results = await asyncio.gather(*(
+            fetch_one(query, page)
+            for query in queries
+            for page in range(1, pages + 1)
+        ), return_exceptions=True)
+
+        failures = [r for r in results if isinstance(r, BaseException)]
+        for failure in failures:
+            if not isinstance(failure, NewsAPIError):
+                raise failure
+        if failures and len(failures) == len(results):
+            raise failures[0]
+        if failures:
+            logger.warning(f"{len(failures)} of {len(results)} NewsAPI requests failed: {failures[0]}")
+
+        merged = {}
+        for articles in results:
+            if isinstance(articles, BaseException):
+                continue
+            for article in articles:
+                if article["url"] and article["url"] not in merged:
+                    merged[article["url"]] = article
+
+        return sorted(
+            merged.values(),
+            key=lambda a: a.get("published_at") or "",
+            reverse=True
+        )
+
+
+newsapi_daily_quota = (
+    settings.newsapi_daily_quota if settings.newsapi_daily_quota is not None
+    else default_daily_quota()
+)
+if 0 < newsapi_daily_quota < default_daily_quota() // QUOTA_HEADROOM:
+    logger.warning(
+        f"NEWSAPI_DAILY_QUOTA={newsapi_daily_quota} is below the "
+        f"{default_daily_quota() // QUOTA_HEADROOM} requests a day the refresh schedule needs; "
+        "raise NEWS_REFRESH_INTERVAL_MINUTES or the quota"
+    )
+
+newsapi_client = NewsAPIClient(
+    max_connections=settings.newsapi_max_connections,
+    http2=settings.newsapi_http2,
+    quota=TokenBucket(
+        capacity=settings.newsapi_burst,
+        rate=newsapi_daily_quota / 86400,
+    ) if newsapi_daily_quota > 0 else None,
+    breaker=CircuitBreaker(
+        failure_threshold=settings.newsapi_breaker_failures,
+        reset_seconds=settings.newsapi_breaker_reset_seconds,
+    ),
+    max_retries=settings.newsapi_max_retries,
+    backoff_base_seconds=settings.newsapi_backoff_base_seconds,
+    backoff_max_seconds=settings.newsapi_backoff_max_seconds,
+)
+
+
 async def fetch_news_from_api(query: str = "finance", page: int = 1, page_size: int = 20) -> List[dict]:
     """
-    Fetch news from NewsAPI.
+    Fetch news from NewsAPI using the shared client.
 
     Args:
         query: Search query
@@ -38,195 +401,650 @@ async def fetch_news_from_api(query: str = "finance", page: int = 1, page_size:
     Returns:
         List of news articles
     """
-    if not NEWSAPI_KEY:
-        logger.warning("NEWSAPI_KEY not set")
-        return []
+    return await newsapi_client.fetch(query=query, page=page, page_size=page_size)
+
+
+async def get_ingest_generation(db: AsyncSession) -> int:
+    """Current ingest generation, shared by all workers through the database."""
+    generation = (await db.execute(
+        select(IngestState.generation).filter(IngestState.id == 1)
+    )).scalar()
+    return generation or 0
+
+
+async def get_ingest_state(db: AsyncSession) -> Tuple[int, Optional[datetime]]:
+    """Current ingest generation and when NewsAPI was last refreshed successfully."""
+    row = (await db.execute(
+        select(IngestState.generation, IngestState.refreshed_at).filter(IngestState.id == 1)
+    )).first()
+    return (row.generation or 0, row.refreshed_at) if row else (0, None)
+
+
+async def _update_ingest_state(db: AsyncSession, **values) -> None:
+    """Set columns of the ingest_state row. The caller commits."""
+    result = await db.execute(
+        # Keep updated_at tracking article changes only
+        update(IngestState).filter(IngestState.id == 1).values(updated_at=IngestState.updated_at, **values)
+    )
+    if result.rowcount == 0:
+        db.add(IngestState(id=1, generation=0, **values))
+
+
+async def load_newsapi_state(db: AsyncSession, client: "NewsAPIClient") -> None:
+    """Adopt the quota and back-off state the last refreshing worker saved."""
+    row = (await db.execute(
+        select(
+            IngestState.newsapi_tokens,
+            IngestState.newsapi_tokens_at,
+            IngestState.newsapi_blocked_until,
+        ).filter(IngestState.id == 1)
+    )).first()
+    if row is None:
+        return
+    if client.quota is not None and row.newsapi_tokens is not None:
+        client.quota.restore(row.newsapi_tokens, utc_timestamp(row.newsapi_tokens_at))
+    if row.newsapi_blocked_until is not None:
+        client.breaker.hold_until(utc_timestamp(row.newsapi_blocked_until))
+
+
+async def save_newsapi_state(db: AsyncSession, client: "NewsAPIClient") -> None:
+    """Store the client's quota and back-off state for other workers. The caller commits."""
+    values = {}
+    if client.quota is not None:
+        tokens, as_of = client.quota.state()
+        values.update(newsapi_tokens=tokens, newsapi_tokens_at=utc_datetime(as_of))
+    values["newsapi_blocked_until"] = (
+        utc_datetime(client.breaker.open_until) if client.breaker.retry_in() > 0 else None
+    )
+    await _update_ingest_state(db, **values)
+
+
+async def bump_ingest_generation(db: AsyncSession) -> None:
+    """Increment the ingest generation. The caller commits."""
+    result = await db.execute(
+        update(IngestState).filter(IngestState.id == 1).values(
+            generation=IngestState.generation + 1,
+            updated_at=datetime.utcnow()
+        )
+    )
+    if result.rowcount == 0:
+        db.add(IngestState(id=1, generation=1))
 
+
+@dataclass
+class IngestResult:
+    """Outcome of a `cache_articles` call."""
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0
+    duplicates: int = 0  # Near-duplicates recorded under an existing article instead of inserted
+    inserted_ids: List[int] = field(default_factory=list)
+
+
+# Rows per INSERT/UPDATE/IN-query batch
+INGEST_CHUNK_SIZE = 500
+
+# Fields refreshed when an already-cached URL comes back with new values
+UPDATABLE_FIELDS = ("title", "description", "image_url", "author", "content")
+
+
+def parse_published_at(value: Optional[str]) -> datetime:
+    """Parse a NewsAPI timestamp into naive UTC, falling back to now."""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{NEWSAPI_BASE_URL}/everything",
-                params={
-                    "q": query,
-                    "sortBy": "publishedAt",
-                    "language": "en",
-                    "apiKey": NEWSAPI_KEY,
-                    "page": page,
-                    "pageSize": page_size
-                },
-                timeout=10.0
-            )
-            response.raise_for_status()
-            data = response.json()
-
-            if data.get("status") != "ok":
-                logger.error(f"NewsAPI error: {data.get('message')}")
-                return []
-
-            articles = []
-            for article in data.get("articles", []):
-                articles.append({
-                    "source": article.get("source", {}).get("name", "Unknown"),
-                    "title": article.get("title", ""),
-                    "description": article.get("description", ""),
-                    "url": article.get("url", ""),
-                    "image_url": article.get("urlToImage"),
-                    "published_at": article.get("publishedAt"),
-                    "author": article.get("author"),
-                    "content": article.get("content"),
-                    "category": "finance"  # We'll tag these as finance
-                })
+        published_at = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (ValueError, AttributeError):
+        return datetime.utcnow()
+    if published_at.tzinfo is not None:
+        published_at = published_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return published_at
 
-            return articles
 
-    except httpx.HTTPError as e:
-        logger.error(f"Error fetching from NewsAPI: {e}")
-        return []
+def chunked(items: list, size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
 
 
-async def cache_articles(db: Session, articles: List[dict]) -> None:
-    """Cache articles in the database."""
-    for article in articles:
-        # Check if article already exists
-        existing = db.query(CachedNews).filter(
-            CachedNews.url == article["url"]
-        ).first()
+def _topic_rows(article_id: int, row: dict) -> List[dict]:
+    """article_topics rows for one article."""
+    return [
+        {"article_id": article_id, "topic": bit, "published_at": row["published_at"]}
+        for bit in topic_bits(row["topic_mask"])
+    ]
 
-        if not existing:
-            try:
-                published_at = datetime.fromisoformat(
-                    article.get("published_at", "").replace("Z", "+00:00")
-                )
-            except (ValueError, AttributeError):
-                published_at = datetime.utcnow()
-
-            cached_news = CachedNews(
-                source=article.get("source", ""),
-                title=article.get("title", ""),
-                description=article.get("description", ""),
-                url=article.get("url", ""),
-                image_url=article.get("image_url"),
-                published_at=published_at,
-                category=article.get("category", "finance"),
-                author=article.get("author"),
-                content=article.get("content"),
-                cached_at=datetime.utcnow()
-            )
-            db.add(cached_news)
 
-    db.commit()
+def _insert_ignoring_duplicates(db: AsyncSession, model=CachedNews):
+    """INSERT that skips rows whose URL is already stored, where the dialect supports it."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        return sqlite_insert(model).on_conflict_do_nothing(index_elements=["url"])
+    if dialect == "postgresql":
+        return postgresql_insert(model).on_conflict_do_nothing(index_elements=["url"])
+    return insert(model)
+
+
+async def _split_near_duplicates(
+    db: AsyncSession,
+    new_rows: List[dict],
+    batch_index: BatchIndex
+) -> Tuple[List[dict], List[dict]]:
+    """
+    Separate near-duplicates from genuinely new articles.
+
+    Returns the rows to insert and article_duplicates rows. Duplicates of
+    articles in the same batch carry `canonical_url` until the canonical
+    row has an id.
+    """
+    signatures = {row["url"]: row["minhash"] for row in new_rows if row["minhash"] is not None}
+    cached = await find_canonicals(db, signatures, settings.dedup_threshold)
+
+    unique, duplicates = [], []
+    for row in new_rows:
+        match = cached.get(row["url"])
+        canonical_id = canonical_url = None
+        if match is not None:
+            canonical_id, score = match
+        elif row["minhash"] is not None:
+            in_batch = batch_index.find(row["minhash"])
+            if in_batch is not None:
+                canonical_url, score = in_batch
+            else:
+                batch_index.add(row["minhash"], row["url"])
+
+        if canonical_id is None and canonical_url is None:
+            unique.append(row)
+            continue
+        duplicates.append({
+            "url": row["url"],
+            "canonical_id": canonical_id,
+            "canonical_url": canonical_url,
+            "source": row["source"],
+            "title": row["title"],
+            "similarity": score,
+            "detected_at": row["cached_at"],
+        })
+    return unique, duplicates
 
 
-async def get_cached_news(
-    db: Session,
-    category: str = "finance",
-    max_age_hours: int = 24,
-    limit: int = 20
-) -> List[CachedNews]:
+async def cache_articles(db: AsyncSession, articles: List[dict]) -> IngestResult:
     """
-    Get cached news articles.
+    Cache articles in the database.
+
+    Existing URLs are resolved with one IN query per chunk, new articles
+    are inserted in chunks, and changed ones are updated in place. New
+    articles that are near-duplicates of a cached one (or of an earlier one
+    in the batch) are recorded in article_duplicates instead; see dedup.py.
 
     Args:
         db: Database session
-        category: News category to filter
-        max_age_hours: Maximum age of cached articles
-        limit: Maximum number of articles to return
+        articles: Articles in the format returned by `parse_article`
 
     Returns:
-        List of cached news articles
+        Inserted/updated/skipped/duplicate counts and the ids of inserted rows
     """
-    cutoff_time = datetime.utcnow() - timedelta(hours=max_age_hours)
+    result = IngestResult()
+    now = datetime.utcnow()
+
+    # Normalise once and drop duplicate/missing URLs within the batch
+    rows = {}
+    for article in articles:
+        url = article.get("url")
+        if not url or url in rows:
+            result.skipped += 1
+            continue
+        rows[url] = {
+            "source": article.get("source", ""),
+            "title": article.get("title", ""),
+            "description": article.get("description", ""),
+            "url": url,
+            "image_url": article.get("image_url"),
+            "published_at": parse_published_at(article.get("published_at")),
+            "category": article.get("category", "finance"),
+            "author": article.get("author"),
+            "content": article.get("content"),
+            "cached_at": now,
+            "topic_mask": classify_article(article),
+            "topic_weights": topic_weights(article),
+        }
+        rows[url]["feed_json"] = article_fragment(rows[url])
+        rows[url]["minhash"] = (
+            minhash(rows[url]["title"], rows[url]["description"])
+            if settings.dedup_enabled else None
+        )
 
-    articles = db.query(CachedNews).filter(
-        CachedNews.category == category,
-        CachedNews.cached_at >= cutoff_time
-    ).order_by(
-        CachedNews.published_at.desc()
-    ).limit(limit).all()
+    batch_index = BatchIndex(settings.dedup_threshold)
+    inserted_by_url = {}
+    for chunk in chunked(list(rows.values()), INGEST_CHUNK_SIZE):
+        if settings.dedup_enabled:
+            # URLs already known to be duplicates come back every cycle
+            known = set((await db.execute(
+                select(ArticleDuplicate.url).filter(
+                    ArticleDuplicate.url.in_([row["url"] for row in chunk])
+                )
+            )).scalars())
+            result.skipped += len(known)
+            chunk = [row for row in chunk if row["url"] not in known]
 
-    return articles
+        existing = {
+            row.url: row
+            for row in (await db.execute(
+                select(CachedNews.id, CachedNews.url, CachedNews.published_at,
+                       CachedNews.source, CachedNews.category, *(
+                    getattr(CachedNews, name) for name in UPDATABLE_FIELDS
+                )).filter(CachedNews.url.in_([row["url"] for row in chunk]))
+            )).all()
+        }
+
+        new_rows = []
+        changed = []
+        reindexed = []
+        search_rows = []
+        for row in chunk:
+            current = existing.get(row["url"])
+            if current is None:
+                new_rows.append(row)
+                continue
+
+            values = {
+                name: row[name]
+                for name in UPDATABLE_FIELDS
+                if row[name] and row[name] != getattr(current, name)
+            }
+            if values:
+                merged = {name: getattr(current, name) for name in UPDATABLE_FIELDS}
+                merged.update(values)
+                values["topic_mask"] = classify_article(merged)
+                values["topic_weights"] = topic_weights(merged)
+                if settings.dedup_enabled:
+                    values["minhash"] = minhash(merged["title"], merged["description"])
+                values["feed_json"] = article_fragment({
+                    **merged,
+                    "source": current.source,
+                    "url": current.url,
+                    "published_at": current.published_at,
+                    "category": current.category,
+                })
+                changed.append({"id": current.id, **values})
+                search_rows.append({"id": current.id, **merged})
+                reindexed.append({
+                    "published_at": current.published_at,
+                    "topic_mask": values["topic_mask"],
+                })
+            else:
+                result.skipped += 1
+
+        duplicates = []
+        if settings.dedup_enabled and new_rows:
+            new_rows, duplicates = await _split_near_duplicates(db, new_rows, batch_index)
+
+        topic_rows = []
+        band_index_rows = []
+        if new_rows:
+            inserted = (await db.execute(
+                _insert_ignoring_duplicates(db).returning(CachedNews.id, CachedNews.url),
+                new_rows
+            )).all()
+            result.inserted += len(inserted)
+            # Rows another writer inserted since our lookup are skipped
+            result.skipped += len(new_rows) - len(inserted)
+            result.inserted_ids.extend(row.id for row in inserted)
+            for article_id, url in inserted:
+                inserted_by_url[url] = article_id
+                topic_rows.extend(_topic_rows(article_id, rows[url]))
+                search_rows.append({"id": article_id, **rows[url]})
+                if rows[url]["minhash"] is not None:
+                    band_index_rows.extend(band_rows(article_id, rows[url]["minhash"]))
+
+        if changed:
+            await db.execute(update(CachedNews), changed)
+            result.updated += len(changed)
+            # Re-index the topics of updated articles
+            await db.execute(delete(ArticleTopic).filter(
+                ArticleTopic.article_id.in_([row["id"] for row in changed])
+            ))
+            for row, index in zip(changed, reindexed):
+                topic_rows.extend(_topic_rows(row["id"], index))
+            if settings.dedup_enabled:
+                await db.execute(delete(ArticleBand).filter(
+                    ArticleBand.article_id.in_([row["id"] for row in changed])
+                ))
+                for row in changed:
+                    if row["minhash"] is not None:
+                        band_index_rows.extend(band_rows(row["id"], row["minhash"]))
+
+        if duplicates:
+            duplicate_rows = []
+            for duplicate in duplicates:
+                canonical_url = duplicate.pop("canonical_url")
+                if canonical_url is not None:
+                    # Skipped if another writer inserted the canonical URL first
+                    duplicate["canonical_id"] = inserted_by_url.get(canonical_url)
+                if duplicate["canonical_id"] is not None:
+                    duplicate_rows.append(duplicate)
+            if duplicate_rows:
+                await db.execute(
+                    _insert_ignoring_duplicates(db, ArticleDuplicate), duplicate_rows
+                )
+            result.duplicates += len(duplicate_rows)
+            result.skipped += len(duplicates) - len(duplicate_rows)
 
+        if topic_rows:
+            await db.execute(insert(ArticleTopic), topic_rows)
+        if band_index_rows:
+            await db.execute(insert(ArticleBand), band_index_rows)
+        await index_articles(db, search_rows)
 
-async def fetch_and_cache_news(db: Session, force_refresh: bool = False) -> None:
+    if result.inserted or result.updated:
+        await bump_ingest_generation(db)
+    await db.commit()
+    if result.inserted or result.updated:
+        feed_cache.bump_generation()
+    return result
+
+
+async def get_latest_cached_at(db: AsyncSession, category: str = "finance") -> Optional[datetime]:
+    """When the newest article in a category was cached (one index lookup)."""
+    return (await db.execute(
+        select(func.max(CachedNews.cached_at)).filter(CachedNews.category == category)
+    )).scalar()
+
+
+async def fetch_and_cache_news(db: AsyncSession, force_refresh: bool = False) -> int:
     """
     Fetch news from API and cache it.
 
+    Callers hold the refresh lease, so the quota and back-off state saved
+    in ingest_state is read and written by one worker at a time.
+
     Args:
         db: Database session
         force_refresh: Whether to ignore cache and fetch fresh data
+
+    Returns:
+        Number of articles fetched from the API (0 if the cache was fresh)
+
+    Raises:
+        NewsAPIError: No request got through; cached articles are left as they are
     """
     # Check if we have recent cached data
     if not force_refresh:
-        recent = await get_cached_news(db, max_age_hours=6, limit=1)
-        if recent:
+        latest = await get_latest_cached_at(db)
+        if latest and latest >= datetime.utcnow() - timedelta(hours=6):
             logger.info("Using cached news, skipping API fetch")
-            return
+            return 0
 
-    # Fetch fresh data from API
+    # Fetch fresh data from API, one query per topic
+    await load_newsapi_state(db, newsapi_client)
     try:
-        articles = await fetch_news_from_api(
-            query="finance economy stock market",
-            page=1,
-            page_size=30
+        articles = await newsapi_client.fetch_many(
+            TOPIC_QUERIES,
+            pages=settings.newsapi_pages_per_query,
+            page_size=settings.newsapi_page_size,
+            concurrency=settings.newsapi_concurrency
         )
-        if articles:
-            await cache_articles(db, articles)
-            logger.info(f"Cached {len(articles)} articles from NewsAPI")
-    except Exception as e:
-        logger.error(f"Error in fetch_and_cache_news: {e}")
+    finally:
+        await save_newsapi_state(db, newsapi_client)
+        await db.commit()
 
+    if articles:
+        result = await cache_articles(db, articles)
+        logger.info(
+            f"Cached {len(articles)} articles from NewsAPI: {result.inserted} new, "
+            f"{result.updated} updated, {result.skipped} skipped"
+        )
 
-def filter_news_for_profile(articles: List[CachedNews], profile: dict) -> List[CachedNews]:
+    if newsapi_client.api_key:
+        await _update_ingest_state(db, refreshed_at=datetime.utcnow())
+        await db.commit()
+
+    return len(articles)
+
+
+def encode_feed_cursor(published_at: datetime, article_id: int) -> str:
+    """Opaque cursor pointing just after the given article."""
+    raw = json.dumps([published_at.isoformat(), article_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_feed_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decode a cursor from `encode_feed_cursor`.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        published_at, article_id = json.loads(raw)
+        return datetime.fromisoformat(published_at), int(article_id)
+    except (TypeError, ValueError, binascii.Error) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+async def _feed_page_ids(
+    db: AsyncSession,
+    bits: List[int],
+    limit: int,
+    cursor: Optional[str]
+) -> List[Tuple[int, datetime]]:
+    """
+    (article_id, published_at) of one feed page plus one row, newest first.
+
+    Each topic is read in (topic, published_at, article_id) index order with
+    its own LIMIT, so no query sorts. The at most len(bits) * (limit + 1)
+    rows are merged here rather than in a database sort.
     """
-    Filter news articles based on user profile.
+    per_topic = []
+    for bit in bits:
+        query = select(ArticleTopic.article_id, ArticleTopic.published_at).filter(
+            ArticleTopic.topic == bit
+        )
+        if cursor:
+            published_at, article_id = decode_feed_cursor(cursor)
+            # The leading <= gives the planner an index range to seek to
+            query = query.filter(
+                ArticleTopic.published_at <= published_at,
+                or_(
+                    ArticleTopic.published_at < published_at,
+                    ArticleTopic.article_id < article_id
+                )
+            )
+        # Fetch one extra to know whether there is a next page
+        per_topic.append(query.order_by(
+            ArticleTopic.published_at.desc(),
+            ArticleTopic.article_id.desc()
+        ).limit(limit + 1))
+
+    if len(per_topic) == 1:
+        return [tuple(row) for row in (await db.execute(per_topic[0])).all()]
+
+    # UNION ALL: an article tagged with several topics comes back once per topic
+    rows = (await db.execute(union_all(*(query.subquery().select() for query in per_topic)))).all()
+    merged = sorted(
+        {(row.article_id, row.published_at) for row in rows},
+        key=lambda row: (row[1], row[0]),
+        reverse=True
+    )
+    return merged[:limit + 1]
+
+
+async def get_feed_page(
+    db: AsyncSession,
+    topic_mask: int,
+    limit: int = 20,
+    cursor: Optional[str] = None
+) -> Tuple[List[CachedNews], Optional[str]]:
+    """
+    Get one page of articles tagged with any of the given topics.
+
+    Each topic is read from the (topic, published_at, article_id) index with
+    its own LIMIT, so the cost of a page doesn't grow with how deep it is.
+    The page's articles are then loaded by primary key.
 
     Args:
-        articles: List of articles
-        profile: User profile data
+        db: Database session
+        topic_mask: Bitmask of topics to include
+        limit: Maximum number of articles to return
+        cursor: Cursor from a previous page, or None for the first page
 
     Returns:
-        Filtered list of articles relevant to the profile
+        The articles, newest first, and the cursor for the next page (None
+        when there are no more articles)
+
+    Raises:
+        ValueError: If the cursor is malformed
     """
-    filtered = []
+    bits = topic_bits(topic_mask)
+    if not bits or limit <= 0:
+        return [], None
 
-    for article in articles:
-        title_lower = article.title.lower() if article.title else ""
-        description_lower = article.description.lower() if article.description else ""
-        content_lower = article.content.lower() if article.content else ""
+    page = await _feed_page_ids(db, bits, limit, cursor)
+    next_cursor = encode_feed_cursor(page[limit - 1][1], page[limit - 1][0]) if len(page) > limit else None
+    page = page[:limit]
 
-        text = f"{title_lower} {description_lower} {content_lower}"
+    articles = {
+        article.id: article
+        for article in (await db.execute(
+            select(CachedNews).options(defer(CachedNews.content)).filter(
+                CachedNews.id.in_([article_id for article_id, _ in page])
+            )
+        )).scalars()
+    }
+    # Articles deleted since the index was read are skipped
+    return [articles[article_id] for article_id, _ in page if article_id in articles], next_cursor
 
-        # Check for loan/mortgage related
-        if profile.get("num_loans", 0) > 0 and any(
-            word in text for word in ["loan", "mortgage", "interest", "rate"]
-        ):
-            filtered.append(article)
-            continue
 
-        # Check for housing/real estate
-        if profile.get("housing_type") and any(
-            word in text for word in ["housing", "real estate", "property", "apartment", "home"]
-        ):
-            filtered.append(article)
-            continue
+# Columns needed to render a feed item, without building ORM objects
+FEED_COLUMNS = (
+    CachedNews.id, CachedNews.source, CachedNews.title, CachedNews.description,
+    CachedNews.url, CachedNews.image_url, CachedNews.published_at,
+    CachedNews.category, CachedNews.author, CachedNews.feed_json,
+)
 
-        # Check for investment/savings
-        if profile.get("savings_types") and any(
-            word in text for word in ["investment", "stock", "fund", "savings", "portfolio"]
-        ):
-            filtered.append(article)
-            continue
 
-        # Check for tax/economic news
-        if any(word in text for word in ["tax", "economic", "economy", "government"]):
-            filtered.append(article)
-            continue
+async def get_feed_page_json(
+    db: AsyncSession,
+    topic_mask: int,
+    limit: int = 20,
+    cursor: Optional[str] = None
+) -> Tuple[List[bytes], Optional[str]]:
+    """
+    Like `get_feed_page`, but returns each article as encoded JSON.
 
-        # Check for vehicle/transportation (if electric vehicle owner)
-        if profile.get("vehicle_type") == "Elbil" and any(
-            word in text for word in ["electric", "ev", "vehicle", "car", "tax", "subsidy"]
-        ):
-            filtered.append(article)
-            continue
+    Uses the fragments rendered at ingest, so no ORM objects or pydantic
+    models are built.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    bits = topic_bits(topic_mask)
+    if not bits or limit <= 0:
+        return [], None
+
+    page = await _feed_page_ids(db, bits, limit, cursor)
+    next_cursor = encode_feed_cursor(page[limit - 1][1], page[limit - 1][0]) if len(page) > limit else None
+    return await get_articles_json(db, [article_id for article_id, _ in page[:limit]]), next_cursor
+
+
+async def get_ranked_feed_json(
+    db: AsyncSession,
+    profile: List[float],
+    limit: int = 20,
+    candidates: int = 300,
+    half_life_hours: float = 24.0
+) -> List[bytes]:
+    """
+    The most relevant recent articles for a profile vector, as encoded JSON.
+
+    Ranks the newest `candidates` articles tagged with the profile's topics
+    (read through the topic index like `get_feed_page`) by `ranking.py`
+    score. There is no cursor: the result is a single ranked page.
+    """
+    bits = topic_bits(vector_mask(profile))
+    if not bits or limit <= 0:
+        return []
+
+    ids = [article_id for article_id, _ in await _feed_page_ids(db, bits, candidates - 1, None)]
+    found = {
+        row.id: row
+        for row in (await db.execute(
+            select(*FEED_COLUMNS, CachedNews.topic_mask, CachedNews.topic_weights).filter(
+                CachedNews.id.in_(ids)
+            )
+        ))
+    }
+    # Newest first, so equally relevant articles stay in recency order
+    rows = [found[article_id] for article_id in ids if article_id in found]
+
+    ranked = rank_articles(rows, profile, half_life_hours=half_life_hours)
+    return [article_json(row.id, row.feed_json, row) for row in ranked[:limit]]
+
+
+async def get_max_article_id(db: AsyncSession) -> int:
+    """Id of the newest cached article (0 when the cache is empty)."""
+    return (await db.execute(select(func.max(CachedNews.id)))).scalar() or 0
 
-    return filtered[:20]  # Return top 20 articles
+
+async def get_articles_since(
+    db: AsyncSession,
+    after_id: int,
+    topic_mask: Optional[int] = None,
+    limit: int = 500
+) -> List[Tuple[int, int, bytes]]:
+    """
+    Articles ingested after `after_id`, oldest first, as encoded JSON.
+
+    Args:
+        db: Database session
+        after_id: Only return articles with a larger id
+        topic_mask: Only return articles tagged with one of these topics;
+            None returns every tagged article
+        limit: Maximum number of articles to return
+
+    Returns:
+        (id, topic_mask, json) per article
+    """
+    query = select(*FEED_COLUMNS, CachedNews.topic_mask).filter(
+        CachedNews.id > after_id,
+        CachedNews.topic_mask != 0
+    )
+    if topic_mask is not None:
+        query = query.filter(CachedNews.topic_mask.op("&")(topic_mask) != 0)
+    rows = (await db.execute(query.order_by(CachedNews.id).limit(limit))).all()
+    return [
+        (row.id, row.topic_mask, article_json(row.id, row.feed_json, row))
+        for row in rows
+    ]
+
+
+async def get_articles_json(db: AsyncSession, ids: List[int]) -> List[bytes]:
+    """Articles by id as encoded JSON, in the order given. Missing ids are skipped."""
+    if not ids:
+        return []
+    rows = {
+        row.id: row
+        for row in (await db.execute(
+            select(*FEED_COLUMNS).filter(CachedNews.id.in_(ids))
+        ))
+    }
+    return [
+        article_json(rows[article_id].id, rows[article_id].feed_json, rows[article_id])
+        for article_id in ids
+        if article_id in rows
+    ]
+
+
+def filter_news_for_profile(articles: List[CachedNews], profile: dict) -> List[CachedNews]:
+    """
+    Rank news articles for a user profile.
+
+    Scores each article's topic vector (computed at ingest) against the
+    profile's interest weights, decayed by age; see ranking.py.
+
+    Args:
+        articles: List of articles
+        profile: User profile data
+
+    Returns:
+        Articles relevant to the profile, most relevant first
+    """
+    return rank_articles(articles, profile_vector(profile))
@@ -0,0 +1,298 @@
+import asyncio
+import atexit
+import hmac
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import List, Optional, Tuple
+
+from sqlalchemy import event
+
+# Request header that turns profiling on when it carries the admin token
+PROFILE_HEADER = b"x-okto-profile"
+PROFILE_ID_HEADER = b"x-okto-profile-id"
+
+# Per-request caps so a chatty request can't grow its trace without bound
+MAX_STATEMENTS = 100
+MAX_STATEMENT_CHARS = 500
+MAX_STACKS = 25
+
+# Responses whose duration is the connection lifetime, not a latency
+STREAMING_TYPES = (b"text/event-stream",)
+
+
+class Trace:
+    """Timed phases, SQL statements and stack samples of one request."""
+
+    def __init__(self, profiled: bool):
+        self.id = uuid.uuid4().hex[:16]
+        self.profiled = profiled
+        self.started = time.perf_counter()
+        self.spans: List[Tuple[str, float, float]] = []  # (name, offset, seconds)
+        self.statements: List[Tuple[str, float]] = []
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+
+    def add_query(self, statement: str, seconds: float) -> None:
+        self.queries += 1
+        self.db_seconds += seconds
+        if len(self.statements) < MAX_STATEMENTS:
+            self.statements.append((statement[:MAX_STATEMENT_CHARS], seconds))
+
+    def to_dict(self) -> dict:
+        data = {
+            "spans": [
+                {"name": name, "offset_ms": _ms(offset), "ms": _ms(seconds)}
+                for name, offset, seconds in self.spans
+            ],
+            "db": {
+                "queries": self.queries,
+                "ms": _ms(self.db_seconds),
+                "statements": [{"sql": sql, "ms": _ms(seconds)} for sql, seconds in self.statements],
+            },
+        }
+        if self.profiled:
+            data["profile"] = {
+                "samples": self.sample_count,
+                "stacks": self.samples.most_common(MAX_STACKS),
+            }
+        return data
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
+
+
+current_trace: ContextVar[Optional[Trace]] = ContextVar("okto_trace", default=None)
+
+
+@contextmanager
+def span(name: str):
+    """Time a phase of the current request; does nothing outside a request."""
+    trace = current_trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        trace.spans.append((name, start - trace.started, end - start))
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and current_trace.get() is not None:
+        context._okto_trace_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_okto_trace_start", None)
+    if start is None:
+        return
+    trace = current_trace.get()
+    if trace is not None:
+        # Statement text only: parameters may hold personal data
+        trace.add_query(statement, time.perf_counter() - start)
+
+
+def instrument_engine(engine) -> None:
+    """Record the SQL statements and timings of traced requests."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{os.path.basename(code.co_filename)}:{name}"
+
+
+def _collapsed_stack(frame) -> str:
+    """Stack as "outer;...;inner" (flame graph input), from the running task down."""
+    labels = []
+    while frame is not None:
+        code = frame.f_code
+        # Everything below the event loop's callback runner is loop machinery
+        if code.co_name == "_run" and code.co_filename.endswith(os.path.join("asyncio", "events.py")):
+            break
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class StackSampler:
+    """
+    Samples the event loop thread's stack every `interval` seconds from a
+    helper thread, keeping only samples taken while `task` is running.
+    """
+
+    def __init__(self, trace: Trace, task: asyncio.Task, interval: float):
+        self.trace = trace
+        self.task = task
+        self.loop = task.get_loop()
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"profiler-{trace.id}", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling. Returns at once; `join` waits for the thread."""
+        self._stop.set()
+
+    def join(self) -> None:
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            if asyncio.current_task(self.loop) is not self.task:
+                continue  # Another request (or nothing) has the loop
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None or self._stop.is_set():
+                continue
+            self.trace.samples[_collapsed_stack(frame)] += 1
+            self.trace.sample_count += 1
+
+
+def slow_request_logger(path: str, max_bytes: int, backups: int) -> logging.Logger:
+    """
+    Logger writing one JSON object per line to a size-rotated file.
+
+    Records are handed to a queue and written (and rotated) by a listener
+    thread, so logging never does file I/O on the event loop. The listener
+    is flushed and stopped at exit.
+    """
+    logger = logging.getLogger("okto.slow_requests")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    if not any(isinstance(h, QueueHandler) for h in logger.handlers):
+        # delay: the file is only created once a slow request is logged
+        handler = RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        records: queue.Queue = queue.Queue()
+        listener = QueueListener(records, handler)
+        listener.start()
+        atexit.register(listener.stop)
+        logger.addHandler(QueueHandler(records))
+    return logger
+
+
+def _header(headers, name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that traces requests and logs the slow ones.
+
+    Every request records its `span` timings and SQL statements (cheap
+    appends); requests above `slow_seconds` are written to `log`. A request
+    is also stack-sampled when it carries `X-Okto-Profile: <token>` or is
+    picked at `sample_rate`; its trace is logged whatever its duration and
+    its id returned in `X-Okto-Profile-Id`.
+    """
+
+    def __init__(
+        self,
+        app,
+        log: logging.Logger,
+        slow_seconds: float = 1.0,
+        sample_rate: float = 0.0,
+        token: str = "",
+        interval_seconds: float = 0.005
+    ):
+        self.app = app
+        self.log = log
+        self.slow_seconds = slow_seconds
+        self.sample_rate = sample_rate
+        self.token = token.encode()
+        self.interval_seconds = interval_seconds
+
+    def _profile_requested(self, scope) -> bool:
+        if self.token:
+            value = _header(scope["headers"], PROFILE_HEADER)
+            if value is not None and hmac.compare_digest(value, self.token):
+                return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(profiled=self._profile_requested(scope))
+        token = current_trace.set(trace)
+        sampler = None
+        if trace.profiled:
+            sampler = StackSampler(trace, asyncio.current_task(), self.interval_seconds)
+            sampler.start()
+
+        status_code = 500
+        streaming = False
+
+        async def send_traced(message):
+            nonlocal status_code, streaming
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                content_type = _header(message.get("headers", ()), b"content-type") or b""
+                streaming = content_type.startswith(STREAMING_TYPES)
+                if trace.profiled:
+                    message["headers"] = list(message.get("headers", ())) + [
+                        (PROFILE_ID_HEADER, trace.id.encode())
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_traced)
+        finally:
+            current_trace.reset(token)
+            if sampler is not None:
+                # Stop before anything else so the profile doesn't sample its
+                # own teardown; joining can block for up to one interval, so
+                # it waits off the loop
+                sampler.stop()
+                await asyncio.get_running_loop().run_in_executor(None, sampler.join)
+            seconds = time.perf_counter() - trace.started
+            slow = seconds >= self.slow_seconds and not streaming
+            if slow or trace.profiled:
+                self._write(scope, trace, status_code, seconds, slow)
+
+    def _write(self, scope, trace: Trace, status_code: int, seconds: float, slow: bool) -> None:
+        route = getattr(scope.get("route"), "path", None)
+        entry = {
+            "id": trace.id,
+            "time": datetime.utcnow().isoformat(),
+            "reason": "slow" if slow else "profile",
+            "method": scope["method"],
+            # Path only: query strings carry tokens
+            "path": scope["path"],
+            "route": route,
+            "status": status_code,
+            "ms": _ms(seconds),
+            **trace.to_dict(),
+        }
+        self.log.info(json.dumps(entry))
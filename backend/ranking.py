@@ -0,0 +1,170 @@
+import math
+import time
+from typing import List, Optional, Sequence
+
+from resilience import utc_timestamp
+from topics import (
+    TOPIC_ECONOMY,
+    TOPIC_EV,
+    TOPIC_HOUSING,
+    TOPIC_LOANS,
+    TOPIC_NAMES,
+    TOPIC_SAVINGS,
+    weights_from_mask,
+)
+
+try:
+    import numpy as np
+except ImportError:  # Optional: the pure-Python path gives the same scores, just slower
+    np = None
+
+# Position of each topic in the article and profile vectors
+TOPIC_INDEX = {bit: i for i, bit in enumerate(TOPIC_NAMES)}
+
+# Housing types (as stored on Profile) by how much housing news matters to them
+HOUSING_WEIGHTS = {
+    "Ejerbolig": 1.0,
+    "Sommerhus": 1.0,
+    "Andelsbolig": 0.7,
+    "Lejebolig": 0.4,
+}
+VEHICLE_WEIGHTS = {
+    "Elbil": 1.0,
+    "Hybrid": 0.5,
+}
+# Decay never goes below this, so very old but relevant articles still rank
+# (after everything newer) instead of underflowing to a score of zero
+MIN_DECAY = 1e-12
+
+# Yearly gross income (DKK) above which tax and savings news matter more
+HIGH_INCOME = 600_000
+
+
+def profile_vector(profile: dict) -> List[float]:
+    """
+    Interest weights of a profile, one per topic in TOPIC_NAMES order.
+
+    Args:
+        profile: User profile data (loans, housing, savings, vehicle and
+            income fields; missing fields count as not set)
+
+    Returns:
+        Non-negative weights; economy news always has some weight
+    """
+    weights = dict.fromkeys(TOPIC_NAMES, 0.0)
+
+    num_loans = profile.get("num_loans") or 0
+    if num_loans > 0:
+        weights[TOPIC_LOANS] = 0.5 + 0.1 * min(num_loans, 5)
+        # Variable-rate borrowers are the ones rate news affects
+        if profile.get("interest_rate_type") in ("Variabel", "Blandet"):
+            weights[TOPIC_LOANS] += 0.2
+
+    housing_type = profile.get("housing_type")
+    if housing_type:
+        weights[TOPIC_HOUSING] = HOUSING_WEIGHTS.get(housing_type, 0.5)
+
+    savings_types = profile.get("savings_types") or []
+    if savings_types:
+        weights[TOPIC_SAVINGS] = 0.4 + 0.15 * len(savings_types)
+
+    weights[TOPIC_ECONOMY] = 0.3
+    if (profile.get("annual_gross_income") or 0) >= HIGH_INCOME:
+        weights[TOPIC_ECONOMY] += 0.2
+        if weights[TOPIC_SAVINGS]:
+            weights[TOPIC_SAVINGS] += 0.2
+
+    weights[TOPIC_EV] = VEHICLE_WEIGHTS.get(profile.get("vehicle_type"), 0.0)
+
+    return [min(weights[bit], 1.0) for bit in TOPIC_NAMES]
+
+
+def vector_mask(vector: Sequence[float]) -> int:
+    """Bitmask of the topics with a non-zero weight."""
+    mask = 0
+    for bit, i in TOPIC_INDEX.items():
+        if vector[i]:
+            mask |= bit
+    return mask
+
+
+def article_vector(article) -> List[float]:
+    """Stored topic vector of an article (dict, ORM object or row)."""
+    if isinstance(article, dict):
+        weights, mask = article.get("topic_weights"), article.get("topic_mask")
+    else:
+        weights, mask = article.topic_weights, article.topic_mask
+    # Rows ingested before topic_weights existed only have the mask
+    return weights if weights else weights_from_mask(mask or 0)
+
+
+def score_articles(
+    vectors: Sequence[Sequence[float]],
+    published_at: Sequence[float],
+    profile: Sequence[float],
+    now: Optional[float] = None,
+    half_life_hours: float = 24.0
+) -> List[float]:
+    """
+    Relevance of each article to a profile, decayed by age.
+
+    score = (article vector · profile vector) * 0.5 ** (age / half_life)
+
+    Args:
+        vectors: Article topic vectors
+        published_at: Publish times as POSIX timestamps, one per article
+        profile: Profile vector from `profile_vector`
+        now: Reference time (POSIX); defaults to the current time
+        half_life_hours: Age at which an article's score halves
+
+    Returns:
+        One score per article, in input order
+    """
+    if not vectors:
+        return []
+    now = time.time() if now is None else now
+    half_life = half_life_hours * 3600
+
+    if np is not None:
+        relevance = np.asarray(vectors, dtype=np.float64) @ np.asarray(profile, dtype=np.float64)
+        age = np.maximum(now - np.asarray(published_at, dtype=np.float64), 0.0)
+        return (relevance * np.maximum(np.exp2(-age / half_life), MIN_DECAY)).tolist()
+
+    return [
+        sum(a * p for a, p in zip(vector, profile))
+        * max(math.pow(2.0, -max(now - ts, 0.0) / half_life), MIN_DECAY)
+        for vector, ts in zip(vectors, published_at)
+    ]
+
+
+def rank_articles(
+    articles: list,
+    profile: Sequence[float],
+    now: Optional[float] = None,
+    half_life_hours: float = 24.0
+) -> list:
+    """
+    Articles with a positive score, best first.
+
+    Ties keep the input order, so newest-first input stays newest-first.
+    """
+    scores = score_articles(
+        [article_vector(article) for article in articles],
+        [_timestamp(article) for article in articles],
+        profile,
+        now=now,
+        half_life_hours=half_life_hours,
+    )
+    order = sorted(
+        (i for i, score in enumerate(scores) if score > 0),
+        key=lambda i: -scores[i]
+    )
+    return [articles[i] for i in order]
+
+
+def _timestamp(article) -> float:
+    published_at = article.get("published_at") if isinstance(article, dict) else article.published_at
+    if not published_at:
+        return 0.0
+    # Naive datetimes are UTC throughout the app
+    return utc_timestamp(published_at)
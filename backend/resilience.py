@@ -0,0 +1,198 @@
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional, Tuple
+
+
+class TokenBucket:
+    """
+    Request budget refilled continuously at `rate` tokens per second, up
+    to `capacity`.
+
+    Uses wall-clock time so its state can be saved and restored across
+    processes (see `state` / `restore`).
+    """
+
+    def __init__(self, capacity: float, rate: float, clock: Callable[[], float] = time.time):
+        self.capacity = capacity
+        self.rate = rate
+        self.clock = clock
+        self.tokens = float(capacity)
+        self.updated_at = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated_at:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Take `tokens` if available; never waits."""
+        with self._lock:
+            self._refill(self.clock())
+            if self.tokens < tokens:
+                return False
+            self.tokens -= tokens
+            return True
+
+    def seconds_until_available(self, tokens: float = 1.0) -> float:
+        with self._lock:
+            self._refill(self.clock())
+            missing = tokens - self.tokens
+            if missing <= 0:
+                return 0.0
+            return missing / self.rate if self.rate > 0 else float("inf")
+
+    def state(self) -> Tuple[float, float]:
+        """(tokens, as of POSIX time), for persisting."""
+        with self._lock:
+            self._refill(self.clock())
+            return self.tokens, self.updated_at
+
+    def restore(self, tokens: float, updated_at: float) -> None:
+        """Adopt a saved state, e.g. one written by another worker."""
+        with self._lock:
+            self.tokens = min(float(tokens), self.capacity)
+            self.updated_at = updated_at
+            self._refill(self.clock())
+
+
+class CircuitBreaker:
+    """
+    Stop calling a failing dependency for a while.
+
+    Closed: calls go through. After `failure_threshold` consecutive
+    failures, or a failure carrying a Retry-After, it opens and `allow()`
+    refuses calls until `reset_seconds` (or the Retry-After) have passed.
+    Then it lets a single trial call through (half-open): success closes
+    it, failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_seconds: float = 300.0,
+        clock: Callable[[], float] = time.time
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.opened = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may be made now."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if self.clock() < self.open_until:
+                    return False
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            # Half-open: only one trial call at a time
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self, retry_after: Optional[float] = None) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            self._trial_in_flight = False
+            if (
+                retry_after is not None
+                or self.state == self.HALF_OPEN
+                or self.consecutive_failures >= self.failure_threshold
+            ):
+                self._open(retry_after if retry_after is not None else self.reset_seconds)
+
+    def release(self) -> None:
+        """Give back a call `allow()` granted but that was never completed."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def hold_until(self, until: float) -> None:
+        """Stay open until at least `until` (POSIX), e.g. a Retry-After seen by another worker."""
+        with self._lock:
+            if until > self.clock() and until > self.open_until:
+                self.state = self.OPEN
+                self.open_until = until
+
+    def _open(self, seconds: float) -> None:
+        if self.state != self.OPEN:
+            self.opened += 1
+        self.state = self.OPEN
+        self.open_until = max(self.open_until, self.clock() + seconds)
+
+    def retry_in(self) -> float:
+        """Seconds until the breaker lets a call through again."""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.open_until - self.clock())
+
+    def status(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_in_seconds": round(self.retry_in(), 1),
+            "opened": self.opened,
+        }
+
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    now = time.time() if now is None else now
+    return max(0.0, when.timestamp() - now)
+
+
+def backoff_delay(
+    attempt: int,
+    base_seconds: float,
+    max_seconds: float,
+    retry_after: Optional[float] = None
+) -> float:
+    """
+    Delay before retry number `attempt` (0-based): the server's Retry-After
+    when given, else exponential backoff with full jitter.
+    """
+    if retry_after is not None:
+        return retry_after
+    return random.uniform(0, min(max_seconds, base_seconds * 2 ** attempt))
+
+
+def utc_timestamp(value: Optional[datetime]) -> Optional[float]:
+    """POSIX time of a naive UTC datetime as stored in the database."""
+    return value.replace(tzinfo=timezone.utc).timestamp() if value else None
+
+
+def utc_datetime(timestamp: float) -> datetime:
+    """Naive UTC datetime, as the models store, from POSIX time."""
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from news import fetch_and_cache_news, newsapi_client
+from singleflight import FileLease, SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class NewsIngestionScheduler:
+    """
+    Periodically refresh CachedNews in the background.
+
+    Feed requests only ever read from the cache; this task is the one
+    place that talks to NewsAPI on a schedule. Concurrent refreshes are
+    collapsed into one in-process, and a file lease keeps other workers
+    on the same host from refreshing at the same time. A feed that finds
+    the cache stale can ask for an early refresh with `revalidate`.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        interval_seconds: float,
+        jitter_seconds: float = 0.0,
+        lock_path: Optional[str] = None
+    ):
+        self.session_factory = session_factory
+        self.interval_seconds = interval_seconds
+        self.jitter_seconds = jitter_seconds
+
+        self._task: Optional[asyncio.Task] = None
+        self._revalidation: Optional[asyncio.Task] = None
+        self._flight = SingleFlight()
+        self._lease = FileLease(lock_path) if lock_path else None
+
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.last_started_at: Optional[datetime] = None
+        self.last_finished_at: Optional[datetime] = None
+        self.last_success_at: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+        self.last_article_count = 0
+        self.next_run_at: Optional[datetime] = None
+        self.revalidations = 0
+        self.last_revalidated_at: Optional[datetime] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def next_delay(self) -> float:
+        """Seconds until the next run, with random jitter applied."""
+        jitter = random.uniform(-self.jitter_seconds, self.jitter_seconds)
+        return max(1.0, self.interval_seconds + jitter)
+
+    async def run_once(
+        self,
+        force_refresh: bool = True,
+        max_age_seconds: Optional[float] = None
+    ) -> Optional[int]:
+        """
+        Run a single ingestion cycle, or join the one already in flight.
+
+        Args:
+            force_refresh: Whether to fetch even if the cache is still fresh
+            max_age_seconds: Skip if any worker completed a refresh this recently
+
+        Returns:
+            Number of articles fetched from NewsAPI, or None if the cycle was
+            skipped because another worker holds the lease or just refreshed
+        """
+        return await self._flight.do(
+            "refresh", lambda: self._refresh(force_refresh, max_age_seconds)
+        )
+
+    async def _refresh(self, force_refresh: bool, max_age_seconds: Optional[float]) -> Optional[int]:
+        if self._lease is not None:
+            if not self._lease.try_acquire():
+                self.skipped += 1
+                logger.info("Another worker is refreshing news, serving cached data")
+                return None
+            last = self._lease.last_completed()
+            if max_age_seconds is not None and last and time.time() - last < max_age_seconds:
+                self._lease.release()
+                self.skipped += 1
+                logger.info("News was refreshed recently by another worker, skipping")
+                return None
+
+        self.runs += 1
+        self.last_started_at = datetime.utcnow()
+        try:
+            async with self.session_factory() as db:
+                count = await fetch_and_cache_news(db, force_refresh=force_refresh)
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            logger.error(f"News ingestion failed: {e}")
+            raise
+        else:
+            self.last_error = None
+            self.last_success_at = datetime.utcnow()
+            self.last_article_count = count
+            if self._lease is not None:
+                self._lease.mark_completed()
+            return count
+        finally:
+            self.last_finished_at = datetime.utcnow()
+            if self._lease is not None:
+                self._lease.release()
+
+    def revalidate(self, min_interval_seconds: float) -> bool:
+        """
+        Refresh in the background because a reader found the cache stale.
+
+        Returns at once. Skipped while a refresh is in flight, while the
+        NewsAPI circuit is open, or if this worker started a refresh in the
+        last `min_interval_seconds`, so a stale cache under load does not
+        turn every feed request into a NewsAPI call.
+
+        Returns:
+            Whether a refresh was started
+        """
+        now = datetime.utcnow()
+        recent = max(filter(None, (self.last_started_at, self.last_revalidated_at)), default=None)
+        if (
+            self._flight.in_flight("refresh")
+            or (self._revalidation is not None and not self._revalidation.done())
+            or newsapi_client.breaker.retry_in() > 0
+            or (recent is not None and (now - recent).total_seconds() < min_interval_seconds)
+        ):
+            return False
+
+        self.revalidations += 1
+        self.last_revalidated_at = now
+        self._revalidation = asyncio.create_task(
+            self._revalidate(min_interval_seconds), name="news-revalidation"
+        )
+        return True
+
+    async def _revalidate(self, min_interval_seconds: float) -> None:
+        try:
+            await self.run_once(force_refresh=True, max_age_seconds=min_interval_seconds)
+        except Exception:
+            pass  # Already logged and recorded in status
+
+    async def _loop(self) -> None:
+        # Don't refetch on every restart if the cache is still fresh
+        force_refresh = False
+        while True:
+            try:
+                await self.run_once(
+                    force_refresh=force_refresh,
+                    max_age_seconds=self.interval_seconds / 2
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                pass  # Already logged and recorded in status
+            force_refresh = True
+
+            delay = self.next_delay()
+            self.next_run_at = datetime.utcnow() + timedelta(seconds=delay)
+            await asyncio.sleep(delay)
+
+    def start(self) -> None:
+        """Start the background loop."""
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._loop(), name="news-ingestion")
+        logger.info(
+            f"News ingestion scheduled every {self.interval_seconds:.0f}s "
+            f"(±{self.jitter_seconds:.0f}s)"
+        )
+
+    async def stop(self) -> None:
+        """Cancel the background loop (and any revalidation) and wait for it to exit."""
+        for task in (self._task, self._revalidation):
+            if task is None:
+                continue
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self._revalidation = None
+        self.next_run_at = None
+
+    def status(self) -> dict:
+        """Snapshot of the scheduler state for the status endpoint."""
+        def iso(value: Optional[datetime]) -> Optional[str]:
+            return value.isoformat() if value else None
+
+        return {
+            "running": self.running,
+            "interval_seconds": self.interval_seconds,
+            "jitter_seconds": self.jitter_seconds,
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "in_flight": self._flight.in_flight("refresh"),
+            "last_started_at": iso(self.last_started_at),
+            "last_finished_at": iso(self.last_finished_at),
+            "last_success_at": iso(self.last_success_at),
+            "last_error": self.last_error,
+            "last_article_count": self.last_article_count,
+            "next_run_at": iso(self.next_run_at),
+            "revalidations": self.revalidations,
+            "last_revalidated_at": iso(self.last_revalidated_at),
+            "newsapi": newsapi_client.status(),
+        }
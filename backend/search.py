@@ -0,0 +1,274 @@
+import base64
+import binascii
+import json
+import re
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer
+
+from models import CachedNews
+
+# SQLite: FTS5 table keyed by cached_news.id. Column weights favour the title.
+SQLITE_FTS_TABLE = "cached_news_fts"
+SQLITE_BM25_WEIGHTS = (10.0, 4.0, 1.0)  # title, description, content
+
+# Postgres: one tsvector per article with a GIN index, same weighting via setweight
+POSTGRES_SEARCH_TABLE = "cached_news_search"
+POSTGRES_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(:title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(:description, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(:content, '')), 'D')"
+)
+
+# Other databases: a LIKE scan over the same columns, same weights
+LIKE_COLUMNS = (("title", 10), ("description", 4), ("content", 1))
+
+_TERM_PATTERN = re.compile(r"\w+\*?", re.UNICODE)
+
+
+def _dialect(db: AsyncSession) -> str:
+    return db.get_bind().dialect.name
+
+
+def create_search_index(sync_conn) -> None:
+    """Create the full-text index table. Run with `conn.run_sync` at startup."""
+    dialect = sync_conn.dialect.name
+    if dialect == "sqlite":
+        sync_conn.exec_driver_sql(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_FTS_TABLE} USING fts5("
+            "title, description, content, "
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+    elif dialect == "postgresql":
+        sync_conn.exec_driver_sql(
+            f"CREATE TABLE IF NOT EXISTS {POSTGRES_SEARCH_TABLE} ("
+            "article_id INTEGER PRIMARY KEY REFERENCES cached_news(id) ON DELETE CASCADE, "
+            "document TSVECTOR NOT NULL)"
+        )
+        sync_conn.exec_driver_sql(
+            f"CREATE INDEX IF NOT EXISTS ix_{POSTGRES_SEARCH_TABLE}_document "
+            f"ON {POSTGRES_SEARCH_TABLE} USING GIN (document)"
+        )
+
+
+async def index_articles(db: AsyncSession, rows: Sequence[dict]) -> None:
+    """
+    Add or replace articles in the full-text index.
+
+    Args:
+        db: Database session (the caller commits)
+        rows: Dicts with id, title, description and content
+    """
+    if not rows:
+        return
+
+    params = [
+        {
+            "id": row["id"],
+            "title": row.get("title") or "",
+            "description": row.get("description") or "",
+            "content": row.get("content") or "",
+        }
+        for row in rows
+    ]
+    await remove_articles(db, [row["id"] for row in params])
+
+    dialect = _dialect(db)
+    if dialect == "sqlite":
+        await db.execute(text(
+            f"INSERT INTO {SQLITE_FTS_TABLE} (rowid, title, description, content) "
+            "VALUES (:id, :title, :description, :content)"
+        ), params)
+    elif dialect == "postgresql":
+        await db.execute(text(
+            f"INSERT INTO {POSTGRES_SEARCH_TABLE} (article_id, document) "
+            f"VALUES (:id, {POSTGRES_DOCUMENT})"
+        ), params)
+
+
+async def remove_articles(db: AsyncSession, ids: Sequence[int]) -> None:
+    """Remove articles from the full-text index."""
+    if not ids:
+        return
+
+    dialect = _dialect(db)
+    if dialect == "sqlite":
+        await db.execute(
+            text(f"DELETE FROM {SQLITE_FTS_TABLE} WHERE rowid = :id"),
+            [{"id": article_id} for article_id in ids]
+        )
+    elif dialect == "postgresql":
+        await db.execute(
+            text(f"DELETE FROM {POSTGRES_SEARCH_TABLE} WHERE article_id = :id"),
+            [{"id": article_id} for article_id in ids]
+        )
+
+
+async def rebuild_search_index(db: AsyncSession) -> None:
+    """Re-index every cached article (e.g. for a database created before search existed)."""
+    dialect = _dialect(db)
+    if dialect == "sqlite":
+        await db.execute(text(f"DELETE FROM {SQLITE_FTS_TABLE}"))
+        await db.execute(text(
+            f"INSERT INTO {SQLITE_FTS_TABLE} (rowid, title, description, content) "
+            "SELECT id, coalesce(title, ''), coalesce(description, ''), coalesce(content, '') "
+            "FROM cached_news"
+        ))
+    elif dialect == "postgresql":
+        document = POSTGRES_DOCUMENT.replace(":title", "title").replace(
+            ":description", "description"
+        ).replace(":content", "content")
+        await db.execute(text(f"DELETE FROM {POSTGRES_SEARCH_TABLE}"))
+        await db.execute(text(
+            f"INSERT INTO {POSTGRES_SEARCH_TABLE} (article_id, document) "
+            f"SELECT id, {document} FROM cached_news"
+        ))
+    await db.commit()
+
+
+def parse_query(query: str, prefix_last: bool = True) -> List[Tuple[str, bool]]:
+    """
+    Split a user query into (term, is_prefix) pairs.
+
+    Only word characters are kept, so user input can't inject FTS syntax.
+    A trailing `*` marks a prefix term; with `prefix_last` the last term is
+    always a prefix, for search-as-you-type.
+    """
+    terms = []
+    for match in _TERM_PATTERN.findall(query):
+        terms.append((match.rstrip("*").lower(), match.endswith("*")))
+    if terms and prefix_last:
+        terms[-1] = (terms[-1][0], True)
+    return terms
+
+
+def _sqlite_match(terms: List[Tuple[str, bool]]) -> str:
+    return " ".join(f'"{term}"*' if prefix else f'"{term}"' for term, prefix in terms)
+
+
+def _postgres_tsquery(terms: List[Tuple[str, bool]]) -> str:
+    return " & ".join(f"{term}:*" if prefix else term for term, prefix in terms)
+
+
+def _like_matches(terms: List[Tuple[str, bool]], params: dict) -> str:
+    """Matches subquery for databases without a full-text index: every term in some column."""
+    filters, hits = [], []
+    for i, (term, _) in enumerate(terms):
+        params[f"term{i}"] = "%" + re.sub(r"([!%_])", r"!\1", term) + "%"
+        matches = [
+            (f"lower(coalesce({column}, '')) LIKE :term{i} ESCAPE '!'", weight)
+            for column, weight in LIKE_COLUMNS
+        ]
+        filters.append("(" + " OR ".join(match for match, _ in matches) + ")")
+        hits.extend(f"CASE WHEN {match} THEN {weight} ELSE 0 END" for match, weight in matches)
+    return (
+        f"SELECT id, -({' + '.join(hits)}) AS score "
+        f"FROM cached_news WHERE {' AND '.join(filters)}"
+    )
+
+
+def encode_search_cursor(score: float, article_id: int) -> str:
+    raw = json.dumps([score, article_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_search_cursor(cursor: str) -> Tuple[float, int]:
+    """
+    Decode a cursor from `encode_search_cursor`.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        score, article_id = json.loads(raw)
+        return float(score), int(article_id)
+    except (TypeError, ValueError, binascii.Error) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+async def search_articles(
+    db: AsyncSession,
+    query: str,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    prefix_last: bool = True
+) -> Tuple[List[CachedNews], Optional[str]]:
+    """
+    Full-text search over cached articles, best match first.
+
+    Uses the FTS5 index on SQLite and the tsvector index on PostgreSQL; other
+    databases fall back to a LIKE scan ranked by weighted column hits.
+
+    Pages are keyset-paged on (score, id), so paging is best-effort: BM25
+    and ts_rank_cd scores depend on the whole corpus and shift when articles
+    are ingested or removed between pages, which can repeat or skip results
+    near the page boundary.
+
+    Args:
+        db: Database session
+        query: User search query
+        limit: Maximum number of articles to return
+        cursor: Cursor from a previous page, or None for the first page
+        prefix_last: Treat the last term as a prefix
+
+    Returns:
+        The matching articles and the cursor for the next page (None when
+        there are no more results)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    terms = parse_query(query, prefix_last=prefix_last)
+    if not terms or limit <= 0:
+        return [], None
+
+    # Scores are normalised so that lower is better on every dialect
+    dialect = _dialect(db)
+    params = {"limit": limit + 1}
+    if dialect == "sqlite":
+        weights = ", ".join(str(w) for w in SQLITE_BM25_WEIGHTS)
+        matches = (
+            f"SELECT rowid AS id, bm25({SQLITE_FTS_TABLE}, {weights}) AS score "
+            f"FROM {SQLITE_FTS_TABLE} WHERE {SQLITE_FTS_TABLE} MATCH :query"
+        )
+        params["query"] = _sqlite_match(terms)
+    elif dialect == "postgresql":
+        matches = (
+            "SELECT article_id AS id, -ts_rank_cd(document, to_tsquery('english', :query)) AS score "
+            f"FROM {POSTGRES_SEARCH_TABLE} WHERE document @@ to_tsquery('english', :query)"
+        )
+        params["query"] = _postgres_tsquery(terms)
+    else:
+        matches = _like_matches(terms, params)
+
+    where = ""
+    if cursor:
+        score, article_id = decode_search_cursor(cursor)
+        where = "WHERE score > :score OR (score = :score AND id > :id)"
+        params.update(score=score, id=article_id)
+
+    ranked = (await db.execute(text(
+        f"SELECT id, score FROM ({matches}) AS matches {where} "
+        "ORDER BY score, id LIMIT :limit"
+    ), params)).all()
+
+    next_cursor = None
+    if len(ranked) > limit:
+        ranked = ranked[:limit]
+        next_cursor = encode_search_cursor(ranked[-1].score, ranked[-1].id)
+
+    if not ranked:
+        return [], None
+
+    articles = {
+        article.id: article
+        for article in (await db.execute(
+            select(CachedNews).options(defer(CachedNews.content)).filter(
+                CachedNews.id.in_([row.id for row in ranked])
+            )
+        )).scalars()
+    }
+    return [articles[row.id] for row in ranked if row.id in articles], next_cursor
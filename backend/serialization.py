@@ -0,0 +1,57 @@
+import json
+from datetime import datetime
+from typing import Iterable, Optional
+
+try:
+    import orjson
+except ImportError:  # Optional: the stdlib encoder produces the same JSON, just slower
+    orjson = None
+
+
+def dumps(value) -> bytes:
+    """Encode a JSON value to compact UTF-8 bytes."""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def article_fragment(article) -> str:
+    """
+    Pre-render an article in the NewsArticle wire format, minus its id.
+
+    The id is only known after the row is inserted, so it is spliced in by
+    `article_json`. Works on dicts and on ORM objects/rows.
+    """
+    def field(name):
+        if isinstance(article, dict):
+            return article.get(name)
+        return getattr(article, name)
+
+    published_at = field("published_at")
+    if isinstance(published_at, datetime):
+        published_at = published_at.isoformat()
+
+    body = dumps({
+        "source": field("source") or "",
+        "title": field("title") or "",
+        "description": field("description") or "",
+        "url": field("url"),
+        "image_url": field("image_url"),
+        "published_at": published_at,
+        "category": field("category"),
+        "author": field("author"),
+    })
+    # Drop the opening brace; article_json puts "{"id":N," in front
+    return body[1:].decode()
+
+
+def article_json(article_id: int, fragment: Optional[str], article=None) -> bytes:
+    """Full JSON object for an article from its stored fragment."""
+    if fragment is None:
+        fragment = article_fragment(article)
+    return b'{"id":' + str(article_id).encode() + b"," + fragment.encode()
+
+
+def json_array(items: Iterable[bytes]) -> bytes:
+    """Join pre-encoded JSON values into a JSON array."""
+    return b"[" + b",".join(items) + b"]"
@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, fall back to in-process only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls for the same key into one.
+
+    The first caller runs the function; everyone who arrives while it is
+    in flight awaits the same result (or exception).
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._calls
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        future = self._calls.get(key)
+        if future is not None:
+            # Shield so a cancelled waiter doesn't cancel the shared call
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        # Mark exceptions as retrieved when nobody else was waiting
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._calls[key] = future
+        try:
+            result = await fn()
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+
+class FileLease:
+    """
+    Cross-process lease backed by an advisory lock on a local file.
+
+    Stands in for a DB lease so that several uvicorn workers on one host
+    don't refresh at the same time. The file also records when the last
+    refresh completed, so workers can skip a cycle another one just ran.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    def try_acquire(self) -> bool:
+        """Take the lease without blocking. Returns False if another process holds it."""
+        if self._fd is not None:
+            return False
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return False
+        self._fd = fd
+        return True
+
+    async def acquire(self, poll_seconds: float = 0.1) -> None:
+        """Wait until the lease is free, then take it."""
+        while not self.try_acquire():
+            await asyncio.sleep(poll_seconds)
+
+    def release(self) -> None:
+        if self._fd is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+
+    def last_completed(self) -> Optional[float]:
+        """Unix timestamp of the last completed run (e.g. a refresh or VACUUM), if any."""
+        try:
+            with open(self.path) as f:
+                return float(f.read().strip() or 0) or None
+        except (OSError, ValueError):
+            return None
+
+    def mark_completed(self) -> None:
+        """Record a completed run. Must hold the lease."""
+        if self._fd is None:
+            raise RuntimeError("Lease not held")
+        data = f"{time.time():.3f}".encode()
+        os.ftruncate(self._fd, 0)
+        os.lseek(self._fd, 0, os.SEEK_SET)
+        os.write(self._fd, data)
@@ -0,0 +1,39 @@
+import os
+import sys
+from contextlib import asynccontextmanager
+
+import pytest
+
+# The backend modules import each other as top-level modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine  # noqa: E402
+
+from models import Base  # noqa: E402
+from search import create_search_index  # noqa: E402
+
+
+@pytest.fixture
+def open_database(tmp_path):
+    """
+    Open a fresh SQLite database under tmp_path with the full schema.
+
+    Use as `async with open_database() as (engine, session_factory)` inside
+    the coroutine a test runs with asyncio.run. `before_create` is awaited
+    with the connection before the tables are created, e.g. to lay down a
+    legacy schema for the migrations to upgrade.
+    """
+    @asynccontextmanager
+    async def open_database(before_create=None):
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'okto.db'}")
+        try:
+            async with engine.begin() as conn:
+                if before_create is not None:
+                    await before_create(conn)
+                await conn.run_sync(Base.metadata.create_all)
+                await conn.run_sync(create_search_index)
+            yield engine, async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+        finally:
+            await engine.dispose()
+
+    return open_database
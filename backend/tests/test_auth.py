@@ -0,0 +1,39 @@
+from auth import TokenCache, TokenUser
+
+
+def test_token_cache_expires_with_the_token(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("auth.time.time", lambda: now[0])
+    cache = TokenCache(max_entries=10)
+    user = TokenUser(id=1, email="ada@example.com")
+
+    cache.put("live", user, expires_at=1060.0)
+    cache.put("expired", user, expires_at=1000.0)
+    assert cache.get("live") == user
+    assert cache.get("expired") is None
+
+    now[0] = 1060.0
+    assert cache.get("live") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_evict_user_forgets_only_their_tokens():
+    cache = TokenCache(max_entries=10)
+    ada, bo = TokenUser(id=1, email="ada@example.com"), TokenUser(id=2, email="bo@example.com")
+    expires_at = 2 ** 40
+    cache.put("ada-phone", ada, expires_at)
+    cache.put("ada-laptop", ada, expires_at)
+    cache.put("bo-phone", bo, expires_at)
+
+    cache.evict_user(1)
+    assert cache.get("ada-phone") is None and cache.get("ada-laptop") is None
+    assert cache.get("bo-phone") == bo
+
+
+def test_token_cache_is_bounded():
+    cache = TokenCache(max_entries=2)
+    user = TokenUser(id=1, email="ada@example.com")
+    for token in ("a", "b", "c"):
+        cache.put(token, user, 2 ** 40)
+    assert cache.get("a") is None
+    assert cache.get("c") == user
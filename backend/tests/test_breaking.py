@@ -0,0 +1,88 @@
+import asyncio
+from datetime import datetime
+
+from breaking import BreakingNewsHub, sse_event
+from news import cache_articles
+from topics import TOPIC_ECONOMY, TOPIC_HOUSING, TOPIC_LOANS
+
+
+def _drain(subscriber) -> list:
+    items = []
+    while not subscriber.queue.empty():
+        items.append(subscriber.queue.get_nowait())
+    return items
+
+
+def test_publish_shares_one_payload_per_topic_group():
+    async def run():
+        hub = BreakingNewsHub(session_factory=None, queue_size=10)
+        loans = [hub.subscribe(user_id, TOPIC_LOANS) for user_id in (1, 2)]
+        housing = hub.subscribe(3, TOPIC_HOUSING)
+        hub.publish([(10, TOPIC_LOANS, b'{"id":10}'), (11, TOPIC_LOANS | TOPIC_ECONOMY, b'{"id":11}')])
+        return hub, [_drain(s) for s in loans], _drain(housing)
+
+    hub, (first, second), housing = asyncio.run(run())
+    assert first == [sse_event(10, b'{"id":10}') + sse_event(11, b'{"id":11}')]
+    # The payload is built once and shared by the whole group
+    assert first[0] is second[0]
+    assert housing == []
+    assert hub.stats()["topic_groups"] == 2
+    assert hub.stats()["events_delivered"] == 4
+
+
+def test_full_queue_disconnects_the_subscriber():
+    async def run():
+        hub = BreakingNewsHub(session_factory=None, queue_size=1)
+        slow = hub.subscribe(1, TOPIC_LOANS)
+        hub.publish([(10, TOPIC_LOANS, b"{}")])
+        hub.publish([(11, TOPIC_LOANS, b"{}")])
+        return hub, slow, _drain(slow)
+
+    hub, slow, queued = asyncio.run(run())
+    assert slow.closed
+    # The backlog is dropped so the close marker gets through
+    assert queued == [None]
+    assert hub.connections == 0
+    assert hub.stats()["slow_disconnects"] == 1
+
+
+def test_replay_fills_the_gap_up_to_the_first_queued_event(open_database):
+    headlines = [
+        "Tax on petrol rises in January",
+        "Parliament debates a wealth tax",
+        "Small firms get a tax holiday",
+        "Sugar tax revenue beats forecast",
+    ]
+
+    async def ingest(session_factory, titles):
+        async with session_factory() as db:
+            await cache_articles(db, [
+                {"title": title, "description": "", "url": f"https://a.example/{title}",
+                 "published_at": datetime.utcnow().isoformat(), "category": "finance"}
+                for title in titles
+            ])
+
+    async def run():
+        async with open_database() as (engine, session_factory):
+            hub = BreakingNewsHub(session_factory, queue_size=10)
+            await ingest(session_factory, headlines[:1])
+            await hub.poll_once()  # Baseline: nothing is news yet
+
+            subscriber = hub.subscribe(1, TOPIC_ECONOMY)
+            await ingest(session_factory, headlines[1:3])
+            published = await hub.poll_once()
+            # A client that last saw the first article reconnects
+            replayed = await hub.replay(subscriber, after_id=1)
+            # Articles already queued for the stream are not replayed twice
+            await ingest(session_factory, headlines[3:])
+            late = hub.subscribe(2, TOPIC_ECONOMY)
+            await hub.poll_once()
+            late_replay = await hub.replay(late, after_id=1)
+        return published, replayed, _drain(subscriber), late_replay, _drain(late)
+
+    published, replayed, queued, late_replay, late_queued = asyncio.run(run())
+    assert published == 2
+    assert replayed == []
+    assert len(queued) == 2
+    assert [event.split(b"\n")[0] for event in late_replay] == [b"id: 2", b"id: 3"]
+    assert late_queued[0].startswith(b"id: 4\n")
@@ -0,0 +1,41 @@
+import asyncio
+
+from compression import CompressionMiddleware
+
+ETAG = b'"abc123"'
+
+
+def _app(status: int, body: bytes):
+    async def app(scope, receive, send):
+        headers = [(b"content-type", b"application/json"), (b"etag", ETAG)]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+    return app
+
+
+def _request(app, accept_encoding: bytes) -> dict:
+    sent = []
+
+    async def receive():
+        return {"type": "http.request"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "headers": [(b"accept-encoding", accept_encoding)]}
+    asyncio.run(CompressionMiddleware(app, minimum_size=100)(scope, receive, send))
+    return dict(sent[0]["headers"])
+
+
+def test_304_carries_the_same_weak_etag_as_the_compressed_200():
+    ok = _request(_app(200, b"[" + b"1," * 200 + b"1]"), b"gzip")
+    not_modified = _request(_app(304, b""), b"gzip")
+    small = _request(_app(200, b"[]"), b"gzip")
+
+    assert ok[b"content-encoding"] == b"gzip"
+    assert ok[b"etag"] == not_modified[b"etag"] == small[b"etag"] == b"W/" + ETAG
+    assert not_modified[b"vary"] == b"Accept-Encoding"
+
+
+def test_etag_stays_strong_without_accept_encoding():
+    assert _request(_app(304, b""), b"identity")[b"etag"] == ETAG
@@ -0,0 +1,72 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select
+
+from digest import DigestOptions, build_digests, score_group
+from models import CachedNews, DailyDigest, Profile, User
+from topics import TOPIC_ECONOMY, TOPIC_HOUSING, TOPIC_LOANS
+
+HOUR = 3600.0
+
+
+def test_score_group_ranks_by_matched_interests_then_freshness():
+    now = 100 * HOUR
+    articles = [
+        (1, TOPIC_LOANS, now - 1 * HOUR),
+        (2, TOPIC_LOANS | TOPIC_ECONOMY, now - 20 * HOUR),
+        (3, TOPIC_LOANS, now - 5 * HOUR),
+        (4, TOPIC_HOUSING, now),
+    ]
+    picked = score_group(TOPIC_LOANS | TOPIC_ECONOMY, articles, now, DigestOptions(size=10))
+    assert picked == [2, 1, 3]
+
+
+def test_score_group_caps_a_topic_before_filling_with_the_rest():
+    now = 100 * HOUR
+    loans = [(i, TOPIC_LOANS, now - i * HOUR) for i in range(1, 5)]
+    economy = [(10, TOPIC_ECONOMY, now - 30 * HOUR)]
+    options = DigestOptions(size=4, max_per_topic=2)
+
+    picked = score_group(TOPIC_LOANS | TOPIC_ECONOMY, loans + economy, now, options)
+    # Two loan stories, then the older economy one, then the best skipped loan story
+    assert picked == [1, 2, 10, 3]
+
+
+def test_build_digests_scores_each_interest_signature_once(open_database):
+    now = datetime.utcnow()
+
+    async def run():
+        async with open_database() as (engine, session_factory):
+            async with session_factory() as db:
+                await db.execute(insert(User), [{"id": i, "email": f"u{i}@example.com"} for i in range(1, 5)])
+                await db.execute(insert(Profile), [
+                    {"user_id": 1, "num_loans": 1, "daily_digest": True},
+                    {"user_id": 2, "num_loans": 2, "daily_digest": True},
+                    {"user_id": 3, "housing_type": "Ejerbolig", "daily_digest": True},
+                    {"user_id": 4, "num_loans": 1, "daily_digest": False},
+                ])
+                await db.execute(insert(CachedNews), [
+                    {"id": 1, "url": "https://a.example/1", "topic_mask": TOPIC_LOANS | TOPIC_ECONOMY,
+                     "published_at": now - timedelta(hours=2)},
+                    {"id": 2, "url": "https://a.example/2", "topic_mask": TOPIC_LOANS,
+                     "published_at": now - timedelta(hours=1)},
+                    {"id": 3, "url": "https://a.example/3", "topic_mask": TOPIC_HOUSING,
+                     "published_at": now - timedelta(minutes=10)},
+                    # Outside the 24 hour window
+                    {"id": 4, "url": "https://a.example/4", "topic_mask": TOPIC_ECONOMY,
+                     "published_at": now - timedelta(hours=30)},
+                ])
+                await db.commit()
+
+            report = await build_digests(session_factory, DigestOptions(size=5))
+            async with session_factory() as db:
+                digests = {
+                    row.user_id: row.article_ids
+                    for row in (await db.execute(select(DailyDigest))).scalars()
+                }
+        return report, digests
+
+    report, digests = asyncio.run(run())
+    assert report.groups == 2 and report.users == 3 and report.articles == 3
+    assert digests == {1: [1, 2], 2: [1, 2], 3: [3, 1]}
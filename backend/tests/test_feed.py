@@ -0,0 +1,181 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+
+import main
+from auth import token_cache
+from database import get_db
+from feed_cache import feed_cache
+from news import cache_articles
+
+
+# Distinct enough that near-duplicate detection keeps them all; "tax" tags
+# them as economy news, which every profile gets
+HEADLINES = [
+    ("Tax on petrol rises in January", "Drivers face higher prices at the pump"),
+    ("Parliament debates a wealth tax", "Opposition parties split over the proposal"),
+    ("Tax deductions for commuters cut", "Workers living far from offices lose out"),
+    ("Small firms get a tax holiday", "Startups skip payroll levies for two years"),
+    ("Tax authority hires auditors", "Hundreds of new inspectors start this spring"),
+    ("Sugar tax revenue beats forecast", "Soft drink makers reformulated fewer products"),
+]
+
+
+def _article(i: int, published_at: datetime) -> dict:
+    title, description = HEADLINES[i]
+    return {
+        "source": f"Outlet {i}",
+        "title": title,
+        "description": description,
+        "url": f"https://a.example/{i}",
+        "published_at": published_at.isoformat(),
+        "category": "finance",
+    }
+
+
+@pytest.fixture
+def serve(open_database, monkeypatch):
+    """Run the app against a fresh database, without its background tasks."""
+    monkeypatch.setattr(main.settings, "news_ingestion_enabled", False)
+
+    @asynccontextmanager
+    async def serve():
+        # The caches are module globals shared with other tests
+        feed_cache.bump_generation()
+        token_cache.clear()
+        async with open_database() as (engine, session_factory):
+            async def override_get_db():
+                async with session_factory() as db:
+                    yield db
+
+            main.app.dependency_overrides[get_db] = override_get_db
+            try:
+                transport = httpx.ASGITransport(app=main.app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                    yield client, session_factory
+            finally:
+                main.app.dependency_overrides.pop(get_db, None)
+
+    return serve
+
+
+async def _signup(client: httpx.AsyncClient) -> tuple:
+    response = await client.post("/auth/signup", json={
+        "first_name": "Ada", "last_name": "Lund", "email": "ada@example.com", "password": "secret",
+    })
+    body = response.json()
+    return body["user_id"], body["access_token"]
+
+
+async def _ingest(session_factory, count: int) -> None:
+    now = datetime.utcnow()
+    async with session_factory() as db:
+        await cache_articles(db, [_article(i, now - timedelta(minutes=i)) for i in range(count)])
+
+
+def test_feed_pages_with_keyset_cursor(serve):
+    async def run():
+        async with serve() as (client, session_factory):
+            await _ingest(session_factory, 5)
+            user_id, token = await _signup(client)
+
+            urls, cursor, pages = [], None, 0
+            while True:
+                params = {"user_id": user_id, "token": token, "limit": 2}
+                if cursor:
+                    params["cursor"] = cursor
+                response = await client.get("/news/feed", params=params)
+                assert response.status_code == 200
+                urls.extend(article["url"] for article in response.json())
+                pages += 1
+                cursor = response.headers.get("X-Next-Cursor")
+                if cursor is None:
+                    break
+
+            bad = await client.get("/news/feed", params={
+                "user_id": user_id, "token": token, "cursor": "not-a-cursor",
+            })
+        return urls, pages, bad
+
+    urls, pages, bad = asyncio.run(run())
+    # Newest first, every article exactly once
+    assert urls == [f"https://a.example/{i}" for i in range(5)]
+    assert pages == 3
+    assert bad.status_code == 400
+    assert bad.json()["detail"] == "Invalid cursor"
+
+
+def test_feed_cache_follows_profile_updates_and_other_workers_ingests(serve, monkeypatch):
+    async def run():
+        async with serve() as (client, session_factory):
+            await _ingest(session_factory, 2)
+            async with session_factory() as db:
+                await cache_articles(db, [{
+                    "source": "Outlet L", "title": "Mortgage lenders cut fixed rates",
+                    "description": "Borrowers can lock in cheaper loans", "url": "https://l.example/1",
+                    "published_at": datetime.utcnow().isoformat(), "category": "finance",
+                }])
+            user_id, token = await _signup(client)
+            params = {"user_id": user_id, "token": token}
+
+            async def feed_urls() -> list:
+                return [article["url"] for article in (await client.get("/news/feed", params=params)).json()]
+
+            before = await feed_urls()
+            hits = feed_cache.hits
+            cached = await feed_urls()
+            hit = feed_cache.hits == hits + 1
+            hits = feed_cache.hits
+
+            # Loans are now relevant, so the mortgage story joins the feed
+            await client.put(f"/users/{user_id}/profile", params={"token": token}, json={"num_loans": 1})
+            after_update = await feed_urls()
+            missed_after_update = feed_cache.hits == hits
+
+            # Another worker ingests: this worker's in-process generation
+            # doesn't move, but the one stored in the database does
+            with monkeypatch.context() as m:
+                m.setattr("news.feed_cache", type(feed_cache)())
+                await _ingest(session_factory, 3)
+            after_ingest = await feed_urls()
+        return before, cached, hit, after_update, missed_after_update, after_ingest
+
+    before, cached, hit, after_update, missed_after_update, after_ingest = asyncio.run(run())
+    assert hit and cached == before == ["https://a.example/0", "https://a.example/1"]
+    assert missed_after_update
+    assert after_update == ["https://l.example/1", "https://a.example/0", "https://a.example/1"]
+    assert "https://a.example/2" in after_ingest
+
+
+def test_feed_revalidates_with_etag_until_articles_change(serve):
+    async def run():
+        async with serve() as (client, session_factory):
+            await _ingest(session_factory, 2)
+            user_id, token = await _signup(client)
+            params = {"user_id": user_id, "token": token}
+
+            first = await client.get("/news/feed", params=params, headers={"Accept-Encoding": "identity"})
+            etag = first.headers["ETag"]
+            unchanged = await client.get("/news/feed", params=params, headers={"If-None-Match": etag})
+            # Clients that got the compressed page send back the weak form
+            weak = await client.get("/news/feed", params=params, headers={"If-None-Match": f"W/{etag}"})
+            other_page = await client.get(
+                "/news/feed", params={**params, "limit": 1}, headers={"If-None-Match": etag}
+            )
+
+            await _ingest(session_factory, 3)
+            changed = await client.get("/news/feed", params=params, headers={"If-None-Match": etag})
+        return etag, unchanged, weak, other_page, changed
+
+    etag, unchanged, weak, other_page, changed = asyncio.run(run())
+    assert not etag.startswith("W/")
+    assert unchanged.status_code == 304 and unchanged.content == b""
+    assert unchanged.headers["ETag"].removeprefix("W/") == etag
+    assert weak.status_code == 304
+    assert other_page.status_code == 200
+    assert changed.status_code == 200
+    assert changed.headers["ETag"].removeprefix("W/") != etag
+    assert len(changed.json()) == 3
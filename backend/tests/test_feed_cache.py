@@ -0,0 +1,38 @@
+from feed_cache import FeedCache
+
+
+def test_profile_and_ingest_changes_miss():
+    cache = FeedCache(max_entries=10, ttl_seconds=60)
+    cache.set(cache.key(1, "v1", 5, 20, None), "page")
+    cache.set(cache.key(2, "v1", 5, 20, None), "other")
+
+    assert cache.get(cache.key(1, "v1", 5, 20, None)) == "page"
+    # A new profile version or database generation is a different key
+    assert cache.get(cache.key(1, "v2", 5, 20, None)) is None
+    assert cache.get(cache.key(1, "v1", 6, 20, None)) is None
+
+    cache.invalidate_user(1)
+    assert cache.get(cache.key(1, "v1", 5, 20, None)) is None
+    assert cache.get(cache.key(2, "v1", 5, 20, None)) == "other"
+
+    old_key = cache.key(2, "v1", 5, 20, None)
+    cache.bump_generation()
+    assert cache.key(2, "v1", 5, 20, None) != old_key
+    assert cache.get(old_key) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_expired_and_least_recent_entries_are_dropped(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("feed_cache.time.monotonic", lambda: now[0])
+    cache = FeedCache(max_entries=2, ttl_seconds=10)
+    for user_id in (1, 2):
+        cache.set(cache.key(user_id, None), user_id)
+    cache.get(cache.key(1, None))
+    cache.set(cache.key(3, None), 3)
+
+    assert cache.get(cache.key(2, None)) is None
+    assert cache.stats()["evictions"] == 1
+
+    now[0] += 11
+    assert cache.get(cache.key(1, None)) is None
@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+import insights
+from insights import PROFILE_FIELDS, RULES, Rule, RuleEngine
+
+# Every operator, on numeric and text fields
+RULES_UNDER_TEST = RULES + (
+    Rule("high_debt", "", "", "market", (("total_debt", ">=", 500_000.0), ("num_loans", "<", 3))),
+    Rule("young_renters", "", "", "market", (("age", "<=", 30), ("housing_type", "!=", "Ejerbolig"))),
+    Rule("fixed_or_mixed", "", "", "market", (("interest_rate_type", "in", ["Fast", "Blandet"]),)),
+    Rule("not_electric", "", "", "market", (("vehicle_type", "not in", ("Elbil", "Hybrid")),)),
+    Rule("exact_age", "", "", "market", (("age", "==", 40), ("annual_gross_income", ">", 0))),
+    Rule("always", "", "", "market", ()),
+)
+
+
+def _random_profiles(count: int) -> list:
+    rng = random.Random(3)
+    choices = {
+        "num_loans": [None, 0, 1, 2, 5],
+        "total_debt": [None, 0.0, 250_000.0, 500_000.0, 1_200_000.5],
+        "interest_rate_type": [None, "Fast", "Variabel", "Blandet"],
+        "vehicle_type": [None, "Elbil", "Hybrid", "Benzin/diesel"],
+        "housing_type": [None, "Lejebolig", "Andelsbolig", "Ejerbolig"],
+        "housing_value": [None, 1_500_000.0],
+        "annual_gross_income": [None, 0.0, 420_000.0],
+        "age": [None, 22, 30, 40, 67],
+    }
+    return [{name: rng.choice(choices[name]) for name in PROFILE_FIELDS} for _ in range(count)]
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_evaluate_columns_matches_evaluate(monkeypatch, use_numpy):
+    if use_numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(insights, "np", None)
+    engine = RuleEngine(RULES_UNDER_TEST)
+    profiles = _random_profiles(400)
+
+    columns = {name: [profile[name] for profile in profiles] for name in PROFILE_FIELDS}
+    matches = engine.evaluate_columns(columns)
+
+    for i, profile in enumerate(profiles):
+        expected = [rule.id for rule in engine.evaluate(profile)]
+        assert [rule.id for rule in engine.rules if matches[rule.id][i]] == expected
+    # Every rule matches some rows and misses others (bar the unconditional one)
+    assert all(0 < sum(hits) < len(profiles) for rule_id, hits in matches.items() if rule_id != "always")
+
+
+def test_rules_are_validated_when_compiled():
+    with pytest.raises(ValueError):
+        RuleEngine([Rule("a", "", "", "market", (("age", "~", 1),))])
+    with pytest.raises(ValueError):
+        RuleEngine([Rule("a", "", "", "market", (("shoe_size", "==", 1),))])
+    with pytest.raises(ValueError):
+        RuleEngine([RULES[0], RULES[0]])
@@ -0,0 +1,87 @@
+import asyncio
+import gzip
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from maintenance import MaintenanceTask, RetentionPolicy, run_retention
+from models import ArticleDuplicate, CachedNews
+from news import cache_articles
+
+DESCRIPTION = (
+    "The central bank raised its key interest rate by half a percentage point "
+    "on Thursday, citing persistent inflation in housing and energy prices"
+)
+
+
+def _article(url: str, source: str, published_at: datetime) -> dict:
+    return {
+        "source": source,
+        "title": f"Central bank raises interest rate again - {source}",
+        "description": DESCRIPTION,
+        "url": url,
+        "published_at": published_at.isoformat(),
+        "category": "finance",
+    }
+
+
+async def _archive_deduplicated(open_database, tmp_path) -> tuple:
+    async with open_database() as (engine, session_factory):
+        published_at = datetime.utcnow() - timedelta(days=60)
+        async with session_factory() as db:
+            result = await cache_articles(db, [
+                _article("https://a.example/rate", "Outlet A", published_at),
+                _article("https://b.example/rate", "Outlet B", published_at),
+            ])
+
+        archive_dir = tmp_path / "archive"
+        report = await run_retention(
+            session_factory, engine, RetentionPolicy(max_age_days=30, archive_dir=str(archive_dir))
+        )
+
+        async with session_factory() as db:
+            remaining = (await db.execute(select(func.count(CachedNews.id)))).scalar()
+            duplicates = (await db.execute(select(func.count()).select_from(ArticleDuplicate))).scalar()
+
+    rows = []
+    for path in archive_dir.iterdir():
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            rows.extend(json.loads(line) for line in f)
+    return result, report, remaining, duplicates, rows
+
+
+def test_retention_archives_deduplicated_article(open_database, tmp_path):
+    result, report, remaining, duplicates, rows = asyncio.run(_archive_deduplicated(open_database, tmp_path))
+
+    assert result.inserted == 1 and result.duplicates == 1
+    assert report.rows_deleted == 1 and report.rows_archived == 1
+    assert remaining == 0 and duplicates == 0
+
+    [row] = rows
+    assert row["url"] == "https://a.example/rate"
+    assert row["description"] == DESCRIPTION
+    assert not CachedNews.DERIVED_COLUMNS & row.keys()
+
+
+async def _vacuum_across_restart(open_database, tmp_path) -> tuple:
+    lock_path = str(tmp_path / "maintenance.lock")
+    reports = []
+    async with open_database() as (engine, session_factory):
+        # A fresh task per run, as after a restart; each run has rows to delete
+        for i in range(2):
+            async with session_factory() as db:
+                await cache_articles(db, [
+                    _article(f"https://a.example/{i}", "Outlet A", datetime.utcnow() - timedelta(days=60))
+                ])
+            task = MaintenanceTask(session_factory, engine, RetentionPolicy(), 3600, lock_path=lock_path)
+            reports.append(await task.run_once())
+    return reports, task
+
+
+def test_vacuum_is_not_repeated_after_restart(open_database, tmp_path):
+    (first, second), task = asyncio.run(_vacuum_across_restart(open_database, tmp_path))
+
+    assert first.vacuumed
+    assert not second.vacuumed
+    assert task.status()["last_vacuum_at"] is not None
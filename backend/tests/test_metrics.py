@@ -0,0 +1,47 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+from metrics import MetricsMiddleware, http_request_duration, http_requests, registry
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"id": item_id}
+
+    @app.get("/broken")
+    async def broken():
+        raise RuntimeError("boom")
+
+    app.add_middleware(MetricsMiddleware)
+    return app
+
+
+def test_requests_are_labelled_by_route_template():
+    async def run():
+        transport = httpx.ASGITransport(app=_app(), raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            for path in ("/items/1", "/items/2", "/items/3", "/wp-login.php", "/.env", "/broken"):
+                await client.get(path)
+
+    before = {
+        "items": http_requests.value("GET", "/items/{item_id}", "200"),
+        "unmatched": http_requests.value("GET", "unmatched", "404"),
+        "broken": http_requests.value("GET", "/broken", "500"),
+        "observed": http_request_duration.count("GET", "/items/{item_id}"),
+    }
+    asyncio.run(run())
+
+    assert http_requests.value("GET", "/items/{item_id}", "200") - before["items"] == 3
+    assert http_request_duration.count("GET", "/items/{item_id}") - before["observed"] == 3
+    # Unknown paths share one label instead of one series each
+    assert http_requests.value("GET", "unmatched", "404") - before["unmatched"] == 2
+    assert http_requests.value("GET", "/broken", "500") - before["broken"] == 1
+
+    exposition = registry.render()
+    assert 'okto_http_requests_total{method="GET",route="/items/{item_id}",status="200"}' in exposition
+    assert "/items/1" not in exposition
@@ -0,0 +1,53 @@
+import asyncio
+from datetime import datetime
+
+from sqlalchemy import func, select, text
+
+from migrations import migrate
+from models import ArticleTopic, CachedNews
+from search import search_articles
+
+# cached_news as created by the first release, before any derived columns
+LEGACY_CACHED_NEWS = """
+CREATE TABLE cached_news (
+    id INTEGER PRIMARY KEY,
+    source VARCHAR, title VARCHAR, description TEXT, url VARCHAR UNIQUE,
+    image_url VARCHAR, published_at DATETIME, category VARCHAR,
+    author VARCHAR, content TEXT, cached_at DATETIME
+)
+"""
+
+
+async def _create_legacy_schema(conn) -> None:
+    await conn.exec_driver_sql(LEGACY_CACHED_NEWS)
+    await conn.execute(text(
+        "INSERT INTO cached_news (source, title, description, url, published_at, category, cached_at) "
+        "VALUES ('Wire', 'Mortgage rates rise', 'Banks lift interest rates on home loans', "
+        "'https://a.example/rates', :now, 'finance', :now)"
+    ), {"now": datetime.utcnow()})
+
+
+async def _migrate_legacy(open_database) -> tuple:
+    async with open_database(before_create=_create_legacy_schema) as (engine, session_factory):
+        report = await migrate(engine, session_factory)
+        again = await migrate(engine, session_factory)
+
+        async with session_factory() as db:
+            article = (await db.execute(select(CachedNews))).scalar_one()
+            topics = (await db.execute(select(func.count()).select_from(ArticleTopic))).scalar()
+            found, _ = await search_articles(db, "mortgage")
+    return report, again, article, topics, found
+
+
+def test_migrate_adds_columns_and_backfills_legacy_rows(open_database):
+    report, again, article, topics, found = asyncio.run(_migrate_legacy(open_database))
+
+    assert "cached_news.topic_mask" in report.columns_added
+    assert "cached_news.minhash" in report.columns_added
+    assert "ix_cached_news_published" in report.indexes_created
+    assert report.articles_backfilled == 1
+    assert article.topic_mask and article.feed_json and article.topic_weights
+    assert topics == bin(article.topic_mask).count("1")
+    assert [a.id for a in found] == [article.id]
+
+    assert again.columns_added == [] and again.indexes_created == [] and again.articles_backfilled == 0
@@ -0,0 +1,48 @@
+import asyncio
+
+import httpx
+import pytest
+
+from news import NewsAPIClient, default_daily_quota
+from resilience import CircuitBreaker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _client(handler, breaker: CircuitBreaker) -> NewsAPIClient:
+    return NewsAPIClient(
+        api_key="test",
+        transport=httpx.MockTransport(handler),
+        breaker=breaker,
+        max_retries=0,
+    )
+
+
+def test_unhandled_response_does_not_leave_trial_in_flight():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=10, clock=clock)
+    breaker.record_failure()
+    clock.now += 11
+
+    # An article that isn't an object makes parse_article raise
+    bad = _client(lambda request: httpx.Response(200, json={"status": "ok", "articles": [None]}), breaker)
+    with pytest.raises(AttributeError):
+        asyncio.run(bad.fetch())
+    assert breaker.state == CircuitBreaker.OPEN
+
+    clock.now += 11
+    good = _client(lambda request: httpx.Response(200, json={"status": "ok", "articles": []}), breaker)
+    assert asyncio.run(good.fetch()) == []
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_default_daily_quota_covers_the_schedule():
+    # 5 queries, 1 page, hourly: 120 scheduled requests, doubled
+    assert default_daily_quota(queries=5, pages_per_query=1, interval_minutes=60) == 240
+    assert default_daily_quota(queries=5, pages_per_query=2, interval_minutes=180) == 160
@@ -0,0 +1,66 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+import ranking
+from ranking import profile_vector, rank_articles, score_articles
+from topics import TOPIC_ECONOMY, TOPIC_LOANS, topic_weights
+
+NOW = datetime(2026, 3, 1, 12, 0)
+
+
+def _random_articles(count: int) -> list:
+    rng = random.Random(7)
+    articles = []
+    for i in range(count):
+        weights = [round(rng.random(), 4) if rng.random() < 0.5 else 0.0 for _ in range(5)]
+        articles.append({
+            "id": i,
+            "topic_weights": weights,
+            "topic_mask": 0,
+            # Up to 30 days old, plus one with no date and one from the future
+            "published_at": NOW - timedelta(hours=rng.uniform(-2, 720)) if i % 50 else None,
+        })
+    return articles
+
+
+def test_numpy_and_pure_python_scores_agree(monkeypatch):
+    pytest.importorskip("numpy")
+    articles = _random_articles(300)
+    profile = profile_vector({
+        "num_loans": 2, "interest_rate_type": "Variabel", "housing_type": "Andelsbolig",
+        "savings_types": ["Aktier"], "annual_gross_income": 700_000,
+    })
+    now = ranking.utc_timestamp(NOW)
+
+    with_numpy = rank_articles(articles, profile, now=now, half_life_hours=12)
+    vectors = [a["topic_weights"] for a in articles]
+    times = [ranking._timestamp(a) for a in articles]
+    numpy_scores = score_articles(vectors, times, profile, now=now, half_life_hours=12)
+
+    monkeypatch.setattr(ranking, "np", None)
+    without_numpy = rank_articles(articles, profile, now=now, half_life_hours=12)
+    python_scores = score_articles(vectors, times, profile, now=now, half_life_hours=12)
+
+    assert [a["id"] for a in with_numpy] == [a["id"] for a in without_numpy]
+    assert python_scores == pytest.approx(numpy_scores, rel=1e-12)
+
+
+def test_rank_articles_prefers_matching_topics_then_recency():
+    profile = profile_vector({"num_loans": 1})
+    loans = topic_weights({"title": "Mortgage rates rise"})
+    economy = topic_weights({"title": "Economy grows"})
+    articles = [
+        {"id": "old-loans", "topic_weights": loans, "published_at": NOW - timedelta(hours=48)},
+        {"id": "new-loans", "topic_weights": loans, "published_at": NOW - timedelta(hours=1)},
+        {"id": "economy", "topic_weights": economy, "published_at": NOW - timedelta(hours=1)},
+        # Rows without stored weights fall back to their topic mask
+        {"id": "legacy", "topic_weights": None, "topic_mask": TOPIC_LOANS | TOPIC_ECONOMY,
+         "published_at": NOW - timedelta(hours=1)},
+        {"id": "unrelated", "topic_weights": [0.0] * 5, "published_at": NOW},
+    ]
+    ranked = rank_articles(articles, profile, now=ranking.utc_timestamp(NOW), half_life_hours=24)
+    # Loans and economy beat loans alone; two half-lives drop old loan news
+    # below fresh economy news, and articles scoring zero are left out
+    assert [a["id"] for a in ranked] == ["legacy", "new-loans", "economy", "old-loans"]
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+from sqlalchemy import insert
+
+import search
+from models import CachedNews
+from news import cache_articles
+
+
+def test_like_fallback_ranks_title_hits_first_and_pages(open_database, monkeypatch):
+    # Run the fallback for databases without a full-text index on SQLite
+    monkeypatch.setattr(search, "_dialect", lambda db: "mysql")
+
+    async def run():
+        async with open_database() as (engine, session_factory):
+            async with session_factory() as db:
+                await db.execute(insert(CachedNews), [
+                    {"title": "Markets calm", "description": "Mortgage lenders wait", "url": "https://a.example/1"},
+                    {"title": "Mortgage rates rise", "description": "Banks move", "url": "https://a.example/2"},
+                    {"title": "Sports", "description": "No match here", "url": "https://a.example/3"},
+                    {"title": "100%_mortgage deal", "description": "", "url": "https://a.example/4"},
+                ])
+                await db.commit()
+
+                first, cursor = await search.search_articles(db, "mortgage", limit=1)
+                rest, end = await search.search_articles(db, "mortgage", limit=10, cursor=cursor)
+                literal, _ = await search.search_articles(db, "100%_", limit=10)
+        return first, rest, end, literal
+
+    first, rest, end, literal = asyncio.run(run())
+    assert [a.url for a in first] == ["https://a.example/2"]
+    assert [a.url for a in rest] == ["https://a.example/4", "https://a.example/1"]
+    assert end is None
+    # Wildcards in the query are matched literally
+    assert [a.url for a in literal] == ["https://a.example/4"]
+
+
+def test_fts5_search_ranks_pages_and_follows_removals(open_database):
+    async def run():
+        async with open_database() as (engine, session_factory):
+            async with session_factory() as db:
+                await cache_articles(db, [
+                    {"title": "Pension funds shift to bonds", "description": "Mortgage lenders wait on the bank",
+                     "url": "https://a.example/1", "category": "finance"},
+                    {"title": "Mortgage rates rise for first-time buyers", "description": "Banks follow the policy rate",
+                     "url": "https://a.example/2", "category": "finance"},
+                    {"title": "Football results", "description": "The derby ended in a draw",
+                     "url": "https://a.example/3", "category": "finance"},
+                    {"title": "Bolígrafo tax on Café imports", "description": "Importers pay more duty",
+                     "url": "https://a.example/4", "category": "finance"},
+                ])
+                first, cursor = await search.search_articles(db, "mortgage", limit=1)
+                rest, end = await search.search_articles(db, "mortgage", limit=10, cursor=cursor)
+                prefix, _ = await search.search_articles(db, "mortg")
+                whole_word, _ = await search.search_articles(db, "mortg", prefix_last=False)
+                diacritics, _ = await search.search_articles(db, "cafe")
+
+                await search.remove_articles(db, [first[0].id])
+                await db.commit()
+                after_removal, _ = await search.search_articles(db, "mortgage")
+        return first, rest, end, prefix, whole_word, diacritics, after_removal
+
+    first, rest, end, prefix, whole_word, diacritics, after_removal = asyncio.run(run())
+    # A title hit outranks a description hit
+    assert [a.url for a in first] == ["https://a.example/2"]
+    assert [a.url for a in rest] == ["https://a.example/1"]
+    assert end is None
+    assert {a.url for a in prefix} == {"https://a.example/1", "https://a.example/2"}
+    assert whole_word == []
+    assert [a.url for a in diacritics] == ["https://a.example/4"]
+    assert [a.url for a in after_removal] == ["https://a.example/1"]
+
+
+def test_decode_search_cursor_rejects_garbage():
+    cursor = search.encode_search_cursor(1.5, 42)
+    assert search.decode_search_cursor(cursor) == (1.5, 42)
+    with pytest.raises(ValueError):
+        search.decode_search_cursor("not-a-cursor")
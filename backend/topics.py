@@ -0,0 +1,136 @@
+import re
+from typing import Iterable, List, Optional
+
+# Topic bits stored in CachedNews.topic_mask
+TOPIC_LOANS = 1 << 0
+TOPIC_HOUSING = 1 << 1
+TOPIC_SAVINGS = 1 << 2
+TOPIC_ECONOMY = 1 << 3  # Tax/economic news, relevant to everyone
+TOPIC_EV = 1 << 4
+
+TOPIC_NAMES = {
+    TOPIC_LOANS: "loans",
+    TOPIC_HOUSING: "housing",
+    TOPIC_SAVINGS: "savings",
+    TOPIC_ECONOMY: "economy",
+    TOPIC_EV: "ev",
+}
+
+TOPIC_KEYWORDS = {
+    TOPIC_LOANS: ["loan", "mortgage", "interest", "rate"],
+    TOPIC_HOUSING: ["housing", "real estate", "property", "apartment", "home"],
+    TOPIC_SAVINGS: ["investment", "stock", "fund", "savings", "portfolio"],
+    TOPIC_ECONOMY: ["tax", "economic", "economy", "government"],
+    TOPIC_EV: ["electric", "ev", "vehicle", "car", "tax", "subsidy"],
+}
+
+# Keyword -> every topic it signals (e.g. "tax" is both economy and EV)
+_KEYWORD_MASKS = {}
+for _bit, _words in TOPIC_KEYWORDS.items():
+    for _word in _words:
+        _KEYWORD_MASKS[_word] = _KEYWORD_MASKS.get(_word, 0) | _bit
+
+# One alternation over all keywords, longest first. Whole words only (with an
+# optional plural "s"/"es") so "ev" doesn't match "every" or "car" "career".
+_KEYWORD_PATTERN = re.compile(
+    r"\b("
+    + "|".join(re.escape(w) for w in sorted(_KEYWORD_MASKS, key=len, reverse=True))
+    + r")(?:e?s)?\b",
+    re.IGNORECASE,
+)
+
+ALL_TOPICS = 0
+for _bit in TOPIC_NAMES:
+    ALL_TOPICS |= _bit
+
+
+def classify_text(*parts: Optional[str]) -> int:
+    """Return the topic bitmask for a piece of text in a single regex pass."""
+    text = " ".join(p for p in parts if p)
+    mask = 0
+    for match in _KEYWORD_PATTERN.finditer(text):
+        mask |= _KEYWORD_MASKS[match.group(1).lower()]
+        if mask == ALL_TOPICS:
+            break
+    return mask
+
+
+def classify_article(article: dict) -> int:
+    """Topic bitmask for an article dict (title, description and content)."""
+    return classify_text(
+        article.get("title"),
+        article.get("description"),
+        article.get("content"),
+    )
+
+
+def profile_topic_mask(profile: dict) -> int:
+    """
+    Topics a user with this profile is interested in.
+
+    Args:
+        profile: User profile data
+
+    Returns:
+        Bitmask of topics; economy news is always included
+    """
+    mask = TOPIC_ECONOMY
+    if (profile.get("num_loans") or 0) > 0:
+        mask |= TOPIC_LOANS
+    if profile.get("housing_type"):
+        mask |= TOPIC_HOUSING
+    if profile.get("savings_types"):
+        mask |= TOPIC_SAVINGS
+    if profile.get("vehicle_type") == "Elbil":
+        mask |= TOPIC_EV
+    return mask
+
+
+# Keyword hits in the title count this much more than hits in the body
+TITLE_WEIGHT = 2.0
+
+
+def topic_weights(article: dict) -> List[float]:
+    """
+    Topic vector of an article, one weight per topic in TOPIC_NAMES order.
+
+    Weights are keyword hit counts (title hits count TITLE_WEIGHT times),
+    L2-normalised so long articles don't outrank short ones. A topic has a
+    non-zero weight exactly when its bit is set by `classify_article`.
+    """
+    counts = dict.fromkeys(TOPIC_NAMES, 0.0)
+    parts = (
+        (article.get("title"), TITLE_WEIGHT),
+        (article.get("description"), 1.0),
+        (article.get("content"), 1.0),
+    )
+    for text, weight in parts:
+        if not text:
+            continue
+        for match in _KEYWORD_PATTERN.finditer(text):
+            for bit in topic_bits(_KEYWORD_MASKS[match.group(1).lower()]):
+                counts[bit] += weight
+
+    norm = sum(c * c for c in counts.values()) ** 0.5
+    if not norm:
+        return [0.0] * len(counts)
+    return [round(counts[bit] / norm, 4) for bit in TOPIC_NAMES]
+
+
+def weights_from_mask(mask: int) -> List[float]:
+    """Unit topic vector with equal weights on the topics in a bitmask."""
+    bits = topic_bits(mask)
+    if not bits:
+        return [0.0] * len(TOPIC_NAMES)
+    weight = 1 / len(bits) ** 0.5
+    return [weight if mask & bit else 0.0 for bit in TOPIC_NAMES]
+
+
+def topic_names(mask: int) -> List[str]:
+    """Names of the topics set in a bitmask."""
+    return [name for bit, name in TOPIC_NAMES.items() if mask & bit]
+
+
+def topic_bits(mask: int) -> Iterable[int]:
+    """Individual topic bits set in a bitmask."""
+    return [bit for bit in TOPIC_NAMES if mask & bit]
@@ -87,6 +87,11 @@ struct NewsResponse: Codable {
     let articles: [NewsArticle]
 }
 
+struct NewsFeedPage {
+    let articles: [NewsArticle]
+    let nextCursor: String?  // nil on the last page
+}
+
 // MARK: - Insight Models
 
 struct Insight: Codable, Identifiable {
@@ -85,9 +85,17 @@ class APIService: ObservableObject {
 
     // MARK: - News
 
-    func getNewsFeed(userId: Int, limit: Int = 20) async throws -> [NewsArticle] {
-        let urlString = "\(baseURL)/news/feed?user_id=\(userId)&limit=\(limit)&token=\(authToken ?? "")"
-        guard let url = URL(string: urlString) else {
+    func getNewsFeed(userId: Int, limit: Int = 20, cursor: String? = nil) async throws -> NewsFeedPage {
+        var components = URLComponents(string: "\(baseURL)/news/feed")
+        components?.queryItems = [
+            URLQueryItem(name: "user_id", value: String(userId)),
+            URLQueryItem(name: "limit", value: String(limit)),
+            URLQueryItem(name: "token", value: authToken ?? "")
+        ]
+        if let cursor = cursor {
+            components?.queryItems?.append(URLQueryItem(name: "cursor", value: cursor))
+        }
+        guard let url = components?.url else {
             throw APIError.invalidURL
         }
 
@@ -96,12 +104,14 @@ class APIService: ObservableObject {
 
         let (data, response) = try await URLSession.shared.data(for: request)
 
-        guard (response as? HTTPURLResponse)?.statusCode == 200 else {
+        guard let httpResponse = response as? HTTPURLResponse,
+              httpResponse.statusCode == 200 else {
             throw APIError.serverError
         }
 
         let articles = try JSONDecoder().decode([NewsArticle].self, from: data)
-        return articles
+        let nextCursor = httpResponse.value(forHTTPHeaderField: "X-Next-Cursor")
+        return NewsFeedPage(articles: articles, nextCursor: nextCursor)
     }
 
     func getNewsSources() async throws -> [String] {
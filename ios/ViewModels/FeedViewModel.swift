@@ -7,11 +7,18 @@ class FeedViewModel: ObservableObject {
     @Published var insights: [Insight] = []
     @Published var sources: [String] = []
     @Published var isLoading = false
+    @Published var isLoadingMore = false
     @Published var errorMessage: String?
     @Published var selectedCategory = "Til dig"
 
     private let apiService = APIService.shared
     private var refreshTimer: Timer?
+    private var nextCursor: String?
+    private let pageSize = 20
+
+    var hasMoreArticles: Bool {
+        nextCursor != nil
+    }
 
     // MARK: - Load Data
 
@@ -20,17 +27,18 @@ class FeedViewModel: ObservableObject {
         errorMessage = nil
 
         do {
-            async let articlesTask = apiService.getNewsFeed(userId: userId, limit: 20)
+            async let articlesTask = apiService.getNewsFeed(userId: userId, limit: pageSize)
             async let insightsTask = apiService.getInsights(userId: userId)
             async let sourcesTask = apiService.getNewsSources()
 
-            let (loadedArticles, loadedInsights, loadedSources) = try await (
+            let (loadedPage, loadedInsights, loadedSources) = try await (
                 articlesTask,
                 insightsTask,
                 sourcesTask
             )
 
-            articles = loadedArticles
+            articles = loadedPage.articles
+            nextCursor = loadedPage.nextCursor
             insights = loadedInsights
             sources = loadedSources
             isLoading = false
@@ -41,6 +49,30 @@ class FeedViewModel: ObservableObject {
         }
     }
 
+    // MARK: - Pagination
+
+    func loadMoreIfNeeded(userId: Int, currentArticle: NewsArticle) async {
+        // Compare against the last card actually shown, which differs from
+        // articles.last when a category filter is selected
+        guard currentArticle.id == filterArticlesByCategory(selectedCategory).last?.id else { return }
+        await loadMore(userId: userId)
+    }
+
+    func loadMore(userId: Int) async {
+        guard let cursor = nextCursor, !isLoadingMore else { return }
+        isLoadingMore = true
+
+        do {
+            let page = try await apiService.getNewsFeed(userId: userId, limit: pageSize, cursor: cursor)
+            articles.append(contentsOf: page.articles)
+            nextCursor = page.nextCursor
+        } catch {
+            errorMessage = error.localizedDescription
+        }
+
+        isLoadingMore = false
+    }
+
     // MARK: - Refresh
 
     func refreshFeed(userId: Int) async {
@@ -92,6 +92,17 @@ struct FeedView: View {
                         VStack(spacing: 12) {
                             ForEach(feedViewModel.filterArticlesByCategory(feedViewModel.selectedCategory)) { article in
                                 NewsCardView(article: article)
+                                    .task {
+                                        if let userId = authViewModel.userId {
+                                            await feedViewModel.loadMoreIfNeeded(userId: userId, currentArticle: article)
+                                        }
+                                    }
+                            }
+
+                            if feedViewModel.isLoadingMore {
+                                ProgressView()
+                                    .tint(Color(red: 0.94, green: 0.63, blue: 0.19))
+                                    .padding(.vertical, 12)
                             }
                         }
                         .padding(.horizontal, 20)